@@ -0,0 +1,73 @@
+from database.db import get_db
+from database.models import User, ActivityEvent
+from authentication.auth import get_current_user
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import tuple_
+from datetime import datetime
+from typing import Optional
+import base64
+
+
+router = APIRouter()
+
+
+def record_activity(db, user_id: int, kind: str, resource_id: Optional[int] = None, payload: Optional[dict] = None):
+    """
+    Stage an activity event on the caller's session; it is committed (or rolled
+    back) together with the resource write it describes
+    """
+    db.add(ActivityEvent(
+        user_id=user_id,
+        resource_id=resource_id,
+        kind=kind,
+        payload=payload or {},
+        ts=datetime.utcnow(),
+    ))
+
+
+def encode_cursor(event: ActivityEvent) -> str:
+    return base64.urlsafe_b64encode(f"{event.ts.isoformat()}|{event.id}".encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        ts, event_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(ts), event_id
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+@router.get("/activities/recent")
+def get_recent_activities(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    db=Depends(get_db)
+):
+    """
+    Newest-first activity feed with keyset pagination on (user_id, ts DESC, id DESC):
+    pass next_cursor back as cursor to get the following page
+    """
+    query = db.query(ActivityEvent).filter(ActivityEvent.user_id == current_user.id)
+    if cursor:
+        ts, event_id = decode_cursor(cursor)
+        query = query.filter(tuple_(ActivityEvent.ts, ActivityEvent.id) < tuple_(ts, event_id))
+
+    events = query.order_by(ActivityEvent.ts.desc(), ActivityEvent.id.desc()).limit(limit + 1).all()
+    has_more = len(events) > limit
+    events = events[:limit]
+
+    return {
+        "activities": [
+            {
+                "id": event.id,
+                "type": event.kind,
+                "timestamp": event.ts,
+                "resource_id": event.resource_id,
+                "resource_name": (event.payload or {}).get("resource_name"),
+                "metadata": event.payload or {},
+            }
+            for event in events
+        ],
+        "next_cursor": encode_cursor(events[-1]) if has_more else None,
+    }
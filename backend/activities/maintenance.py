@@ -0,0 +1,148 @@
+"""
+Activity log partition maintenance and retention
+On Postgres activity_events is range-partitioned by month: partitions are
+created ahead of time and whole months past the retention window are dropped,
+which is O(1) instead of a DELETE over hundreds of millions of rows.
+
+    python -m activities.maintenance     # run once (also runs periodically in the app)
+"""
+from database.db import engine
+from observability.request_context import log_event
+from sqlalchemy import text
+from datetime import datetime
+from typing import Dict, List, Optional
+import asyncio
+import logging
+import os
+import re
+
+
+ACTIVITY_RETENTION_MONTHS = int(os.getenv("ACTIVITY_RETENTION_MONTHS", "12"))
+ACTIVITY_PARTITIONS_AHEAD = int(os.getenv("ACTIVITY_PARTITIONS_AHEAD", "2"))
+ACTIVITY_MAINTENANCE_INTERVAL = float(os.getenv("ACTIVITY_MAINTENANCE_INTERVAL", str(6 * 3600)))
+
+PARTITION_PATTERN = re.compile(r"^activity_events_(\d{4})(\d{2})$")
+
+logger = logging.getLogger("skillstack.activities")
+
+
+def _month_start(year: int, month: int) -> datetime:
+    # Normalize month overflow/underflow, e.g. (2025, 13) -> 2026-01
+    year, month = year + (month - 1) // 12, (month - 1) % 12 + 1
+    return datetime(year, month, 1)
+
+
+def _is_partitioned(conn) -> bool:
+    return bool(conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = 'activity_events'"
+    )).scalar())
+
+
+def _partitions(conn) -> List[str]:
+    return list(conn.execute(text("""
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = 'activity_events'
+    """)).scalars())
+
+
+def ensure_partitions(now: Optional[datetime] = None, months_ahead: int = ACTIVITY_PARTITIONS_AHEAD) -> List[str]:
+    """Create this month's and the next months' partitions plus a DEFAULT catch-all"""
+    if engine.dialect.name != "postgresql":
+        return []
+    now = now or datetime.utcnow()
+    created = []
+    with engine.begin() as conn:
+        if not _is_partitioned(conn):
+            return []
+        existing = set(_partitions(conn))
+        for offset in range(months_ahead + 1):
+            start = _month_start(now.year, now.month + offset)
+            end = _month_start(start.year, start.month + 1)
+            name = f"activity_events_{start:%Y%m}"
+            if name in existing:
+                continue
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF activity_events "
+                f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+            ))
+            created.append(name)
+        # Only reached if maintenance fell behind; keeps inserts from failing
+        conn.execute(text("CREATE TABLE IF NOT EXISTS activity_events_default PARTITION OF activity_events DEFAULT"))
+    return created
+
+
+def apply_retention(now: Optional[datetime] = None, months: int = ACTIVITY_RETENTION_MONTHS) -> Dict:
+    """Drop monthly partitions entirely older than the retention window"""
+    now = now or datetime.utcnow()
+    cutoff = _month_start(now.year, now.month - months)
+    dropped = []
+    deleted = 0
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql" and _is_partitioned(conn):
+            for name in _partitions(conn):
+                match = PARTITION_PATTERN.match(name)
+                if not match:
+                    continue
+                month_end = _month_start(int(match.group(1)), int(match.group(2)) + 1)
+                if month_end <= cutoff:
+                    conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+                    dropped.append(name)
+            # Stragglers that landed in the default partition
+            deleted = conn.execute(
+                text("DELETE FROM activity_events_default WHERE ts < :cutoff"), {"cutoff": cutoff}
+            ).rowcount
+        else:
+            deleted = conn.execute(
+                text("DELETE FROM activity_events WHERE ts < :cutoff"), {"cutoff": cutoff}
+            ).rowcount
+    return {"cutoff": cutoff.isoformat(), "dropped_partitions": dropped, "deleted_rows": max(deleted or 0, 0)}
+
+
+def run_maintenance() -> Dict:
+    return {"created_partitions": ensure_partitions(), **apply_retention()}
+
+
+class ActivityMaintenance:
+    """Periodic partition creation + retention, started with the app"""
+
+    def __init__(self, interval: float = ACTIVITY_MAINTENANCE_INTERVAL):
+        self.interval = interval
+        self.worker: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.worker is None:
+            self.worker = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            try:
+                await self.worker
+            except asyncio.CancelledError:
+                pass
+            self.worker = None
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.to_thread(run_maintenance)
+            except Exception as e:
+                log_event(logger, "activity_maintenance_failed", logging.ERROR, error=str(e))
+            await asyncio.sleep(self.interval)
+
+
+# Singleton instance
+_activity_maintenance = None
+
+def get_activity_maintenance() -> ActivityMaintenance:
+    global _activity_maintenance
+    if _activity_maintenance is None:
+        _activity_maintenance = ActivityMaintenance()
+    return _activity_maintenance
+
+
+if __name__ == "__main__":
+    print(run_maintenance())
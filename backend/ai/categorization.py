@@ -2,30 +2,29 @@
 AI-powered Auto-Categorization and Skill Tagging
 Uses multi-label text classification on resource titles and metadata
 """
-from google import genai
-from google.genai import types
-import os
+from ai.routing import get_model_router, require_keys, require_list_of
+import json
 from typing import Dict, List
 
 
+# Stored with every result in resources.ai_payload; bump when the prompts change
+PROMPT_VERSION = "categorize-1"
+
 class AutoCategorizer:
     """
     Automatically categorizes resources and assigns skill tags
     """
     
     def __init__(self):
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY environment variable not set")
-        
-        self.client = genai.Client(api_key=api_key)
+        self.router = get_model_router()
     
     async def categorize_resource(
         self,
         resource_name: str,
         description: str = None,
         resource_type: str = None,
-        platform: str = None
+        platform: str = None,
+        hedge: bool = False
     ) -> Dict:
         """
         Automatically categorize and tag a resource
@@ -67,17 +66,13 @@ Return ONLY a JSON object:
 """
         
         try:
-            response = self.client.models.generate_content(
-                model='gemini-3-pro-preview',
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json"
-                )
+            routed = await self.router.generate(
+                task="categorize",
+                prompt=prompt,
+                validate=require_keys(category=str, skill_tags=list),
+                hedge=hedge
             )
-            
-            import json
-            result = json.loads(response.text)
-            return result
+            return {**routed.data, "model": routed.model, "prompt_version": PROMPT_VERSION}
             
         except Exception as e:
             print(f"Error categorizing resource: {str(e)}")
@@ -89,6 +84,69 @@ Return ONLY a JSON object:
                 "related_skills": [],
                 "error": str(e)
             }
+    
+    async def categorize_resources(self, items: List[Dict]) -> Dict[int, Dict]:
+        """
+        Categorize several resources with one multi-item prompt
+        
+        Args:
+            items: [{"id": 1, "name": ..., "description": ..., "resource_type": ..., "platform": ...}]
+        
+        Returns:
+            {resource_id: {"category": ..., "subcategory": ..., "skill_tags": [...], ...}}
+            Items the model skipped are missing from the result.
+        """
+        if not items:
+            return {}
+        
+        resources_json = json.dumps([
+            {
+                "id": item["id"],
+                "name": item["name"],
+                "description": (item.get("description") or "")[:500] or "Not provided",
+                "type": item.get("resource_type") or "Not specified",
+                "platform": item.get("platform") or "Not specified",
+            }
+            for item in items
+        ], indent=1)
+        
+        prompt = f"""
+You are an expert learning content classifier analyzing educational resources.
+
+Resources (JSON):
+{resources_json}
+
+Task: Classify EACH resource and provide:
+1. Primary category (e.g., "Frontend Development", "Data Science", "Backend Development", "DevOps", "Mobile Development", "Soft Skills", "Cloud Computing", "Machine Learning", etc.)
+2. Specific subcategory (e.g., "React", "Python", "SQL", "Docker", etc.)
+3. Relevant skill tags (5-8 specific technical skills)
+4. Estimated difficulty level (Beginner, Intermediate, Advanced, Expert)
+5. Related prerequisite skills (3-5 skills that would help)
+
+Return ONLY a JSON array with one object per resource, using the same "id":
+[
+  {{
+    "id": 1,
+    "category": "main category",
+    "subcategory": "specific subcategory",
+    "skill_tags": ["tag1", "tag2", "tag3"],
+    "difficulty_level": "Intermediate",
+    "related_skills": ["skill1", "skill2", "skill3"]
+  }}
+]
+"""
+        
+        routed = await self.router.generate(
+            task="categorize_batch",
+            prompt=prompt,
+            validate=require_list_of(id=int, category=str, skill_tags=list)
+        )
+        wanted = {item["id"] for item in items}
+        return {
+            result.pop("id"): {**result, "model": routed.model, "prompt_version": PROMPT_VERSION}
+            for result in routed.data
+            if result.get("id") in wanted
+        }
 
 
 # Singleton instance
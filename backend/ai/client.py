@@ -0,0 +1,313 @@
+"""
+Resilient Gemini Client
+Shared wrapper around genai.Client with per-task latency budgets,
+jittered retries, a circuit breaker and optional hedged requests
+"""
+from google import genai
+from google.genai import errors, types
+from observability.metrics import (
+    AI_BREAKER_STATE, AI_CALLS, AI_ERRORS, AI_HEDGES, AI_LATENCY, AI_RETRIES, AI_TIMEOUTS, AI_TOKENS
+)
+from observability.request_context import log_event
+from observability.request_timing import record_span
+from collections import deque
+from typing import Dict, Optional
+import asyncio
+import logging
+import os
+import random
+import time
+
+
+# Latency budget (seconds) for a whole call including retries.
+# Override per task with AI_TIMEOUT_<TASK>, e.g. AI_TIMEOUT_CATEGORIZE=10
+DEFAULT_TASK_TIMEOUTS = {
+    "categorize": 15.0,
+    "categorize_batch": 45.0,
+    "summarize": 30.0,
+    "predict": 20.0,
+    "recommend": 25.0,
+}
+DEFAULT_TIMEOUT = 30.0
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+logger = logging.getLogger("skillstack.ai")
+
+
+class CircuitOpenError(Exception):
+    """Raised when the circuit breaker is open and calls fail fast"""
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker: closed -> open after N consecutive failures,
+    open -> half_open after the reset timeout, half_open lets a single probe through
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = "half_open"
+            self.probe_in_flight = False
+        # half_open: only one probe at a time
+        if self.probe_in_flight:
+            return False
+        self.probe_in_flight = True
+        return True
+
+    def release_probe(self):
+        """The half-open probe ended without an outcome (cancelled); let the next call probe"""
+        self.probe_in_flight = False
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self.probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.probe_in_flight = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """Keeps a sliding window of successful call latencies per task"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.window = window
+        self.min_samples = min_samples
+        self.samples: Dict[str, deque] = {}
+
+    def record(self, task: str, seconds: float):
+        self.samples.setdefault(task, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, task: str, pct: float) -> Optional[float]:
+        samples = self.samples.get(task)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+class ResilientGeminiClient:
+    """
+    Single Gemini client shared by every AI engine
+    """
+
+    def __init__(self):
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY environment variable not set")
+
+        # Point at a local fake server (see fake_llm_server.py) for offline load tests
+        base_url = os.getenv("GEMINI_BASE_URL")
+        http_options = types.HttpOptions(base_url=base_url) if base_url else None
+
+        self.client = genai.Client(api_key=api_key, http_options=http_options)
+        self.max_retries = int(os.getenv("AI_MAX_RETRIES", "2"))
+        self.retry_base_delay = float(os.getenv("AI_RETRY_BASE_DELAY", "0.5"))
+        self.retry_max_delay = float(os.getenv("AI_RETRY_MAX_DELAY", "4"))
+        self.hedging_enabled = os.getenv("AI_HEDGE_REQUESTS", "false").lower() in ("1", "true", "yes")
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv("AI_BREAKER_FAILURES", "5")),
+            reset_timeout=float(os.getenv("AI_BREAKER_RESET_SECONDS", "30")),
+        )
+        self.latencies = LatencyTracker()
+
+    def timeout_for(self, task: str) -> float:
+        override = os.getenv(f"AI_TIMEOUT_{task.upper()}")
+        if override:
+            return float(override)
+        return DEFAULT_TASK_TIMEOUTS.get(task, DEFAULT_TIMEOUT)
+
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+        if isinstance(error, asyncio.TimeoutError):
+            return True
+        if isinstance(error, errors.APIError):
+            return error.code in RETRYABLE_STATUS_CODES
+        # Transport-level failures (connection reset, DNS, ...) from httpx
+        return error.__class__.__module__.startswith("httpx")
+
+    async def generate_content(
+        self,
+        task: str,
+        model: str,
+        contents,
+        config: types.GenerateContentConfig = None,
+        timeout: float = None,
+        hedge: bool = False
+    ):
+        """
+        Call generate_content within the task's latency budget.
+        Retryable errors are retried with full-jitter exponential backoff
+        as long as the remaining budget allows it.
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        call = {"attempts": 0}
+        outcome = "ok"
+        error = None
+        response = None
+        try:
+            response = await self._generate_with_retries(task, model, contents, config, timeout, hedge, call)
+            return response
+        except CircuitOpenError as e:
+            outcome, error = "circuit_open", e
+            raise
+        except asyncio.TimeoutError as e:
+            outcome, error = "timeout", e
+            AI_TIMEOUTS.inc(task=task)
+            raise
+        except Exception as e:
+            outcome, error = "error", e
+            raise
+        finally:
+            self._record_call(task, model, loop.time() - started, outcome, error, response, call["attempts"])
+
+    def _record_call(self, task: str, model: str, latency: float, outcome: str, error, response, attempts: int):
+        AI_CALLS.inc(task=task, model=model, outcome=outcome)
+        AI_LATENCY.observe(latency, task=task, model=model)
+        record_span("ai", latency)
+        AI_BREAKER_STATE.set(0 if self.breaker.state == "closed" else 1)
+        if error is not None:
+            AI_ERRORS.inc(task=task, kind=type(error).__name__)
+
+        usage = getattr(response, "usage_metadata", None)
+        input_tokens = getattr(usage, "prompt_token_count", None) or 0
+        output_tokens = getattr(usage, "candidates_token_count", None) or 0
+        if usage is not None:
+            AI_TOKENS.inc(input_tokens, task=task, model=model, direction="input")
+            AI_TOKENS.inc(output_tokens, task=task, model=model, direction="output")
+
+        log_event(
+            logger,
+            "ai_call",
+            level=logging.INFO if outcome == "ok" else logging.WARNING,
+            task=task,
+            model=model,
+            outcome=outcome,
+            latency_ms=round(latency * 1000, 1),
+            attempts=attempts,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            error=str(error) if error is not None else None,
+        )
+
+    async def _generate_with_retries(self, task: str, model: str, contents, config, timeout, hedge: bool, call: Dict):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout or self.timeout_for(task))
+        attempt = 0
+
+        while True:
+            if not self.breaker.allow():
+                raise CircuitOpenError("Gemini circuit breaker is open")
+            # No await since allow(), so this tells whether we hold the half-open probe
+            probing = self.breaker.state == "half_open"
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            started = loop.time()
+            call["attempts"] = attempt + 1
+            try:
+                if hedge and self.hedging_enabled:
+                    response = await self._hedged_call(task, model, contents, config, remaining)
+                else:
+                    response = await asyncio.wait_for(self._call(model, contents, config), remaining)
+            except Exception as e:
+                retryable = self.is_retryable(e)
+                if retryable:
+                    self.breaker.record_failure()
+                else:
+                    # The upstream answered, it just didn't like the request
+                    self.breaker.record_success()
+
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                delay = random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+                if loop.time() + delay >= deadline:
+                    raise
+                AI_RETRIES.inc(task=task)
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                # Cancelled (hedge loser, client disconnect): no verdict, but don't keep the probe slot
+                if probing:
+                    self.breaker.release_probe()
+                raise
+
+            self.breaker.record_success()
+            self.latencies.record(task, loop.time() - started)
+            return response
+
+    async def _call(self, model: str, contents, config):
+        return await self.client.aio.models.generate_content(
+            model=model,
+            contents=contents,
+            config=config
+        )
+
+    async def _hedged_call(self, task: str, model: str, contents, config, timeout: float):
+        """
+        Send the request, and if it hasn't answered by the task's p95 latency,
+        send a second one and take whichever succeeds first
+        """
+        hedge_after = self.latencies.percentile(task, 95)
+        if hedge_after is None or hedge_after >= timeout:
+            return await asyncio.wait_for(self._call(model, contents, config), timeout)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        pending = {asyncio.ensure_future(self._call(model, contents, config))}
+        last_error = None
+        try:
+            done, pending = await asyncio.wait(pending, timeout=hedge_after)
+            if not done:
+                AI_HEDGES.inc(task=task)
+                pending.add(asyncio.ensure_future(self._call(model, contents, config)))
+
+            while True:
+                for finished in done:
+                    if finished.exception() is None:
+                        return finished.result()
+                    last_error = finished.exception()
+                if not pending:
+                    raise last_error
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                done, pending = await asyncio.wait(
+                    pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    raise asyncio.TimeoutError()
+        finally:
+            for straggler in pending:
+                straggler.cancel()
+
+
+# Singleton instance
+_gemini_client = None
+
+def get_gemini_client() -> ResilientGeminiClient:
+    global _gemini_client
+    if _gemini_client is None:
+        _gemini_client = ResilientGeminiClient()
+    return _gemini_client
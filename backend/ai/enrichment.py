@@ -0,0 +1,257 @@
+"""
+Asynchronous Enrichment Pipeline
+Resource create/update events are queued in-process; a background worker
+batches pending resources per user into multi-item categorization prompts
+and writes the results back with one bulk update per batch
+"""
+from database.db import SessionLocal
+from database.models import Resources, ResourceType, ResourcePlatform
+from ai.categorization import get_auto_categorizer
+from ai.payload import store_ai_results
+from observability.metrics import REGISTRY
+from observability.request_context import log_event
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import logging
+import os
+import threading
+import time
+
+
+ENRICHMENT_ENABLED = os.getenv("ENRICHMENT_ENABLED", "true").lower() in ("1", "true", "yes")
+ENRICHMENT_INTERVAL = float(os.getenv("ENRICHMENT_INTERVAL", "2"))
+ENRICHMENT_BATCH_SIZE = int(os.getenv("ENRICHMENT_BATCH_SIZE", "10"))
+ENRICHMENT_CONCURRENCY = int(os.getenv("ENRICHMENT_CONCURRENCY", "2"))
+# Failed batches are retried with exponential backoff before items count as failed
+ENRICHMENT_MAX_ATTEMPTS = int(os.getenv("ENRICHMENT_MAX_ATTEMPTS", "5"))
+ENRICHMENT_RETRY_DELAY = float(os.getenv("ENRICHMENT_RETRY_DELAY", "10"))
+ENRICHMENT_RETRY_MAX_DELAY = float(os.getenv("ENRICHMENT_RETRY_MAX_DELAY", "600"))
+
+# Fields whose change makes the stored categorization stale
+ENRICHMENT_SOURCE_FIELDS = {"name", "description", "resource_type_id", "resource_platform_id"}
+
+ENRICHMENT_ITEMS = REGISTRY.counter("enrichment_items_total", "Resources processed by the enrichment worker", ["outcome"])
+ENRICHMENT_BATCHES = REGISTRY.counter("enrichment_batches_total", "Categorization batches sent by the enrichment worker", ["outcome"])
+ENRICHMENT_LAG = REGISTRY.histogram(
+    "enrichment_lag_seconds", "Time from a resource event to its categorization being written",
+    buckets=(1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+)
+ENRICHMENT_QUEUE_DEPTH = REGISTRY.gauge("enrichment_queue_depth", "Resources waiting for enrichment")
+
+logger = logging.getLogger("skillstack.enrichment")
+
+
+class EnrichmentPipeline:
+    """
+    Pending work is a dict keyed by resource id, so repeated edits of the same
+    resource before the worker runs collapse into a single item. emit() is
+    called from sync route handlers running in the threadpool, hence the lock.
+    Items of a failed batch (LLM error, open breaker) wait in `retrying` until
+    their backoff expires; a new edit moves them straight back to `pending`.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending: Dict[int, Tuple[int, float]] = {}  # resource_id -> (user_id, enqueued_at)
+        # resource_id -> (user_id, enqueued_at, attempts so far, retry_at)
+        self.retrying: Dict[int, Tuple[int, float, int, float]] = {}
+        self.worker: Optional[asyncio.Task] = None
+        self.processed = 0
+        self.failed = 0
+        self.last_run_at: Optional[float] = None
+
+    def emit(self, user_id: int, resource_id: int):
+        if not ENRICHMENT_ENABLED:
+            return
+        with self.lock:
+            if resource_id not in self.pending:
+                self.pending[resource_id] = (user_id, time.time())
+            self.retrying.pop(resource_id, None)
+            ENRICHMENT_QUEUE_DEPTH.set(len(self.pending) + len(self.retrying))
+
+    def start(self):
+        if ENRICHMENT_ENABLED and self.worker is None:
+            self.worker = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            try:
+                await self.worker
+            except asyncio.CancelledError:
+                pass
+            self.worker = None
+
+    def status(self) -> Dict:
+        with self.lock:
+            depth = len(self.pending)
+            retrying = len(self.retrying)
+            oldest = min(
+                [enqueued for _, enqueued in self.pending.values()]
+                + [enqueued for _, enqueued, _, _ in self.retrying.values()],
+                default=None
+            )
+        return {
+            "enabled": ENRICHMENT_ENABLED,
+            "running": self.worker is not None and not self.worker.done(),
+            "queue_depth": depth,
+            "retrying": retrying,
+            "oldest_pending_seconds": round(time.time() - oldest, 1) if oldest else 0,
+            "processed": self.processed,
+            "failed": self.failed,
+            "last_run_at": self.last_run_at,
+        }
+
+    def _drain(self) -> Dict[int, List[Tuple[int, float, int]]]:
+        """Take pending items and retries whose backoff expired, as (resource_id, enqueued_at, attempts) per user"""
+        now = time.time()
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            ready = [resource_id for resource_id, item in self.retrying.items() if item[3] <= now]
+            retries = {resource_id: self.retrying.pop(resource_id) for resource_id in ready}
+            ENRICHMENT_QUEUE_DEPTH.set(len(self.retrying))
+        by_user: Dict[int, List[Tuple[int, float, int]]] = {}
+        for resource_id, (user_id, enqueued_at) in pending.items():
+            by_user.setdefault(user_id, []).append((resource_id, enqueued_at, 0))
+        for resource_id, (user_id, enqueued_at, attempts, _) in retries.items():
+            by_user.setdefault(user_id, []).append((resource_id, enqueued_at, attempts))
+        return by_user
+
+    def _retry_later(self, user_id: int, items: List[Tuple[int, float, int]]) -> int:
+        """Requeue items of a failed batch with backoff; returns how many hit the attempt cap"""
+        now = time.time()
+        given_up = 0
+        with self.lock:
+            for resource_id, enqueued_at, attempts in items:
+                attempts += 1
+                if attempts >= ENRICHMENT_MAX_ATTEMPTS:
+                    given_up += 1
+                    continue
+                # An edit that arrived meanwhile is already pending; it supersedes the retry
+                if resource_id not in self.pending:
+                    delay = min(ENRICHMENT_RETRY_MAX_DELAY, ENRICHMENT_RETRY_DELAY * 2 ** (attempts - 1))
+                    self.retrying[resource_id] = (user_id, enqueued_at, attempts, now + delay)
+            ENRICHMENT_QUEUE_DEPTH.set(len(self.pending) + len(self.retrying))
+        return given_up
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(ENRICHMENT_INTERVAL)
+            try:
+                await self.process_pending()
+            except Exception as e:
+                log_event(logger, "enrichment_worker_error", logging.ERROR, error=str(e))
+
+    async def process_pending(self):
+        by_user = self._drain()
+        if not by_user:
+            return
+        self.last_run_at = time.time()
+
+        batches = []
+        for user_id, items in by_user.items():
+            for i in range(0, len(items), ENRICHMENT_BATCH_SIZE):
+                batches.append((user_id, items[i:i + ENRICHMENT_BATCH_SIZE]))
+
+        semaphore = asyncio.Semaphore(ENRICHMENT_CONCURRENCY)
+
+        async def run_batch(user_id: int, items: List[Tuple[int, float, int]]):
+            async with semaphore:
+                await self._process_batch(user_id, items)
+
+        await asyncio.gather(*(run_batch(user_id, items) for user_id, items in batches))
+
+    def _load_rows(self, user_id: int, resource_ids: List[int]):
+        db = SessionLocal()
+        try:
+            return (
+                db.query(Resources.id, Resources.name, Resources.description, ResourceType.name, ResourcePlatform.name)
+                .outerjoin(ResourceType, Resources.resource_type_id == ResourceType.id)
+                .outerjoin(ResourcePlatform, Resources.resource_platform_id == ResourcePlatform.id)
+                .filter(Resources.user_id == user_id, Resources.id.in_(resource_ids))
+                .all()
+            )
+        finally:
+            db.close()
+
+    def _store(self, user_id: int, updates: List[Dict]):
+        db = SessionLocal()
+        try:
+            # One set-based UPDATE ... FROM (VALUES ...) for the whole batch
+            store_ai_results(db, user_id, "categorize", updates)
+            db.commit()
+        finally:
+            db.close()
+
+    async def _process_batch(self, user_id: int, items: List[Tuple[int, float, int]]):
+        enqueued_at = {resource_id: enqueued for resource_id, enqueued, _ in items}
+        # Blocking DB work runs in threads so the event loop keeps serving requests,
+        # and no session (or pooled connection) is held across the LLM call
+        rows = await asyncio.to_thread(self._load_rows, user_id, list(enqueued_at))
+        if not rows:
+            return
+
+        try:
+            results = await get_auto_categorizer().categorize_resources([
+                {"id": resource_id, "name": name, "description": description,
+                 "resource_type": type_name, "platform": platform_name}
+                for resource_id, name, description, type_name, platform_name in rows
+            ])
+        except Exception as e:
+            ENRICHMENT_BATCHES.inc(outcome="error")
+            existing = {row[0] for row in rows}
+            given_up = self._retry_later(user_id, [item for item in items if item[0] in existing])
+            ENRICHMENT_ITEMS.inc(len(rows) - given_up, outcome="retried")
+            ENRICHMENT_ITEMS.inc(given_up, outcome="error")
+            self.failed += given_up
+            log_event(
+                logger, "enrichment_batch_failed", logging.ERROR,
+                user_id=user_id, items=len(rows), given_up=given_up, error=str(e)
+            )
+            return
+
+        updates = [
+            {
+                "id": resource_id,
+                "result": result,
+                "ai_category": result.get("category"),
+                "ai_tags": ", ".join(result.get("skill_tags", [])),
+            }
+            for resource_id, result in results.items()
+        ]
+        if updates:
+            await asyncio.to_thread(self._store, user_id, updates)
+
+        now = time.time()
+        for row in updates:
+            ENRICHMENT_LAG.observe(now - enqueued_at[row["id"]])
+        ENRICHMENT_BATCHES.inc(outcome="ok")
+        ENRICHMENT_ITEMS.inc(len(updates), outcome="ok")
+        ENRICHMENT_ITEMS.inc(len(rows) - len(updates), outcome="skipped")
+        self.processed += len(updates)
+
+    def backfill(self, db, user_id: Optional[int] = None, only_missing: bool = True) -> int:
+        """Queue every resource (optionally of one user / only uncategorized ones) for enrichment"""
+        if not ENRICHMENT_ENABLED:
+            return 0  # emit() would drop every item
+        query = db.query(Resources.id, Resources.user_id)
+        if user_id is not None:
+            query = query.filter(Resources.user_id == user_id)
+        if only_missing:
+            query = query.filter(Resources.ai_category.is_(None))
+
+        queued = 0
+        for resource_id, owner_id in query.yield_per(1000):
+            self.emit(owner_id, resource_id)
+            queued += 1
+        return queued
+
+
+# Singleton instance
+_enrichment_pipeline = None
+
+def get_enrichment_pipeline() -> EnrichmentPipeline:
+    global _enrichment_pipeline
+    if _enrichment_pipeline is None:
+        _enrichment_pipeline = EnrichmentPipeline()
+    return _enrichment_pipeline
@@ -0,0 +1,187 @@
+"""
+Nightly Mastery Re-forecast
+Recomputes ai_mastery_date for every in-progress resource from learning
+velocity with NumPy array operations, streaming rows with server-side cursors
+and writing back with batched UPDATE ... FROM (VALUES ...)
+
+    python -m ai.forecast            # run once (schedule nightly with cron)
+"""
+from database.db import engine, bulk_update
+from resources.versioning import bump_data_version
+from resources.response_cache import invalidate_on_commit
+from observability.metrics import REGISTRY
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Dict, Tuple
+import numpy as np
+import os
+import time
+
+
+FORECAST_CHUNK_SIZE = int(os.getenv("FORECAST_CHUNK_SIZE", "20000"))
+FORECAST_WRITE_BATCH = int(os.getenv("FORECAST_WRITE_BATCH", "1000"))
+# Days of activity after which a resource's own pace fully replaces the user's overall pace
+VELOCITY_WARMUP_DAYS = 14.0
+MIN_HOURS_PER_DAY = 0.1
+DEFAULT_RESOURCE_HOURS = 20.0
+MAX_FORECAST_DAYS = 730
+
+FORECAST_RESOURCES = REGISTRY.counter("forecast_resources_total", "Resources re-forecast by the nightly mastery job")
+FORECAST_DURATION = REGISTRY.gauge("forecast_last_run_seconds", "Duration of the last mastery re-forecast run")
+
+USER_STATS_SQL = text("""
+    SELECT user_id,
+           SUM(COALESCE(hours_spent, 0)),
+           MIN(COALESCE(started_date, created_at)),
+           SUM(CASE WHEN progress_status = 'completed' THEN COALESCE(hours_spent, 0) ELSE 0 END),
+           SUM(CASE WHEN progress_status = 'completed' THEN 1 ELSE 0 END)
+    FROM resources
+    WHERE user_id IS NOT NULL
+    GROUP BY user_id
+    ORDER BY user_id
+""")
+
+IN_PROGRESS_SQL = text("""
+    SELECT id, user_id, estimated_hours, hours_spent, COALESCE(started_date, created_at)
+    FROM resources
+    WHERE progress_status = 'in_progress' AND user_id IS NOT NULL
+""")
+
+
+def _to_datetime64(values) -> np.ndarray:
+    return np.array(values, dtype="datetime64[s]")
+
+
+def _to_float(values) -> np.ndarray:
+    # NULLs become NaN
+    return np.array(values, dtype=np.float64)
+
+
+def _days_since(now: np.datetime64, started: np.ndarray) -> np.ndarray:
+    """Days since each timestamp (at least 1), NaN where it is NaT"""
+    elapsed = now - started
+    # NaT casts to a huge negative float, not NaN, so mask it explicitly
+    days = elapsed.astype(np.float64) / 86400.0
+    return np.where(np.isnat(elapsed), np.nan, np.maximum(days, 1.0))
+
+
+def user_velocity(now: np.datetime64, total_hours: np.ndarray, first_activity: np.ndarray,
+                  completed_hours: np.ndarray, completed_count: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-user (hours per day since first activity, average hours per completed resource)"""
+    days = np.nan_to_num(_days_since(now, first_activity), nan=1.0)
+    rate = np.nan_to_num(total_hours) / days
+    avg_completed = np.divide(
+        np.nan_to_num(completed_hours), completed_count,
+        out=np.zeros_like(completed_hours, dtype=np.float64), where=completed_count > 0
+    )
+    return rate, avg_completed
+
+
+def forecast_days(now: np.datetime64, estimated: np.ndarray, spent: np.ndarray, started: np.ndarray,
+                  user_rate: np.ndarray, user_avg_completed: np.ndarray) -> np.ndarray:
+    """
+    Days until completion for each resource. Pace blends the resource's own
+    velocity with the user's overall velocity, shifting towards the resource
+    as it accumulates history; the target is the estimate, else the user's
+    typical completed resource, else a default.
+    """
+    spent = np.nan_to_num(spent)
+    never_started = np.isnat(started)
+    days_active = np.nan_to_num(_days_since(now, started), nan=1.0)
+    own_rate = np.where(never_started, 0.0, spent / days_active)
+    weight = np.where(
+        (spent > 0) & ~never_started, np.clip(days_active / VELOCITY_WARMUP_DAYS, 0.0, 1.0), 0.0
+    )
+    rate = np.maximum(weight * own_rate + (1.0 - weight) * user_rate, MIN_HOURS_PER_DAY)
+
+    target = np.where(
+        estimated > 0, estimated,
+        np.where(user_avg_completed > 0, user_avg_completed, DEFAULT_RESOURCE_HOURS)
+    )
+    # Past the estimate but not done yet: assume a last stretch of 10%
+    remaining = np.maximum(target - spent, 0.1 * target)
+    return np.clip(np.ceil(remaining / rate), 1, MAX_FORECAST_DAYS).astype(np.int64)
+
+
+def _load_user_stats(conn, now: np.datetime64) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    ids, rates, averages = [], [], []
+    result = conn.execution_options(stream_results=True, max_row_buffer=FORECAST_CHUNK_SIZE).execute(USER_STATS_SQL)
+    for rows in result.partitions(FORECAST_CHUNK_SIZE):
+        user_ids, total_hours, first_activity, completed_hours, completed_count = zip(*rows)
+        rate, avg_completed = user_velocity(
+            now, _to_float(total_hours), _to_datetime64(first_activity),
+            _to_float(completed_hours), _to_float(completed_count)
+        )
+        ids.append(np.array(user_ids, dtype=np.int64))
+        rates.append(rate)
+        averages.append(avg_completed)
+    if not ids:
+        empty = np.array([], dtype=np.float64)
+        return np.array([], dtype=np.int64), empty, empty
+    return np.concatenate(ids), np.concatenate(rates), np.concatenate(averages)
+
+
+def _owner_stats(user_ids: np.ndarray, user_rates: np.ndarray, user_averages: np.ndarray,
+                 owners: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Look up each owner's velocity in the sorted user stats. Owners missing from
+    them (resources added after the stats were read) get no user history: a
+    zero rate and average, so forecast_days falls back to its defaults.
+    """
+    if not len(user_ids):
+        return np.zeros(len(owners)), np.zeros(len(owners))
+    index = np.minimum(np.searchsorted(user_ids, owners), len(user_ids) - 1)
+    found = user_ids[index] == owners
+    return np.where(found, user_rates[index], 0.0), np.where(found, user_averages[index], 0.0)
+
+
+def run_forecast(bind=engine) -> Dict:
+    """Re-forecast every in-progress resource; returns run statistics"""
+    started_at = time.perf_counter()
+    now = np.datetime64(datetime.utcnow().replace(microsecond=0), "s")
+    today = now.astype("datetime64[D]")
+    updated = 0
+
+    # Reads stream on their own connection: committing writes on the same one
+    # would close the server-side cursor
+    with bind.connect() as read_conn, Session(bind=bind) as write_db:
+        user_ids, user_rates, user_averages = _load_user_stats(read_conn, now)
+
+        result = read_conn.execution_options(stream_results=True, max_row_buffer=FORECAST_CHUNK_SIZE).execute(IN_PROGRESS_SQL)
+        for rows in result.partitions(FORECAST_CHUNK_SIZE):
+            ids, owners, estimated, spent, started = zip(*rows)
+            owner_rates, owner_averages = _owner_stats(
+                user_ids, user_rates, user_averages, np.array(owners, dtype=np.int64)
+            )
+            days = forecast_days(
+                now, _to_float(estimated), _to_float(spent), _to_datetime64(started),
+                owner_rates, owner_averages
+            )
+            mastery_dates = (today + days).astype("datetime64[s]").astype(object)
+
+            bulk_update(
+                write_db, "resources",
+                [{"id": resource_id, "ai_mastery_date": date} for resource_id, date in zip(ids, mastery_dates)],
+                casts={"id": "INTEGER"},
+                chunk_size=FORECAST_WRITE_BATCH
+            )
+            bump_data_version(write_db, *set(owners))
+            for owner in set(owners):
+                invalidate_on_commit(write_db, owner, "insights")
+            write_db.commit()
+            updated += len(ids)
+            FORECAST_RESOURCES.inc(len(ids))
+
+    elapsed = time.perf_counter() - started_at
+    FORECAST_DURATION.set(elapsed)
+    return {
+        "resources": updated,
+        "users": int(len(user_ids)),
+        "seconds": round(elapsed, 3),
+        "resources_per_minute": int(updated / elapsed * 60) if elapsed > 0 else 0,
+    }
+
+
+if __name__ == "__main__":
+    print(run_forecast())
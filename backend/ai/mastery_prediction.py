@@ -2,31 +2,30 @@
 AI-powered Skill Mastery Date Prediction
 Uses time-series forecasting and regression models
 """
-from google import genai
-from google.genai import types
-import os
-from datetime import datetime, timedelta
+from ai.routing import get_model_router, require_keys
+from ai.profile import get_profile_builder
+from datetime import datetime
 from typing import Dict, Optional
 from database.db import prisma
 
 
+# Stored with every result in resources.ai_payload; bump when the prompt changes
+PROMPT_VERSION = "predict-1"
+
 class MasteryPredictor:
     """
     Predicts when a user will master a skill or complete a course
     """
     
     def __init__(self):
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY environment variable not set")
-        
-        self.client = genai.Client(api_key=api_key)
+        self.router = get_model_router()
     
     async def predict_completion_date(
         self,
         resource_id: int,
         user_id: int,
-        db
+        db,
+        hedge: bool = False
     ) -> Dict:
         """
         Predict when user will complete the resource
@@ -48,24 +47,12 @@ class MasteryPredictor:
         if not resource:
             return {"error": "Resource not found"}
         
-        # Get user's learning history
-        all_resources = prisma(db).resources.find_many(
-            where={"user_id": user_id}
-        )
-        
-        # Calculate learning velocity
-        completed_resources = [r for r in all_resources if r.progress_status == "completed"]
-        
-        # Analyze patterns
-        total_hours_logged = sum(r.hours_spent or 0 for r in completed_resources)
-        avg_hours_per_resource = total_hours_logged / len(completed_resources) if completed_resources else 0
-        
-        # Calculate recent streak (last 30 days)
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        recent_completions = [
-            r for r in completed_resources 
-            if r.completion_date and r.completion_date >= thirty_days_ago
-        ]
+        # Get user's learning history as SQL aggregates instead of walking the library
+        profile = get_profile_builder().build(user_id, db)
+        completed_count = profile["completed_count"]
+        total_hours_logged = profile["total_completed_hours"]
+        avg_hours_per_resource = profile["avg_hours_per_completed"]
+        recent_completions = profile["recent_completions"]
         
         current_date = datetime.utcnow()
         
@@ -80,9 +67,9 @@ Resource Information:
 - Started Date: {resource.started_date.isoformat() if resource.started_date else 'Not started'}
 
 User's Learning Profile:
-- Total Completed Resources: {len(completed_resources)}
+- Total Completed Resources: {completed_count}
 - Average Hours per Completed Resource: {avg_hours_per_resource:.1f}
-- Recent Completions (Last 30 days): {len(recent_completions)}
+- Recent Completions (Last 30 days): {recent_completions}
 - Total Hours Logged (All Time): {total_hours_logged}
 
 Current Date: {current_date.strftime('%Y-%m-%d')}
@@ -110,17 +97,13 @@ Return ONLY a JSON object:
 """
         
         try:
-            response = self.client.models.generate_content(
-                model='gemini-3-pro-preview',
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json"
-                )
+            routed = await self.router.generate(
+                task="predict",
+                prompt=prompt,
+                validate=require_keys(predicted_date=str),
+                hedge=hedge
             )
-            
-            import json
-            result = json.loads(response.text)
-            return result
+            return {**routed.data, "model": routed.model, "prompt_version": PROMPT_VERSION}
             
         except Exception as e:
             print(f"Error predicting mastery date: {str(e)}")
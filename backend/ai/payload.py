@@ -0,0 +1,76 @@
+"""
+Stored AI Output
+Keeps the complete validated response of every AI task in resources.ai_payload
+(JSONB, GIN-indexed), keyed by task, together with the model and prompt version
+that produced it, so insights can be served without calling the LLM again
+"""
+from database.db import bulk_update
+from resources.versioning import bump_data_version
+from resources.response_cache import invalidate_on_commit
+from datetime import datetime
+from typing import Dict, List, Optional
+import json
+
+
+# Keys the AI services add to their results that describe the generation, not the output
+META_KEYS = ("model", "prompt_version")
+
+
+def payload_entry(result: Dict) -> Optional[Dict]:
+    """
+    Build the stored entry for one task result. Returns None for failed
+    generations (results carrying an "error"), which must never overwrite a good one.
+    """
+    if not result or "error" in result:
+        return None
+    return {
+        "output": {k: v for k, v in result.items() if k not in META_KEYS},
+        "model": result.get("model"),
+        "prompt_version": result.get("prompt_version"),
+        "generated_at": datetime.utcnow().isoformat(),
+    }
+
+
+def payload_assignment(db) -> Dict:
+    """
+    bulk_update arguments that merge v.ai_payload into the stored payload at the
+    top level, so writing one task's entry keeps the other tasks' entries
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return {
+            "casts": {"ai_payload": "JSONB"},
+            "assign": {"ai_payload": "COALESCE(resources.ai_payload, '{}'::jsonb) || v.ai_payload"},
+        }
+    # Local SQLite databases store JSON as text
+    return {"casts": {}, "assign": {"ai_payload": "json_patch(COALESCE(resources.ai_payload, '{}'), v.ai_payload)"}}
+
+
+def store_ai_results(db, user_id: int, task: str, rows: List[Dict]) -> int:
+    """
+    Write AI results for many resources in one set-based UPDATE.
+
+    rows: [{"id": resource_id, "result": {...service result...}, <column>: value, ...}]
+          Extra keys are plain column updates (ai_category, ai_tags, ...) applied in
+          the same statement. Does not commit.
+    """
+    updates = []
+    for row in rows:
+        entry = payload_entry(row["result"])
+        if entry is None:
+            continue
+        update = {k: v for k, v in row.items() if k != "result"}
+        update["ai_payload"] = json.dumps({task: entry}, default=str)
+        updates.append(update)
+    if not updates:
+        return 0
+
+    merge = payload_assignment(db)
+    bump_data_version(db, user_id)  # cached resource lists now show stale AI fields
+    invalidate_on_commit(db, user_id, "insights", *(update["id"] for update in updates))
+    return bulk_update(
+        db, "resources", updates,
+        casts={"id": "INTEGER", **merge["casts"]},
+        assign=merge["assign"],
+        where="resources.user_id = :user_id",
+        params={"user_id": user_id}
+    )
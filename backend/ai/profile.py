@@ -0,0 +1,160 @@
+"""
+Compact Learning Profiles
+Builds bounded prompt context from SQL aggregates plus the top-K most
+relevant history items, cached per user library version
+"""
+from database.models import User, Resources, ResourceType, ResourcePlatform
+from observability.metrics import CACHE_REQUESTS
+from cachetools import LRUCache
+from datetime import datetime, timedelta
+from sqlalchemy import case, func
+from typing import Dict, List
+import math
+import os
+
+
+PROFILE_TOKEN_BUDGET = int(os.getenv("AI_PROFILE_TOKEN_BUDGET", "400"))
+PROFILE_HISTORY_K = int(os.getenv("AI_PROFILE_HISTORY_K", "15"))
+PROFILE_CANDIDATES = int(os.getenv("AI_PROFILE_CANDIDATES", "20"))
+PROFILE_CACHE_SIZE = int(os.getenv("AI_PROFILE_CACHE_SIZE", "2048"))
+RECENCY_HALF_LIFE_DAYS = 30.0
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token) used for prompt budgeting"""
+    return max(1, len(text) // 4)
+
+
+class LearningProfileBuilder:
+    """
+    Replaces walking the whole library in Python with a few aggregate queries,
+    so prompt size and build time stay flat as the library grows
+    """
+
+    def __init__(self):
+        self.cache = LRUCache(maxsize=PROFILE_CACHE_SIZE)
+
+    def build(self, user_id: int, db) -> Dict:
+        version = db.query(User.library_version).filter(User.id == user_id).scalar() or 0
+        key = (user_id, version)
+        cached = self.cache.get(key)
+        if cached is not None:
+            CACHE_REQUESTS.inc(cache="learning_profile", result="hit")
+            return cached
+        CACHE_REQUESTS.inc(cache="learning_profile", result="miss")
+
+        profile = self._aggregate(user_id, db)
+        profile["version"] = version
+        profile.update(self._history(user_id, db))
+        profile["candidates"] = self._candidates(user_id, db)
+        self.cache[key] = profile
+        return profile
+
+    def _aggregate(self, user_id: int, db) -> Dict:
+        completed = Resources.progress_status == "completed"
+        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
+        row = db.query(
+            func.count(Resources.id),
+            func.sum(case((completed, 1), else_=0)),
+            func.sum(case((Resources.progress_status == "in_progress", 1), else_=0)),
+            func.avg(case((completed, Resources.rating))),
+            func.sum(case((completed, func.coalesce(Resources.hours_spent, 0)), else_=0)),
+            func.sum(case((completed & (Resources.completion_date >= thirty_days_ago), 1), else_=0)),
+        ).filter(Resources.user_id == user_id).one()
+
+        total, completed_count, in_progress_count, avg_rating, completed_hours, recent = row
+        completed_count = int(completed_count or 0)
+
+        preferred_types = dict(
+            db.query(ResourceType.name, func.count(Resources.id))
+            .join(Resources, Resources.resource_type_id == ResourceType.id)
+            .filter(Resources.user_id == user_id, completed)
+            .group_by(ResourceType.name)
+            .order_by(func.count(Resources.id).desc())
+            .limit(5)
+            .all()
+        )
+        preferred_platforms = dict(
+            db.query(ResourcePlatform.name, func.count(Resources.id))
+            .join(Resources, Resources.resource_platform_id == ResourcePlatform.id)
+            .filter(Resources.user_id == user_id, completed)
+            .group_by(ResourcePlatform.name)
+            .order_by(func.count(Resources.id).desc())
+            .limit(5)
+            .all()
+        )
+
+        return {
+            "total_resources": int(total or 0),
+            "completed_count": completed_count,
+            "in_progress_count": int(in_progress_count or 0),
+            "not_started_count": int(total or 0) - completed_count - int(in_progress_count or 0),
+            "preferred_types": preferred_types,
+            "preferred_platforms": preferred_platforms,
+            "average_rating": float(avg_rating or 0),
+            "total_completed_hours": float(completed_hours or 0),
+            "avg_hours_per_completed": float(completed_hours or 0) / completed_count if completed_count else 0.0,
+            "recent_completions": int(recent or 0),
+        }
+
+    def _history(self, user_id: int, db) -> Dict:
+        """
+        Pick the most relevant completed / in-progress names: score by recency
+        (exponential decay) and rating, then keep adding until the token budget is spent
+        """
+        last_touched = func.coalesce(Resources.completion_date, Resources.updated_at, Resources.created_at)
+        rows = (
+            db.query(Resources.name, Resources.progress_status, Resources.rating, last_touched)
+            .filter(Resources.user_id == user_id, Resources.progress_status.in_(["completed", "in_progress"]))
+            .order_by(last_touched.desc())
+            .limit(PROFILE_HISTORY_K * 4)
+            .all()
+        )
+
+        now = datetime.utcnow()
+        scored = []
+        for name, progress_status, rating, touched in rows:
+            age_days = max(0.0, (now - touched).total_seconds() / 86400) if touched else 365.0
+            recency = math.exp(-math.log(2) * age_days / RECENCY_HALF_LIFE_DAYS)
+            score = recency + (rating or 3) / 5
+            if progress_status == "in_progress":
+                score += 0.5  # current work is always relevant context
+            scored.append((score, name, progress_status))
+        scored.sort(key=lambda item: item[0], reverse=True)
+
+        completed: List[str] = []
+        in_progress: List[str] = []
+        spent = 0
+        for _, name, progress_status in scored[:PROFILE_HISTORY_K]:
+            cost = estimate_tokens(name or "") + 1
+            if spent + cost > PROFILE_TOKEN_BUDGET:
+                break
+            spent += cost
+            (completed if progress_status == "completed" else in_progress).append(name)
+
+        return {"completed_resources": completed, "in_progress_resources": in_progress}
+
+    def _candidates(self, user_id: int, db) -> List[Dict]:
+        rows = (
+            db.query(Resources.id, Resources.name, ResourceType.name, ResourcePlatform.name)
+            .outerjoin(ResourceType, Resources.resource_type_id == ResourceType.id)
+            .outerjoin(ResourcePlatform, Resources.resource_platform_id == ResourcePlatform.id)
+            .filter(Resources.user_id == user_id, Resources.progress_status == "not_started")
+            .order_by(Resources.created_at.desc())
+            .limit(PROFILE_CANDIDATES)
+            .all()
+        )
+        return [
+            {"id": resource_id, "name": name, "resource_type": type_name, "platform": platform_name}
+            for resource_id, name, type_name, platform_name in rows
+        ]
+
+
+# Singleton instance
+_profile_builder = None
+
+def get_profile_builder() -> LearningProfileBuilder:
+    global _profile_builder
+    if _profile_builder is None:
+        _profile_builder = LearningProfileBuilder()
+    return _profile_builder
@@ -0,0 +1,128 @@
+"""
+Precomputed Recommendations
+Serves materialized recommendations per user (stale-while-revalidate) and
+refreshes them in the background once resource writes bumped library_version
+"""
+from database.db import SessionLocal
+from database.models import User, UserRecommendations
+from ai.recommendations import get_recommendation_engine
+from observability.metrics import CACHE_REQUESTS
+from observability.request_context import log_event
+from sqlalchemy import text
+from datetime import datetime
+from typing import Dict, List
+import asyncio
+import json
+import logging
+import os
+
+
+logger = logging.getLogger("skillstack.recommendations")
+
+REFRESH_DEBOUNCE_SECONDS = float(os.getenv("RECOMMENDATIONS_REFRESH_DEBOUNCE", "5"))
+
+UPSERT_SQL = text("""
+    INSERT INTO user_recommendations (user_id, version, "limit", recommendations, computed_at)
+    VALUES (:user_id, :version, :limit, :recommendations, :computed_at)
+    ON CONFLICT (user_id)
+    DO UPDATE SET version = EXCLUDED.version, "limit" = EXCLUDED."limit",
+                  recommendations = EXCLUDED.recommendations, computed_at = EXCLUDED.computed_at
+    WHERE user_recommendations.version <= EXCLUDED.version
+""")
+
+
+def _current_version(db, user_id: int) -> int:
+    return db.query(User.library_version).filter(User.id == user_id).scalar() or 0
+
+
+async def compute_and_store(user_id: int, db, limit: int) -> List[Dict]:
+    """Run the recommendation engine and materialize its result for the version it saw"""
+    version = _current_version(db, user_id)
+    recommendations = await get_recommendation_engine().get_recommendations(
+        user_id=user_id,
+        db=db,
+        limit=limit,
+        raise_on_error=True  # never materialize a failed generation
+    )
+    # Upsert: two concurrent misses for the same user must not both INSERT, and a
+    # slow computation for an older version must not overwrite a newer result
+    db.execute(UPSERT_SQL, {
+        "user_id": user_id,
+        "version": version,
+        "limit": limit,
+        "recommendations": json.dumps(recommendations),
+        "computed_at": datetime.utcnow(),
+    })
+    db.commit()
+    return recommendations
+
+
+class RecommendationRefresher:
+    """
+    Debounced background refresh: the first stale read for a user schedules a
+    refresh after REFRESH_DEBOUNCE_SECONDS, and stale reads arriving before it
+    runs are folded into it, so a burst of edits costs one recompute.
+    """
+
+    def __init__(self, debounce: float = REFRESH_DEBOUNCE_SECONDS):
+        self.debounce = debounce
+        self.pending: Dict[int, asyncio.Task] = {}
+
+    def schedule(self, user_id: int, limit: int):
+        if user_id in self.pending:
+            return
+        task = asyncio.ensure_future(self._refresh(user_id, limit))
+        self.pending[user_id] = task
+        task.add_done_callback(lambda _: self.pending.pop(user_id, None))
+
+    async def _refresh(self, user_id: int, limit: int):
+        await asyncio.sleep(self.debounce)
+        db = SessionLocal()
+        try:
+            await compute_and_store(user_id, db, limit)
+        except Exception as e:
+            log_event(logger, "recommendations_refresh_failed", logging.ERROR, user_id=user_id, error=str(e))
+        finally:
+            db.close()
+
+
+# Singleton instance
+_recommendation_refresher = None
+
+def get_recommendation_refresher() -> RecommendationRefresher:
+    global _recommendation_refresher
+    if _recommendation_refresher is None:
+        _recommendation_refresher = RecommendationRefresher()
+    return _recommendation_refresher
+
+
+async def get_cached_recommendations(user_id: int, db, limit: int = 5, compute_missing: bool = True) -> Dict:
+    """
+    Return stored recommendations immediately. Only compute inline when nothing
+    usable is stored yet (and compute_missing allows it); otherwise a version
+    mismatch or a miss triggers a background refresh.
+    """
+    stored = db.query(UserRecommendations).filter(UserRecommendations.user_id == user_id).first()
+
+    if stored is None or (stored.limit or 0) < limit:
+        CACHE_REQUESTS.inc(cache="recommendations", result="miss")
+        if not compute_missing:
+            get_recommendation_refresher().schedule(user_id, limit)
+            return {
+                "recommendations": json.loads(stored.recommendations or "[]")[:limit] if stored else [],
+                "stale": True,
+                "computed_at": stored.computed_at if stored else None,
+            }
+        recommendations = await compute_and_store(user_id, db, limit)
+        return {"recommendations": recommendations[:limit], "stale": False, "computed_at": datetime.utcnow()}
+
+    stale = stored.version != _current_version(db, user_id)
+    CACHE_REQUESTS.inc(cache="recommendations", result="stale" if stale else "hit")
+    if stale:
+        get_recommendation_refresher().schedule(user_id, max(limit, stored.limit or 0))
+
+    return {
+        "recommendations": json.loads(stored.recommendations or "[]")[:limit],
+        "stale": stale,
+        "computed_at": stored.computed_at,
+    }
@@ -3,18 +3,34 @@ AI Features API Routes
 Handles all AI-powered features for the SkillStack application
 """
 from fastapi import APIRouter, Depends, HTTPException, status
-from pydantic import BaseModel
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, Field
 from typing import Optional, List, Dict
-from database.db import get_db, prisma
-from database.models import User
-from authentication.auth import get_current_user
-from ai.recommendations import get_recommendation_engine
+from database.db import get_db, prisma, SessionLocal
+from database.models import User, Resources, ResourceType, ResourcePlatform
+from authentication.auth import get_current_user, get_admin_user
 from ai.summarization import get_note_summarizer
 from ai.mastery_prediction import get_mastery_predictor
 from ai.categorization import get_auto_categorizer
+from ai.payload import store_ai_results
+from ai.forecast import run_forecast
+from ai.singleflight import get_singleflight, make_key
+from ai.routing import get_model_router
+from ai.recommendation_cache import get_cached_recommendations
+from ai.enrichment import get_enrichment_pipeline, ENRICHMENT_ENABLED
+from resources.response_cache import get_response_cache
+from observability.request_context import log_event
 from datetime import datetime
+import asyncio
+import logging
+import os
 
 router = APIRouter()
+logger = logging.getLogger("skillstack.ai")
+
+AI_BATCH_MAX_ITEMS = int(os.getenv("AI_BATCH_MAX_ITEMS", "200"))
+AI_BATCH_ITEMS_PER_PROMPT = int(os.getenv("AI_BATCH_ITEMS_PER_PROMPT", "10"))
+AI_BATCH_CONCURRENCY = int(os.getenv("AI_BATCH_CONCURRENCY", "4"))
 
 
 # Request/Response Models
@@ -33,8 +49,34 @@ class CategorizeResourceRequest(BaseModel):
     save_to_resource: bool = True
 
 
+class BatchResourcesRequest(BaseModel):
+    resource_ids: List[int] = Field(..., min_length=1, max_length=AI_BATCH_MAX_ITEMS)
+    save_to_resource: bool = True
+
+
 class RecommendationsResponse(BaseModel):
     recommendations: List[Dict]
+    stale: bool = False
+    computed_at: Optional[datetime] = None
+
+
+class StoredInsight(BaseModel):
+    output: Dict
+    model: Optional[str] = None
+    prompt_version: Optional[str] = None
+    generated_at: Optional[datetime] = None
+
+
+class InsightsResponse(BaseModel):
+    resource_id: int
+    resource_name: Optional[str] = None
+    ai_summary: Optional[str] = None
+    ai_tags: List[str] = []
+    ai_category: Optional[str] = None
+    ai_mastery_date: Optional[datetime] = None
+    categorization: Optional[StoredInsight] = None
+    summary: Optional[StoredInsight] = None
+    prediction: Optional[StoredInsight] = None
 
 
 # ================================================
@@ -49,16 +91,16 @@ async def get_personalized_recommendations(
     """
     Get AI-powered personalized resource recommendations
     Combines collaborative filtering and content-based filtering
+
+    Served from the per-user materialized result; a background refresh is
+    queued only when the user's library changed since it was computed
     """
     try:
-        engine = get_recommendation_engine()
-        recommendations = await engine.get_recommendations(
+        return await get_cached_recommendations(
             user_id=current_user.id,
             db=db,
             limit=limit
         )
-        
-        return {"recommendations": recommendations}
     
     except Exception as e:
         raise HTTPException(
@@ -100,26 +142,44 @@ async def summarize_resource_notes(
             detail="Resource has no notes to summarize"
         )
      
-    try:
+    resource_type = resource.resource_type.name if resource.resource_type else None
+    user_id, notes, name = current_user.id, resource.notes, resource.name
+
+    async def summarize():
         summarizer = get_note_summarizer()
         summary_result = await summarizer.summarize_notes(
-            notes=resource.notes,
-            resource_name=resource.name,
-            resource_type=resource.resource_type.name if resource.resource_type else None
+            notes=notes,
+            resource_name=name,
+            resource_type=resource_type,
+            hedge=True
         )
         
         # Optionally save to resource
         if request.save_to_resource and summary_result.get("summary"):
-            # Store summary and tags
+            # Store summary and tags, plus the full output in ai_payload
             tags_str = ", ".join(summary_result.get("key_concepts", []))
             
-            prisma(db).resources.update(
-                where={"id": request.resource_id},
-                data={
+            # Own session: waiters may outlive this request's, which closes with it
+            write_db = SessionLocal()
+            try:
+                store_ai_results(write_db, user_id, "summarize", [{
+                    "id": request.resource_id,
+                    "result": summary_result,
                     "ai_summary": summary_result["summary"],
                     "ai_tags": tags_str
-                }
-            )
+                }])
+                write_db.commit()
+            finally:
+                write_db.close()
+        return summary_result
+
+    try:
+        # Duplicate clicks / retries / tabs share one LLM call and one write-back
+        flight_key = make_key(
+            current_user.id, request.resource_id, "summarize",
+            resource.notes, resource.name, resource_type, request.save_to_resource
+        )
+        summary_result = await get_singleflight().do(flight_key, summarize)
         
         return {
             "resource_id": request.resource_id,
@@ -152,18 +212,22 @@ async def predict_skill_mastery(
         prediction = await predictor.predict_completion_date(
             resource_id=request.resource_id,
             user_id=current_user.id,
-            db=db
+            db=db,
+            hedge=True
         )
         
         # Optionally save prediction to resource
         if request.save_to_resource and prediction.get("predicted_date"):
             try:
                 predicted_datetime = datetime.fromisoformat(prediction["predicted_date"])
-                prisma(db).resources.update(
-                    where={"id": request.resource_id},
-                    data={"ai_mastery_date": predicted_datetime}
-                )
+                store_ai_results(db, current_user.id, "predict", [{
+                    "id": request.resource_id,
+                    "result": prediction,
+                    "ai_mastery_date": predicted_datetime
+                }])
+                db.commit()
             except:
+                db.rollback()
                 pass  # If date parsing fails, just don't save
         
         return {
@@ -206,27 +270,46 @@ async def auto_categorize_resource(
             detail="Resource not found"
         )
     
-    try:
+    resource_type = resource.resource_type.name if resource.resource_type else None
+    platform = resource.resource_platform.name if resource.resource_platform else None
+    user_id, name, description = current_user.id, resource.name, resource.description
+
+    async def categorize():
         categorizer = get_auto_categorizer()
         categorization = await categorizer.categorize_resource(
-            resource_name=resource.name,
-            description=resource.description,
-            resource_type=resource.resource_type.name if resource.resource_type else None,
-            platform=resource.resource_platform.name if resource.resource_platform else None
+            resource_name=name,
+            description=description,
+            resource_type=resource_type,
+            platform=platform,
+            hedge=True
         )
         
         # Optionally save to resource
-        if request.save_to_resource:
-            # Store category and tags
+        if request.save_to_resource and "error" not in categorization:
+            # Store category and tags, plus the full output in ai_payload
             tags_str = ", ".join(categorization.get("skill_tags", []))
             
-            prisma(db).resources.update(
-                where={"id": request.resource_id},
-                data={
+            # Own session: waiters may outlive this request's, which closes with it
+            write_db = SessionLocal()
+            try:
+                store_ai_results(write_db, user_id, "categorize", [{
+                    "id": request.resource_id,
+                    "result": categorization,
                     "ai_category": categorization.get("category"),
                     "ai_tags": tags_str
-                }
-            )
+                }])
+                write_db.commit()
+            finally:
+                write_db.close()
+        return categorization
+
+    try:
+        # Duplicate clicks / retries / tabs share one LLM call and one write-back
+        flight_key = make_key(
+            current_user.id, request.resource_id, "categorize",
+            resource.name, resource.description, resource_type, platform, request.save_to_resource
+        )
+        categorization = await get_singleflight().do(flight_key, categorize)
         
         return {
             "resource_id": request.resource_id,
@@ -244,7 +327,7 @@ async def auto_categorize_resource(
 # ================================================
 # 5. GET AI INSIGHTS FOR A RESOURCE
 # ================================================
-@router.get("/insights/{resource_id}")
+@router.get("/insights/{resource_id}", response_model=InsightsResponse)
 async def get_resource_insights(
     resource_id: int,
     current_user: User = Depends(get_current_user),
@@ -253,8 +336,15 @@ async def get_resource_insights(
     """
     Get all stored AI insights for a specific resource
     """
+    # Cached per resource until an AI task or an edit rewrites it
+    return get_response_cache().get_or_set(
+        current_user.id, "insights", lambda: _load_insights(db, current_user.id, resource_id), suffix=str(resource_id)
+    )
+
+
+def _load_insights(db, user_id: int, resource_id: int) -> Dict:
     resource = prisma(db).resources.find_first(
-        where={"id": resource_id, "user_id": current_user.id}
+        where={"id": resource_id, "user_id": user_id}
     )
     
     if not resource:
@@ -263,11 +353,190 @@ async def get_resource_insights(
             detail="Resource not found"
         )
     
-    return {
+    # Full outputs (subcategory, difficulty, related skills, technical terms,
+    # topics, confidence, ...) come from ai_payload; nothing is regenerated
+    payload = resource.ai_payload or {}
+    
+    return jsonable_encoder({
         "resource_id": resource.id,
         "resource_name": resource.name,
         "ai_summary": resource.ai_summary,
         "ai_tags": resource.ai_tags.split(", ") if resource.ai_tags else [],
         "ai_category": resource.ai_category,
-        "ai_mastery_date": resource.ai_mastery_date.isoformat() if resource.ai_mastery_date else None
+        "ai_mastery_date": resource.ai_mastery_date,
+        "categorization": payload.get("categorize"),
+        "summary": payload.get("summarize"),
+        "prediction": payload.get("predict")
+    })
+
+
+# ================================================
+# 6. MODEL ROUTING STATS (ADMIN)
+# ================================================
+@router.get("/routing/stats")
+async def get_routing_stats(admin: User = Depends(get_admin_user)):
+    """
+    Per-task model tier, latency budget, observed latency and validation failures
+    """
+    return {"tasks": get_model_router().get_stats()}
+
+
+# ================================================
+# 7. ENRICHMENT PIPELINE (ADMIN)
+# ================================================
+@router.post("/admin/enrichment/backfill")
+async def backfill_enrichment(
+    user_id: Optional[int] = None,
+    only_missing: bool = True,
+    admin: User = Depends(get_admin_user),
+    db = Depends(get_db)
+):
+    """
+    Queue a whole table (or one user's library) for background categorization
+    """
+    if not ENRICHMENT_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Enrichment is disabled (ENRICHMENT_ENABLED=false)"
+        )
+    queued = get_enrichment_pipeline().backfill(db, user_id=user_id, only_missing=only_missing)
+    return {"queued": queued, **get_enrichment_pipeline().status()}
+
+
+@router.get("/admin/enrichment/status")
+async def get_enrichment_status(admin: User = Depends(get_admin_user)):
+    """
+    Queue depth, lag and throughput counters of the enrichment worker
+    """
+    return get_enrichment_pipeline().status()
+
+
+# ================================================
+# 8. BATCH CATEGORIZATION & SUMMARIZATION
+# ================================================
+def _load_batch_rows(db, user_id: int, resource_ids: List[int]):
+    """Load every requested resource the user owns, with type and platform names, in one query"""
+    return (
+        db.query(Resources.id, Resources.name, Resources.description, Resources.notes,
+                 ResourceType.name, ResourcePlatform.name)
+        .outerjoin(ResourceType, Resources.resource_type_id == ResourceType.id)
+        .outerjoin(ResourcePlatform, Resources.resource_platform_id == ResourcePlatform.id)
+        .filter(Resources.user_id == user_id, Resources.id.in_(set(resource_ids)))
+        .all()
+    )
+
+
+@router.post("/categorize/batch")
+async def auto_categorize_resources_batch(
+    request: BatchResourcesRequest,
+    current_user: User = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """
+    Categorize up to AI_BATCH_MAX_ITEMS resources: several resources per LLM
+    request, prompts sent with bounded concurrency, one set-based write-back
+    """
+    rows = _load_batch_rows(db, current_user.id, request.resource_ids)
+    found = {row[0] for row in rows}
+    items = [
+        {"id": resource_id, "name": name, "description": description,
+         "resource_type": type_name, "platform": platform_name}
+        for resource_id, name, description, _, type_name, platform_name in rows
+    ]
+
+    categorizer = get_auto_categorizer()
+    semaphore = asyncio.Semaphore(AI_BATCH_CONCURRENCY)
+
+    async def categorize_chunk(chunk: List[Dict]) -> Dict[int, Dict]:
+        async with semaphore:
+            try:
+                return await categorizer.categorize_resources(chunk)
+            except Exception as e:
+                log_event(
+                    logger, "batch_categorize_failed", logging.ERROR,
+                    user_id=current_user.id, items=len(chunk), error=str(e)
+                )
+                return {}
+
+    chunks = [items[i:i + AI_BATCH_ITEMS_PER_PROMPT] for i in range(0, len(items), AI_BATCH_ITEMS_PER_PROMPT)]
+    categorizations: Dict[int, Dict] = {}
+    for chunk_result in await asyncio.gather(*(categorize_chunk(chunk) for chunk in chunks)):
+        categorizations.update(chunk_result)
+
+    if request.save_to_resource and categorizations:
+        store_ai_results(db, current_user.id, "categorize", [
+            {"id": resource_id, "result": result, "ai_category": result.get("category"),
+             "ai_tags": ", ".join(result.get("skill_tags", []))}
+            for resource_id, result in categorizations.items()
+        ])
+        db.commit()
+
+    names = {item["id"]: item["name"] for item in items}
+    return {
+        "results": [
+            {"resource_id": resource_id, "resource_name": names[resource_id], **result}
+            for resource_id, result in categorizations.items()
+        ],
+        "failed": sorted(found - categorizations.keys()),
+        "not_found": sorted(set(request.resource_ids) - found),
+    }
+
+
+@router.post("/summarize-notes/batch")
+async def summarize_resource_notes_batch(
+    request: BatchResourcesRequest,
+    current_user: User = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """
+    Summarize notes of up to AI_BATCH_MAX_ITEMS resources: notes are long, so
+    each resource gets its own request, fanned out with bounded concurrency,
+    and all summaries are persisted with one set-based write-back
+    """
+    rows = _load_batch_rows(db, current_user.id, request.resource_ids)
+    found = {row[0] for row in rows}
+    with_notes = [row for row in rows if row[3]]
+
+    summarizer = get_note_summarizer()
+    semaphore = asyncio.Semaphore(AI_BATCH_CONCURRENCY)
+
+    async def summarize(row):
+        resource_id, name, _, notes, type_name, _ = row
+        async with semaphore:
+            result = await summarizer.summarize_notes(notes=notes, resource_name=name, resource_type=type_name)
+        return resource_id, name, result
+
+    summaries = await asyncio.gather(*(summarize(row) for row in with_notes))
+    succeeded = [(resource_id, name, result) for resource_id, name, result in summaries
+                 if result.get("summary") and "error" not in result]
+
+    if request.save_to_resource and succeeded:
+        store_ai_results(db, current_user.id, "summarize", [
+            {"id": resource_id, "result": result, "ai_summary": result["summary"],
+             "ai_tags": ", ".join(result.get("key_concepts", []))}
+            for resource_id, _, result in succeeded
+        ])
+        db.commit()
+
+    succeeded_ids = {resource_id for resource_id, _, _ in succeeded}
+    return {
+        "results": [
+            {"resource_id": resource_id, "resource_name": name, **result}
+            for resource_id, name, result in succeeded
+        ],
+        "failed": sorted({row[0] for row in with_notes} - succeeded_ids),
+        "without_notes": sorted(found - {row[0] for row in with_notes}),
+        "not_found": sorted(set(request.resource_ids) - found),
     }
+
+
+# ================================================
+# 9. MASTERY RE-FORECAST (ADMIN)
+# ================================================
+@router.post("/admin/forecast/run")
+async def run_mastery_forecast(admin: User = Depends(get_admin_user)):
+    """
+    Run the nightly vectorized mastery re-forecast now (normally scheduled
+    with `python -m ai.forecast`)
+    """
+    return await asyncio.to_thread(run_forecast)
@@ -0,0 +1,200 @@
+"""
+Per-task Model Routing
+Maps each AI task to a model tier within a latency budget and falls back
+from the fast tier to the strong tier when the output fails JSON validation
+"""
+from google.genai import types
+from ai.client import get_gemini_client, LatencyTracker
+from observability.metrics import AI_FALLBACKS, AI_VALIDATION_FAILURES
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+import asyncio
+import json
+import os
+
+
+# Override with AI_MODEL_FAST / AI_MODEL_STRONG
+MODEL_TIERS = {
+    "fast": os.getenv("AI_MODEL_FAST", "gemini-2.5-flash"),
+    "strong": os.getenv("AI_MODEL_STRONG", "gemini-3-pro-preview"),
+}
+
+# Override per task with AI_ROUTE_<TASK>=fast|strong
+DEFAULT_TASK_TIERS = {
+    "categorize": "fast",
+    "categorize_batch": "fast",
+    "summarize": "fast",
+    "predict": "fast",
+    "recommend": "strong",
+}
+
+
+class ValidationError(Exception):
+    """Raised when a model's output doesn't parse or doesn't match the expected shape"""
+
+
+@dataclass
+class Route:
+    task: str
+    tier: str
+    model: str
+    budget: float
+
+
+@dataclass
+class RoutedResult:
+    data: Any
+    model: str
+    tier: str
+    latency: float
+    fallback: bool = False
+
+
+def require_keys(**expected: type) -> Callable[[Any], None]:
+    """Validator for a JSON object that must contain the given keys with the given types"""
+    def validate(data: Any):
+        if not isinstance(data, dict):
+            raise ValidationError(f"expected an object, got {type(data).__name__}")
+        for key, expected_type in expected.items():
+            if not isinstance(data.get(key), expected_type):
+                raise ValidationError(f"'{key}' missing or not {expected_type.__name__}")
+    return validate
+
+
+def require_list_of(**expected: type) -> Callable[[Any], None]:
+    """Validator for a JSON array whose items must contain the given keys"""
+    item_validator = require_keys(**expected)
+
+    def validate(data: Any):
+        if not isinstance(data, list):
+            raise ValidationError(f"expected an array, got {type(data).__name__}")
+        for item in data:
+            item_validator(item)
+    return validate
+
+
+class ModelRouter:
+    """
+    Routes generate_content calls to the configured tier and records
+    per-task latency and validation stats used to tune the routing
+    """
+
+    def __init__(self):
+        self.client = get_gemini_client()
+        self.latencies = LatencyTracker(window=500, min_samples=1)
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def route_for(self, task: str) -> Route:
+        tier = os.getenv(f"AI_ROUTE_{task.upper()}", DEFAULT_TASK_TIERS.get(task, "strong"))
+        if tier not in MODEL_TIERS:
+            tier = "strong"
+        return Route(task=task, tier=tier, model=MODEL_TIERS[tier], budget=self.client.timeout_for(task))
+
+    def _count(self, task: str, name: str):
+        task_stats = self.stats.setdefault(
+            task, {"calls": 0, "validation_failures": 0, "fallbacks": 0, "errors": 0}
+        )
+        task_stats[name] += 1
+
+    async def _attempt(self, route: Route, prompt: str, validate: Optional[Callable], hedge: bool):
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        self._count(route.task, "calls")
+        try:
+            response = await self.client.generate_content(
+                task=route.task,
+                model=route.model,
+                contents=prompt,
+                config=types.GenerateContentConfig(
+                    response_mime_type="application/json"
+                ),
+                timeout=route.budget,
+                hedge=hedge
+            )
+        except Exception:
+            self._count(route.task, "errors")
+            raise
+        latency = loop.time() - started
+        self.latencies.record(f"{route.task}:{route.tier}", latency)
+
+        try:
+            data = json.loads(response.text)
+            if validate:
+                validate(data)
+        except (ValueError, TypeError, ValidationError) as e:
+            self._count(route.task, "validation_failures")
+            AI_VALIDATION_FAILURES.inc(task=route.task, model=route.model)
+            raise ValidationError(str(e)) from e
+        return RoutedResult(data=data, model=route.model, tier=route.tier, latency=latency)
+
+    async def generate(
+        self,
+        task: str,
+        prompt: str,
+        validate: Optional[Callable[[Any], None]] = None,
+        hedge: bool = False
+    ) -> RoutedResult:
+        """
+        Run the prompt on the task's tier, retrying once on the strong tier if validation fails.
+        Hedging doubles calls at the tail, so only interactive routes opt in.
+        """
+        route = self.route_for(task)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            return await self._attempt(route, prompt, validate, hedge)
+        except ValidationError:
+            if route.tier == "strong":
+                raise
+        # The fallback shares the request's budget instead of getting a fresh one
+        remaining = route.budget - (loop.time() - started)
+        if remaining <= 0:
+            raise asyncio.TimeoutError()
+        self._count(task, "fallbacks")
+        AI_FALLBACKS.inc(task=task)
+        strong = Route(task=task, tier="strong", model=MODEL_TIERS["strong"], budget=remaining)
+        result = await self._attempt(strong, prompt, validate, hedge)
+        result.fallback = True
+        return result
+
+    async def generate_json(
+        self,
+        task: str,
+        prompt: str,
+        validate: Optional[Callable[[Any], None]] = None,
+        hedge: bool = False
+    ) -> Any:
+        return (await self.generate(task, prompt, validate, hedge)).data
+
+    def get_stats(self) -> Dict:
+        tasks = set(DEFAULT_TASK_TIERS) | set(self.stats)
+        report = {}
+        for task in sorted(tasks):
+            route = self.route_for(task)
+            latency = {}
+            for tier in MODEL_TIERS:
+                key = f"{task}:{tier}"
+                if self.latencies.samples.get(key):
+                    latency[tier] = {
+                        "samples": len(self.latencies.samples[key]),
+                        "p50": self.latencies.percentile(key, 50),
+                        "p95": self.latencies.percentile(key, 95),
+                    }
+            report[task] = {
+                "tier": route.tier,
+                "model": route.model,
+                "budget_seconds": route.budget,
+                "latency": latency,
+                **self.stats.get(task, {"calls": 0, "validation_failures": 0, "fallbacks": 0, "errors": 0}),
+            }
+        return report
+
+
+# Singleton instance
+_model_router = None
+
+def get_model_router() -> ModelRouter:
+    global _model_router
+    if _model_router is None:
+        _model_router = ModelRouter()
+    return _model_router
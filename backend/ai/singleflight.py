@@ -0,0 +1,130 @@
+"""
+Singleflight request coalescing for AI calls
+Concurrent identical requests share one in-flight LLM call and its result
+"""
+from database.db import engine
+from observability.metrics import CACHE_REQUESTS
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict
+import asyncio
+import hashlib
+import json
+import os
+
+
+def make_key(user_id: int, resource_id: int, task: str, *inputs) -> str:
+    """Build a coalescing key from (user, resource, task, hash of the inputs)"""
+    input_hash = hashlib.sha256(json.dumps(inputs, default=str).encode()).hexdigest()[:32]
+    return f"{user_id}:{resource_id}:{task}:{input_hash}"
+
+
+class SingleFlight:
+    """
+    In-process coalescing: the first caller for a key starts the work as a task,
+    later callers with the same key await that task instead of starting their own.
+
+    With SINGLEFLIGHT_MODE=advisory the leader additionally takes a Postgres
+    advisory lock on the key and publishes its result to ai_request_results,
+    so duplicates arriving on other workers wait for the lock and reuse it.
+    The session-level lock pins its connection for the whole LLM call, so
+    those connections come from a small pool of their own
+    (SINGLEFLIGHT_LOCK_POOL_SIZE) instead of the one requests use; when it's
+    exhausted the call runs uncoordinated rather than waiting.
+    """
+
+    def __init__(self):
+        self.mode = os.getenv("SINGLEFLIGHT_MODE", "local")
+        self.result_ttl = float(os.getenv("SINGLEFLIGHT_RESULT_TTL", "30"))
+        self.lock_poll_interval = float(os.getenv("SINGLEFLIGHT_LOCK_POLL", "0.1"))
+        self.lock_pool_size = int(os.getenv("SINGLEFLIGHT_LOCK_POOL_SIZE", "4"))
+        self.lock_engine = None
+        self.calls: Dict[str, asyncio.Task] = {}
+        self.stats = {"leaders": 0, "coalesced": 0, "shared_results": 0}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self.calls.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+            CACHE_REQUESTS.inc(cache="singleflight", result="hit")
+        else:
+            self.stats["leaders"] += 1
+            CACHE_REQUESTS.inc(cache="singleflight", result="miss")
+            work = self._run_with_advisory_lock(key, fn) if self.mode == "advisory" else fn()
+            # Run as its own task so a disconnecting leader doesn't cancel everyone's result
+            task = asyncio.ensure_future(work)
+            self.calls[key] = task
+            task.add_done_callback(lambda _: self.calls.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _run_with_advisory_lock(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        lock_id = int.from_bytes(hashlib.sha256(key.encode()).digest()[:8], "big", signed=True)
+        if self.lock_engine is None:
+            self.lock_engine = create_engine(
+                engine.url, pool_size=self.lock_pool_size, max_overflow=0, pool_timeout=0.1
+            )
+        try:
+            conn = await asyncio.to_thread(self.lock_engine.connect)
+        except PoolTimeoutError:
+            CACHE_REQUESTS.inc(cache="singleflight_shared", result="bypass")
+            return await fn()
+        try:
+            # Poll with try-lock instead of blocking a threadpool thread on pg_advisory_lock
+            while not await asyncio.to_thread(
+                lambda: conn.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": lock_id}).scalar()
+            ):
+                await asyncio.sleep(self.lock_poll_interval)
+
+            try:
+                shared = await asyncio.to_thread(self._load_shared_result, conn, key)
+                if shared is not None:
+                    self.stats["shared_results"] += 1
+                    CACHE_REQUESTS.inc(cache="singleflight_shared", result="hit")
+                    return shared
+                CACHE_REQUESTS.inc(cache="singleflight_shared", result="miss")
+
+                result = await fn()
+                # A failure is not worth sharing; the next worker should try the call itself
+                if not (isinstance(result, dict) and "error" in result):
+                    await asyncio.to_thread(self._store_shared_result, conn, key, result)
+                return result
+            finally:
+                await asyncio.to_thread(
+                    lambda: conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": lock_id})
+                )
+        finally:
+            await asyncio.to_thread(conn.close)
+
+    def _load_shared_result(self, conn, key: str):
+        row = conn.execute(
+            text("SELECT result FROM ai_request_results WHERE key = :key AND created_at >= :since"),
+            {"key": key, "since": datetime.utcnow() - timedelta(seconds=self.result_ttl)}
+        ).first()
+        conn.commit()
+        return json.loads(row[0]) if row else None
+
+    def _store_shared_result(self, conn, key: str, result: Any):
+        conn.execute(
+            text("""
+                INSERT INTO ai_request_results (key, result, created_at)
+                VALUES (:key, :result, :now)
+                ON CONFLICT (key) DO UPDATE SET result = EXCLUDED.result, created_at = EXCLUDED.created_at
+            """),
+            {"key": key, "result": json.dumps(result, default=str), "now": datetime.utcnow()}
+        )
+        conn.execute(
+            text("DELETE FROM ai_request_results WHERE created_at < :cutoff"),
+            {"cutoff": datetime.utcnow() - timedelta(seconds=self.result_ttl)}
+        )
+        conn.commit()
+
+
+# Singleton instance
+_singleflight = None
+
+def get_singleflight() -> SingleFlight:
+    global _singleflight
+    if _singleflight is None:
+        _singleflight = SingleFlight()
+    return _singleflight
@@ -2,33 +2,122 @@
 AI-powered Note Summarization and Key Concept Extraction
 Uses NLP for abstractive summarization and extractive key concepts
 """
-from google import genai
-from google.genai import types
-import os
+from ai.routing import get_model_router, require_keys
+from observability.metrics import CACHE_REQUESTS
+from observability.request_context import log_event
+from cachetools import LRUCache
 from typing import Dict, List
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+
+
+logger = logging.getLogger("skillstack.summarization")
+
+# Notes longer than this are summarized with map-reduce over chunks
+CHUNK_THRESHOLD_CHARS = int(os.getenv("AI_SUMMARY_CHUNK_THRESHOLD", "6000"))
+CHUNK_MIN_CHARS = int(os.getenv("AI_SUMMARY_CHUNK_MIN", "1500"))
+CHUNK_MAX_CHARS = int(os.getenv("AI_SUMMARY_CHUNK_MAX", "4000"))
+CHUNK_CONCURRENCY = int(os.getenv("AI_SUMMARY_CONCURRENCY", "4"))
+CHUNK_CACHE_SIZE = int(os.getenv("AI_SUMMARY_CACHE_SIZE", "4096"))
+
+# Bump when the chunk prompt changes so stale cached partials are ignored
+CHUNK_PROMPT_VERSION = "1"
+
+# Stored with every result in resources.ai_payload; bump when any summary prompt changes
+PROMPT_VERSION = f"summarize-1.{CHUNK_PROMPT_VERSION}"
+
+HEADING_PATTERN = re.compile(r"^\s*(#{1,6}\s|[A-Z][^\n]{0,80}:\s*$)")
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+")
+
+
+def _split_long_paragraph(paragraph: str, max_chars: int) -> List[str]:
+    """Split an oversized paragraph on sentence boundaries, hard-cutting as a last resort"""
+    pieces = []
+    current = ""
+    for sentence in SENTENCE_PATTERN.split(paragraph):
+        while len(sentence) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if current and len(current) + len(sentence) + 1 > max_chars:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_into_chunks(notes: str, min_chars: int = CHUNK_MIN_CHARS, max_chars: int = CHUNK_MAX_CHARS) -> List[str]:
+    """
+    Split notes into semantic chunks along paragraph and heading boundaries.
+
+    Once a chunk has reached min_chars it is closed before a heading or after a
+    paragraph whose content hash picks it as a boundary. Because boundaries
+    depend on content rather than on absolute offsets, an edit only shifts
+    chunks up to the next hash-selected paragraph, where boundaries
+    resynchronize; the chunk hashes after that stay stable for the cache.
+    """
+    paragraphs = []
+    for paragraph in re.split(r"\n\s*\n", notes):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) > max_chars:
+            paragraphs.extend(_split_long_paragraph(paragraph, max_chars))
+        else:
+            paragraphs.append(paragraph)
+
+    chunks = []
+    current: List[str] = []
+    size = 0
+    for paragraph in paragraphs:
+        starts_section = bool(HEADING_PATTERN.match(paragraph))
+        if current and (size + len(paragraph) > max_chars or (starts_section and size >= min_chars)):
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+
+        current.append(paragraph)
+        size += len(paragraph) + 2
+
+        digest = hashlib.sha1(paragraph.encode()).digest()
+        if size >= min_chars and digest[0] % 2 == 0:
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
 
 
 class NoteSummarizer:
     """
     Processes user notes and generates summaries with key concepts
     """
-    
+
     def __init__(self):
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY environment variable not set")
-        
-        self.client = genai.Client(api_key=api_key)
-    
+        self.router = get_model_router()
+        # Partial summaries keyed by chunk hash, so an edit re-summarizes only its chunk
+        self.chunk_cache = LRUCache(maxsize=CHUNK_CACHE_SIZE)
+
     async def summarize_notes(
-        self, 
+        self,
         notes: str,
         resource_name: str,
-        resource_type: str = None
+        resource_type: str = None,
+        hedge: bool = False
     ) -> Dict:
         """
-        Generate summary and extract key concepts from user notes
-        
+        Generate summary and extract key concepts from user notes.
+        Only the single-prompt path hedges; chunked notes never do.
+
         Returns:
             {
                 "summary": "concise summary",
@@ -37,7 +126,7 @@ class NoteSummarizer:
                 "main_topics": ["topic1", "topic2", ...]
             }
         """
-        
+
         if not notes or len(notes.strip()) < 20:
             return {
                 "summary": "",
@@ -45,7 +134,34 @@ class NoteSummarizer:
                 "technical_terms": {},
                 "main_topics": []
             }
-        
+
+        try:
+            if len(notes) > CHUNK_THRESHOLD_CHARS:
+                return await self._summarize_chunked(notes, resource_name, resource_type)
+            return await self._summarize_single(notes, resource_name, resource_type, hedge)
+
+        except Exception as e:
+            log_event(logger, "summarization_failed", logging.ERROR, resource=resource_name, error=str(e))
+            return {
+                "summary": "",
+                "key_concepts": [],
+                "technical_terms": {},
+                "main_topics": [],
+                "error": str(e)
+            }
+
+    async def _generate(self, prompt: str, hedge: bool = False) -> Dict:
+        """Run a summary prompt; the result carries the model that produced it"""
+        routed = await self.router.generate(
+            task="summarize",
+            prompt=prompt,
+            validate=require_keys(summary=str, key_concepts=list),
+            hedge=hedge
+        )
+        return {**routed.data, "model": routed.model, "prompt_version": PROMPT_VERSION}
+
+    async def _summarize_single(self, notes: str, resource_name: str, resource_type: str = None,
+                                hedge: bool = False) -> Dict:
         prompt = f"""
 You are an expert technical learning assistant analyzing student notes.
 
@@ -72,30 +188,93 @@ Return ONLY a JSON object in this exact format:
   "main_topics": ["topic1", "topic2", "topic3"]
 }}
 """
-        
+        return await self._generate(prompt, hedge)
+
+    async def _summarize_chunked(self, notes: str, resource_name: str, resource_type: str = None) -> Dict:
+        """Map: summarize chunks concurrently (cached by hash). Reduce: merge the partials."""
+        chunks = split_into_chunks(notes)
+        semaphore = asyncio.Semaphore(CHUNK_CONCURRENCY)
+
+        async def summarize_chunk(index: int, chunk: str) -> Dict:
+            key = hashlib.sha256(f"{CHUNK_PROMPT_VERSION}\0{resource_name}\0{chunk}".encode()).hexdigest()
+            cached = self.chunk_cache.get(key)
+            if cached is not None:
+                CACHE_REQUESTS.inc(cache="summary_chunks", result="hit")
+                return cached
+            CACHE_REQUESTS.inc(cache="summary_chunks", result="miss")
+
+            async with semaphore:
+                partial = await self._generate(f"""
+You are an expert technical learning assistant analyzing one section of a student's notes.
+
+Resource: {resource_name}
+Section {index + 1} of {len(chunks)}:
+{chunk}
+
+Task: Summarize only this section. Provide:
+1. A 1-2 sentence summary of this section
+2. Key technical concepts mentioned (up to 8 items)
+3. Technical terms with brief definitions (as a dictionary)
+4. Topics covered (up to 3)
+
+Return ONLY a JSON object in this exact format:
+{{
+  "summary": "1-2 sentence summary",
+  "key_concepts": ["concept1", "concept2"],
+  "technical_terms": {{"term1": "brief definition"}},
+  "main_topics": ["topic1"]
+}}
+""")
+            self.chunk_cache[key] = partial
+            return partial
+
+        partials = await asyncio.gather(*(summarize_chunk(i, chunk) for i, chunk in enumerate(chunks)))
+
+        reduce_input = json.dumps([
+            {"section": i + 1, "summary": p.get("summary", ""), "key_concepts": p.get("key_concepts", []),
+             "main_topics": p.get("main_topics", [])}
+            for i, p in enumerate(partials)
+        ])
+        merged_terms = {}
+        for partial in partials:
+            merged_terms.update(partial.get("technical_terms") or {})
+
         try:
-            response = self.client.models.generate_content(
-                model='gemini-3-pro-preview',
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json"
-                )
-            )
-            
-            import json
-            result = json.loads(response.text)
-            return result
-            
+            result = await self._generate(f"""
+You are an expert technical learning assistant combining section summaries of a student's notes.
+
+Resource: {resource_name}
+Type: {resource_type or "Unknown"}
+
+Section summaries (JSON):
+{reduce_input}
+
+Task: Combine the sections into one analysis:
+1. A concise 2-3 sentence summary capturing the main learning points of all sections
+2. The most important key technical concepts overall (5-10 items)
+3. Main topics covered (3-5 broad categories)
+
+Return ONLY a JSON object in this exact format:
+{{
+  "summary": "2-3 sentence summary here",
+  "key_concepts": ["concept1", "concept2", "concept3"],
+  "main_topics": ["topic1", "topic2", "topic3"]
+}}
+""")
         except Exception as e:
-            print(f"Error summarizing notes: {str(e)}")
-            return {
-                "summary": "",
-                "key_concepts": [],
-                "technical_terms": {},
-                "main_topics": [],
-                "error": str(e)
+            # The partials are still useful; fall back to a local merge
+            log_event(logger, "summary_reduce_failed", logging.ERROR, chunks=len(partials), error=str(e))
+            result = {
+                "summary": " ".join(p.get("summary", "") for p in partials).strip(),
+                "key_concepts": list(dict.fromkeys(c for p in partials for c in p.get("key_concepts", [])))[:10],
+                "main_topics": list(dict.fromkeys(t for p in partials for t in p.get("main_topics", [])))[:5],
+                "model": partials[0].get("model") if partials else None,
+                "prompt_version": PROMPT_VERSION,
             }
 
+        result["technical_terms"] = merged_terms
+        return result
+
 
 # Singleton instance
 _note_summarizer = None
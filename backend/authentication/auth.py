@@ -2,6 +2,7 @@ from database.db import prisma
 from database.db import get_db
 from fastapi import APIRouter, Depends
 from database.models import User
+from observability.request_timing import timed
 import hashlib
 import os
 from datetime import datetime, timedelta
@@ -20,6 +21,9 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 5
 REFRESH_TOKEN_EXPIRE_DAYS = 30
 
+# Comma-separated list of emails allowed to use admin endpoints
+ADMIN_EMAILS = {email.strip().lower() for email in os.getenv("ADMIN_EMAILS", "").split(",") if email.strip()}
+
 router = APIRouter()
 
 class SignupRequest(BaseModel):
@@ -51,20 +55,29 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db=Depends(get_d
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        token_type: str = payload.get("type")
+    with timed("auth"):
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            email: str = payload.get("sub")
+            token_type: str = payload.get("type")
+            
+            if email is None or token_type != "access":
+                raise credentials_exception
+        except JWTError:
+            raise credentials_exception
         
-        if email is None or token_type != "access":
+        user = prisma(db).user.find_first(where={"email": email})
+        if user is None:
             raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    
-    user = prisma(db).user.find_first(where={"email": email})
-    if user is None:
-        raise credentials_exception
-    return user
+        return user
+
+async def get_admin_user(current_user: User = Depends(get_current_user)):
+    if (current_user.email or "").lower() not in ADMIN_EMAILS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required",
+        )
+    return current_user
 
 def create_jwt_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Load test for the resilient Gemini client against fake_llm_server.py
+
+    uvicorn fake_llm_server:app --port 8001 &
+    GEMINI_API_KEY=fake GEMINI_BASE_URL=http://localhost:8001 \
+        python -m benchmarks.ai_client_load --requests 500 --concurrency 50
+"""
+from google.genai import types
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.client import get_gemini_client
+
+
+PROMPT = "You are an expert learning content classifier analyzing educational resources."
+
+
+async def run(total: int, concurrency: int, task: str, hedge: bool):
+    client = get_gemini_client()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    outcomes = {}
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await client.generate_content(
+                    task=task,
+                    model="gemini-3-pro-preview",
+                    contents=PROMPT,
+                    config=types.GenerateContentConfig(response_mime_type="application/json"),
+                    hedge=hedge
+                )
+                outcome = "ok"
+            except Exception as e:
+                outcome = type(e).__name__
+            latencies.append(time.perf_counter() - started)
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000
+    print(f"requests: {total} in {elapsed:.2f}s ({total / elapsed:.1f} req/s)")
+    print(f"latency ms: p50={pct(50):.0f} p95={pct(95):.0f} p99={pct(99):.0f} max={latencies[-1] * 1000:.0f}")
+    print(f"outcomes: {outcomes}")
+    print(f"breaker: {client.breaker.state}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--task", default="categorize")
+    parser.add_argument("--hedge", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.concurrency, args.task, args.hedge))
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Throughput of the nightly mastery re-forecast (ai/forecast.py)
+
+    python -m benchmarks.forecast_throughput --compute-rows 1000000 --db-rows 200000
+
+Measures the vectorized forecast math on synthetic arrays, then an end-to-end
+run (streamed read, forecast, batched write-back) against a SQLite file in WAL
+mode so it runs without Postgres. Point DATABASE_URL at Postgres and pass
+--use-database-url to measure the real thing on an already seeded database.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event, text
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import numpy as np
+from database.models import Base
+from ai.forecast import forecast_days, run_forecast
+
+
+def bench_compute(rows: int):
+    rng = np.random.default_rng(0)
+    now = np.datetime64(datetime.utcnow().replace(microsecond=0), "s")
+    estimated = np.where(rng.random(rows) < 0.3, np.nan, rng.integers(1, 80, rows).astype(np.float64))
+    spent = rng.random(rows) * 40
+    started = now - rng.integers(0, 400 * 86400, rows).astype("timedelta64[s]")
+    user_rate = rng.random(rows) * 3
+    user_avg = rng.random(rows) * 30
+
+    started_at = time.perf_counter()
+    days = forecast_days(now, estimated, spent, started, user_rate, user_avg)
+    elapsed = time.perf_counter() - started_at
+    print(f"compute   {rows:>9} rows  {elapsed * 1000:8.1f} ms  {rows / elapsed * 60:>14,.0f} rows/min  "
+          f"(median forecast {int(np.median(days))} days)")
+
+
+def seed(bind, rows: int, users: int):
+    now = datetime.utcnow()
+    statuses = ["completed", "in_progress", "not_started"]
+    rng = np.random.default_rng(1)
+    with bind.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, name, email, password) VALUES (:id, 'bench', :email, 'x')"),
+                     [{"id": i, "email": f"bench{i}@example.com"} for i in range(1, users + 1)])
+        batch = []
+        for i in range(rows):
+            batch.append({
+                "user_id": int(rng.integers(1, users + 1)),
+                "status": statuses[i % 3],
+                "estimated": None if i % 4 == 0 else int(rng.integers(1, 80)),
+                "spent": int(rng.integers(0, 40)),
+                "started": now - timedelta(days=int(rng.integers(0, 400))),
+            })
+            if len(batch) == 10000:
+                _insert(conn, batch)
+                batch = []
+        if batch:
+            _insert(conn, batch)
+
+
+def _insert(conn, batch):
+    conn.execute(text("""
+        INSERT INTO resources (name, user_id, progress_status, estimated_hours, hours_spent, started_date, created_at)
+        VALUES ('Resource', :user_id, :status, :estimated, :spent, :started, :started)
+    """), batch)
+
+
+def bench_database(rows: int, users: int, use_database_url: bool):
+    if use_database_url:
+        from database.db import engine as bind
+    else:
+        path = os.path.join(tempfile.mkdtemp(), "forecast.db")
+        bind = create_engine(f"sqlite:///{path}")
+
+        @event.listens_for(bind, "connect")
+        def _wal(dbapi_connection, _):
+            # Let the streaming reader and the writer work concurrently
+            dbapi_connection.execute("PRAGMA journal_mode=WAL")
+
+        Base.metadata.create_all(bind)
+        seed(bind, rows, users)
+
+    stats = run_forecast(bind)
+    print(f"end2end   {stats['resources']:>9} rows  {stats['seconds'] * 1000:8.1f} ms  "
+          f"{stats['resources_per_minute']:>14,} rows/min  ({stats['users']} users)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--compute-rows", type=int, default=1_000_000)
+    parser.add_argument("--db-rows", type=int, default=200_000, help="rows seeded; a third are in progress")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--use-database-url", action="store_true")
+    args = parser.parse_args()
+
+    bench_compute(args.compute_rows)
+    if args.db_rows or args.use_database_url:
+        bench_database(args.db_rows, args.users, args.use_database_url)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Prompt size and profile build latency as the library grows:
+legacy full-library walk vs the bounded LearningProfileBuilder
+
+    python -m benchmarks.profile_prompt_size --sizes 10 100 1000 10000
+
+Uses an in-memory SQLite database so it runs without Postgres.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")  # the engine is built but never called
+
+from database.models import Base, User, Resources, ResourceType, ResourcePlatform
+from ai.profile import LearningProfileBuilder, estimate_tokens
+from ai.recommendations import ResourceRecommendationEngine
+
+
+def seed(db, size: int) -> int:
+    user = User(name="bench", email=f"bench{size}@example.com", password="x", library_version=0)
+    db.add(user)
+    db.flush()
+    types = [ResourceType(name=f"Type {i}", user_id=user.id) for i in range(5)]
+    platforms = [ResourcePlatform(name=f"Platform {i}", user_id=user.id) for i in range(5)]
+    db.add_all(types + platforms)
+    db.flush()
+
+    now = datetime.utcnow()
+    statuses = ["completed", "in_progress", "not_started"]
+    db.add_all([
+        Resources(
+            name=f"Resource {i}: an introduction to topic number {i}",
+            user_id=user.id,
+            resource_type_id=random.choice(types).id,
+            resource_platform_id=random.choice(platforms).id,
+            progress_status=random.choice(statuses),
+            rating=random.randint(1, 5),
+            hours_spent=random.randint(0, 40),
+            completion_date=now - timedelta(days=random.randint(0, 400)),
+            created_at=now - timedelta(days=random.randint(0, 400)),
+            updated_at=now,
+        )
+        for i in range(size)
+    ])
+    db.commit()
+    return user.id
+
+
+def legacy_profile(db, user_id: int):
+    """What get_user_learning_profile used to do: load and walk every resource"""
+    resources = db.query(Resources).filter(Resources.user_id == user_id).all()
+    completed = [r for r in resources if r.progress_status == "completed"]
+    in_progress = [r for r in resources if r.progress_status == "in_progress"]
+    preferred_types, preferred_platforms = {}, {}
+    ratings = [r.rating for r in completed if r.rating]
+    for r in completed:
+        if r.resource_type:
+            preferred_types[r.resource_type.name] = preferred_types.get(r.resource_type.name, 0) + 1
+        if r.resource_platform:
+            preferred_platforms[r.resource_platform.name] = preferred_platforms.get(r.resource_platform.name, 0) + 1
+    not_started = [r for r in resources if r.progress_status == "not_started"][:20]
+    return {
+        "total_resources": len(resources),
+        "completed_count": len(completed),
+        "in_progress_count": len(in_progress),
+        "preferred_types": preferred_types,
+        "preferred_platforms": preferred_platforms,
+        "average_rating": sum(ratings) / len(ratings) if ratings else 0,
+        "completed_resources": [r.name for r in completed],
+        "in_progress_resources": [r.name for r in in_progress],
+        "candidates": [
+            {"id": r.id, "name": r.name,
+             "resource_type": r.resource_type.name if r.resource_type else None,
+             "platform": r.resource_platform.name if r.resource_platform else None}
+            for r in not_started
+        ],
+    }
+
+
+def main(sizes):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    recommender = ResourceRecommendationEngine()
+
+    print(f"{'resources':>10} | {'legacy tokens':>13} {'legacy ms':>10} | {'bounded tokens':>14} {'cold ms':>8} {'cached ms':>9}")
+    for size in sizes:
+        db = Session()
+        user_id = seed(db, size)
+
+        started = time.perf_counter()
+        legacy_prompt = recommender.build_prompt(legacy_profile(db, user_id), 5)
+        legacy_ms = (time.perf_counter() - started) * 1000
+
+        builder = LearningProfileBuilder()
+        started = time.perf_counter()
+        bounded_prompt = recommender.build_prompt(builder.build(user_id, db), 5)
+        cold_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        builder.build(user_id, db)
+        cached_ms = (time.perf_counter() - started) * 1000
+
+        print(f"{size:>10} | {estimate_tokens(legacy_prompt):>13} {legacy_ms:>10.1f} | "
+              f"{estimate_tokens(bounded_prompt):>14} {cold_ms:>8.1f} {cached_ms:>9.2f}")
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    main(parser.parse_args().sizes)
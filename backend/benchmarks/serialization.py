@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Serialization time of a GET /api/resources response:
+raw ORM objects through jsonable_encoder + JSONResponse (before) vs the
+ResourceOut response model + ORJSONResponse (after)
+
+    python -m benchmarks.serialization --size 5000 --repeat 20
+
+Rows are loaded from an in-memory SQLite database so the ORM objects look
+exactly like the ones a route returns; only the serialization is timed.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+from typing import List
+from database.models import Base, User, Resources
+from resources.schemas import ResourceOut
+
+
+def load_resources(size: int):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    user = User(name="bench", email="bench@example.com", password="x")
+    db.add(user)
+    db.flush()
+    now = datetime.utcnow()
+    db.add_all([
+        Resources(
+            name=f"Resource {i}: an introduction to topic number {i}",
+            user_id=user.id,
+            description="A fairly typical description of a learning resource. " * 3,
+            notes="Some notes taken while studying. " * 10,
+            rating=random.randint(1, 5),
+            progress_status=random.choice(["completed", "in_progress", "not_started"]),
+            estimated_hours=random.randint(1, 40),
+            hours_spent=random.random() * 40,
+            started_date=now - timedelta(days=random.randint(0, 400)),
+            ai_tags="Python, SQL, APIs",
+            ai_category="Backend Development",
+            created_at=now,
+            updated_at=now,
+        )
+        for i in range(size)
+    ])
+    db.commit()
+    return db.query(Resources).filter(Resources.user_id == user.id).all()
+
+
+def before(resources) -> bytes:
+    return JSONResponse(jsonable_encoder(resources)).body
+
+
+adapter = TypeAdapter(List[ResourceOut])
+
+
+def after(resources) -> bytes:
+    # What FastAPI does for response_model=List[ResourceOut] with ORJSONResponse
+    return ORJSONResponse(adapter.dump_python(adapter.validate_python(resources, from_attributes=True), mode="json")).body
+
+
+def bench(name: str, fn, resources, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = fn(resources)
+        timings.append((time.perf_counter() - started) * 1000)
+    print(f"{name:<8} median {statistics.median(timings):8.1f} ms   p95 {sorted(timings)[int(len(timings) * 0.95) - 1]:8.1f} ms   "
+          f"{len(body) / 1024:8.0f} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    resources = load_resources(args.size)
+    print(f"{args.size} resources")
+    bench("before", before, resources, args.repeat)
+    bench("after", after, resources, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
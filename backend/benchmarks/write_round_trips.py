@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Database round trips per write request (resource, type and platform
+update/delete and resource create)
+
+    python -m benchmarks.write_round_trips --repeat 50 --rtt-ms 1
+    python -m benchmarks.write_round_trips --repeat 50 --rtt-ms 1 --baseline
+
+Requests go through the real app (TestClient). Every statement the app sends
+and every COMMIT/ROLLBACK counts as one round trip; the authenticated-user
+lookup is included (one SELECT per request). --rtt-ms adds a simulated network
+round trip to each of them, so latency reflects a database that isn't local.
+--baseline swaps the single-statement writes for the legacy select-then-write
+path (read the row, check each type/platform id, write through the ORM,
+refresh), for the "before" column. Uses a temporary SQLite file unless
+DATABASE_URL is set.
+"""
+from sqlalchemy import event, select
+from sqlalchemy.sql import visitors
+from sqlalchemy.sql.elements import ClauseElement
+from sqlalchemy.sql.selectable import ScalarSelect
+from types import SimpleNamespace
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/round_trips.db")
+os.environ.setdefault("ENRICHMENT_ENABLED", "false")
+os.environ.setdefault("GEMINI_API_KEY", "unused")
+
+from fastapi.testclient import TestClient
+from database.db import engine, PrismaModelWrapper
+from authentication.auth import create_access_token
+import main
+
+
+class RoundTrips:
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.statements = 0
+        self.transactions = 0
+        event.listen(engine, "before_cursor_execute", self._statement)
+        event.listen(engine, "commit", self._transaction)
+        event.listen(engine, "rollback", self._transaction)
+
+    def _wait(self):
+        if self.rtt:
+            time.sleep(self.rtt)
+
+    def _statement(self, *args):
+        self.statements += 1
+        self._wait()
+
+    def _transaction(self, *args):
+        self.transactions += 1
+        self._wait()
+
+    def reset(self):
+        self.statements = self.transactions = 0
+
+
+# ---------- legacy select-then-write path (--baseline) ----------
+
+def _is_owned_id_check(value) -> bool:
+    return any(isinstance(node, ScalarSelect) for node in visitors.iterate(value))
+
+
+def _legacy_resolve(wrapper, data: dict, criteria=()) -> dict:
+    """One SELECT per type/platform ownership check, as the routes used to do"""
+    return {
+        key: wrapper.db.execute(select(value).where(*criteria)).scalar()
+        if isinstance(value, ClauseElement) and _is_owned_id_check(value) else value
+        for key, value in data.items()
+    }
+
+
+def _legacy_create(self, data: dict, before_commit=None):
+    return self.create(data=_legacy_resolve(self, data), before_commit=before_commit)
+
+
+def _legacy_update(self, where: dict, data: dict, with_previous: bool = False, before_commit=None):
+    table = self.model.__table__
+    criteria = [table.c[key] == value for key, value in where.items()]
+    # The existing row; the date rules the routes computed in Python ride along
+    rules = {key: value for key, value in data.items()
+             if isinstance(value, ClauseElement) and not _is_owned_id_check(value)}
+    previous = self.db.execute(
+        select(*table.c, *[value.label(f"new_{key}") for key, value in rules.items()]).where(*criteria)
+    ).first()
+    if previous is None:
+        self.db.rollback()
+        return None
+    values = {**_legacy_resolve(self, data, criteria), **{key: previous._mapping[f"new_{key}"] for key in rules}}
+    if before_commit:
+        row = SimpleNamespace(**{**{column.name: previous._mapping[column.name] for column in table.c}, **values})
+        try:
+            before_commit(row, previous) if with_previous else before_commit(row)
+        except Exception:
+            self.db.rollback()
+            raise
+    return self.update(where={"id": previous.id}, data=values)
+
+
+def _legacy_delete(self, where: dict, returning=("id",), nullify=(), before_commit=None):
+    # The ORM relationships detach referencing resources, as before
+    existing = self.find_first(where=where)
+    if existing is None:
+        self.db.rollback()
+        return None
+    if before_commit:
+        before_commit(existing)
+    return self.delete(where={"id": existing.id})
+
+
+def use_legacy_writes():
+    PrismaModelWrapper.create_returning = _legacy_create
+    PrismaModelWrapper.update_returning = _legacy_update
+    PrismaModelWrapper.delete_returning = _legacy_delete
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--rtt-ms", type=float, default=0.0)
+    parser.add_argument("--baseline", action="store_true", help="Measure the legacy select-then-write path")
+    args = parser.parse_args()
+    if args.baseline:
+        use_legacy_writes()
+
+    client = TestClient(main.app)
+    client.__enter__()
+    email = f"bench-{time.time_ns()}@example.com"
+    client.post("/auth/signup", json={"email": email, "password": "benchmark", "name": "Bench"})
+    headers = {"Authorization": "Bearer " + create_access_token({"sub": email})}
+    type_id = client.post("/api/resource-types", json={"name": "Book"}, headers=headers).json()["id"]
+    platform_id = client.post("/api/resource-platforms", json={"name": "Udemy"}, headers=headers).json()["id"]
+
+    def create():
+        return client.post("/api/resources", json={
+            "name": "Resource", "resource_type_id": type_id, "resource_platform_id": platform_id,
+        }, headers=headers)
+
+    def update(resource_id, i):
+        return client.put(f"/api/resources/{resource_id}", json={
+            "name": f"Resource {i}", "resource_type_id": type_id, "resource_platform_id": platform_id,
+            "progress_status": "in_progress" if i % 2 else "completed",
+        }, headers=headers)
+
+    cases = [
+        ("POST /resources", lambda i: create()),
+        ("PUT /resources/{id}", lambda i: update(resource_ids[i], i)),
+        ("PUT /resources/{id} If-Match", lambda i: client.put(
+            f"/api/resources/{resource_ids[i]}", json={"notes": f"notes {i}"},
+            headers={**headers, "If-Match": etags[i]}
+        )),
+        ("DELETE /resources/{id}", lambda i: client.delete(f"/api/resources/{resource_ids[i]}", headers=headers)),
+        ("PUT /resource-types/{id}", lambda i: client.put(f"/api/resource-types/{type_id}", json={"name": f"Book {i}"}, headers=headers)),
+        ("PUT /resource-platforms/{id}", lambda i: client.put(f"/api/resource-platforms/{platform_id}", json={"name": f"Udemy {i}"}, headers=headers)),
+        ("DELETE /resource-types/{id}", lambda i: client.delete(f"/api/resource-types/{spare_types[i]}", headers=headers)),
+        ("DELETE /resource-platforms/{id}", lambda i: client.delete(f"/api/resource-platforms/{spare_platforms[i]}", headers=headers)),
+    ]
+
+    resource_ids = [create().json()["id"] for _ in range(args.repeat)]
+    etags = [client.get(f"/api/resources/{resource_id}", headers=headers).headers["etag"] for resource_id in resource_ids]
+    spare_types = [client.post("/api/resource-types", json={"name": f"Spare {i}"}, headers=headers).json()["id"] for i in range(args.repeat)]
+    spare_platforms = [client.post("/api/resource-platforms", json={"name": f"Spare {i}"}, headers=headers).json()["id"] for i in range(args.repeat)]
+
+    counter = RoundTrips(args.rtt_ms / 1000)
+    print(f"{'request':<32} {'statements':>10} {'commits':>8} {'round trips':>12} {'median ms':>10}")
+    for name, send in cases:
+        statements, transactions, timings = [], [], []
+        # The If-Match case must see the ETags from before the plain updates
+        for i in range(args.repeat):
+            counter.reset()
+            started = time.perf_counter()
+            response = send(i)
+            timings.append((time.perf_counter() - started) * 1000)
+            assert response.status_code < 400, (name, response.status_code, response.text)
+            statements.append(counter.statements)
+            transactions.append(counter.transactions)
+            if name == "PUT /resources/{id}":
+                etags[i] = response.headers.get("etag", etags[i])
+        print(f"{name:<32} {statistics.mean(statements):>10.1f} {statistics.mean(transactions):>8.1f} "
+              f"{statistics.mean(statements) + statistics.mean(transactions):>12.1f} {statistics.median(timings):>10.1f}")
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,120 @@
+from database.db import SessionLocal, get_db, prisma
+from database.models import User
+from authentication.auth import get_current_user
+from resources.resource import _resource_stats
+from resources.response_cache import get_response_cache
+from resources.schemas import ResourceOut, ResourceTypeOut, ResourcePlatformOut, ResourceStats
+from ai.recommendation_cache import get_cached_recommendations
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from typing import List, Optional
+import asyncio
+import os
+
+
+router = APIRouter()
+
+# Sections read at the same time, each on its own pooled connection
+DASHBOARD_CONCURRENCY = int(os.getenv("DASHBOARD_CONCURRENCY", "2"))
+
+# Section name -> (read handler, its response model); handlers get the
+# authenticated user's id (a plain int, safe to hand to worker threads)
+SYNC_SECTIONS = {
+    "resources": (
+        lambda user_id, db: prisma(db).resources.find_many(where={"user_id": user_id}),
+        TypeAdapter(List[ResourceOut])
+    ),
+    "resource_types": (
+        lambda user_id, db: prisma(db).resourcetype.find_many(where={"user_id": user_id}),
+        TypeAdapter(List[ResourceTypeOut])
+    ),
+    "resource_platforms": (
+        lambda user_id, db: prisma(db).resourceplatform.find_many(where={"user_id": user_id}),
+        TypeAdapter(List[ResourcePlatformOut])
+    ),
+    "stats": (
+        lambda user_id, db: get_response_cache().get_or_set(user_id, "stats-overview", lambda: _resource_stats(db, user_id)),
+        TypeAdapter(ResourceStats)
+    ),
+}
+DASHBOARD_SECTIONS = ["session", *SYNC_SECTIONS, "recommendations"]
+
+
+def _run_section(handler, adapter: TypeAdapter, user_id: int):
+    # Sessions aren't thread-safe, so each concurrent read gets its own from the pool;
+    # serialize before closing it so nothing lazy-loads on a closed session
+    db = SessionLocal()
+    try:
+        result = handler(user_id=user_id, db=db)
+        return adapter.dump_python(adapter.validate_python(result, from_attributes=True), mode="json")
+    finally:
+        db.close()
+
+
+async def _recommendations(user_id: int, limit: int):
+    # Never wait on the LLM here: a miss returns what is stored (or nothing) as stale
+    # and leaves the computation to the background refresher
+    db = SessionLocal()
+    try:
+        return jsonable_encoder(
+            await get_cached_recommendations(user_id=user_id, db=db, limit=limit, compute_missing=False)
+        )
+    finally:
+        db.close()
+
+
+@router.get("/dashboard")
+async def get_dashboard(
+    include: Optional[str] = None,
+    recommendations_limit: int = 5,
+    current_user: User = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """
+    Everything the dashboard needs on load in one round trip: the user is
+    authenticated once and the selected sections (comma-separated include=,
+    default all) are read concurrently, DASHBOARD_CONCURRENCY at a time. A
+    failing section is reported under "errors" instead of failing the whole payload.
+    """
+    sections = [s.strip() for s in include.split(",") if s.strip()] if include else DASHBOARD_SECTIONS
+    unknown = set(sections) - set(DASHBOARD_SECTIONS)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown sections: {', '.join(sorted(unknown))}. Available: {', '.join(DASHBOARD_SECTIONS)}"
+        )
+
+    payload = {}
+    if "session" in sections:
+        payload["session"] = {"name": current_user.name, "email": current_user.email}
+    user_id = current_user.id
+    # Same session get_current_user used: hand its connection back before the sections take theirs
+    db.close()
+
+    semaphore = asyncio.Semaphore(DASHBOARD_CONCURRENCY)
+
+    async def limited(work):
+        async with semaphore:
+            return await work()
+
+    tasks = {}
+    for section in sections:
+        if section in SYNC_SECTIONS:
+            tasks[section] = limited(
+                lambda section=section: asyncio.to_thread(_run_section, *SYNC_SECTIONS[section], user_id)
+            )
+        elif section == "recommendations":
+            tasks[section] = limited(lambda: _recommendations(user_id, recommendations_limit))
+
+    errors = {}
+    results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+    for section, result in zip(tasks, results):
+        if isinstance(result, Exception):
+            errors[section] = str(result)
+            payload[section] = None
+        else:
+            payload[section] = result
+    if errors:
+        payload["errors"] = errors
+    return payload
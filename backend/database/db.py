@@ -1,9 +1,13 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, delete, event, insert, select, text, update
 from sqlalchemy.orm import sessionmaker, Session
 from database.models import Base
+from observability.request_timing import check_query_limit, record_query
+from observability.query_stats import get_query_stats
 import database.models as models  # ADD THIS IMPORT
 import os
+import time
 from dotenv import load_dotenv
+from types import SimpleNamespace
 
 # Load environment variables from .env file
 load_dotenv()
@@ -15,6 +19,23 @@ if not DATABASE_URL:
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
+
+@event.listens_for(engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    check_query_limit()
+    # On the per-statement context, so a statement that raises leaves nothing behind
+    context._query_started = time.perf_counter()
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - context._query_started
+    # Attributed to the request being handled, if any (see observability/request_timing.py)
+    record_query(statement, seconds)
+    # The slow-query EXPLAIN runs on a connection opted out of the stats
+    if conn.get_execution_options().get("query_stats", True):
+        get_query_stats().record(conn.engine, statement, parameters, seconds, executemany)
+
 def get_db():
     db = SessionLocal()
     try:
@@ -23,14 +44,61 @@ def get_db():
         db.close()
 
 
+def bulk_update(db: Session, table: str, rows: list, casts: dict = None, key: str = "id", where: str = "", params: dict = None, assign: dict = None, chunk_size: int = 1000):
+    """
+    Set-based update of many rows in one statement per chunk:
+        WITH v (id, col, ...) AS (VALUES (...), (...))
+        UPDATE table SET col = v.col FROM v WHERE table.id = v.id [AND where]
+    casts maps column -> SQL type for values Postgres can't infer (e.g. INTEGER, TIMESTAMP).
+    assign maps column -> SQL expression replacing the plain "v.col" (e.g. a JSONB merge).
+    Does not commit.
+    """
+    if not rows:
+        return 0
+    casts = casts or {}
+    assign = assign or {}
+    columns = list(rows[0].keys())
+    assignments = ", ".join(
+        f"{column} = {assign.get(column, f'v.{column}')}" for column in columns if column != key
+    )
+    extra = f" AND {where}" if where else ""
+    updated = 0
+
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        bind = dict(params or {})
+        values = []
+        for i, row in enumerate(chunk):
+            placeholders = []
+            for j, column in enumerate(columns):
+                name = f"v{i}_{j}"
+                bind[name] = row[column]
+                placeholders.append(f"CAST(:{name} AS {casts[column]})" if column in casts else f":{name}")
+            values.append(f"({', '.join(placeholders)})")
+        result = db.execute(
+            text(
+                f"WITH v ({', '.join(columns)}) AS (VALUES {', '.join(values)}) "
+                f"UPDATE {table} SET {assignments} FROM v WHERE {table}.{key} = v.{key}{extra}"
+            ),
+            bind
+        )
+        updated += max(result.rowcount or 0, 0)
+    return updated
+
+
 class PrismaModelWrapper:
     def __init__(self, db: Session, model):
         self.db = db
         self.model = model
 
-    def create(self, data):
+    def create(self, data, before_commit=None):
         obj = self.model(**data)
         self.db.add(obj)
+        if before_commit:
+            # Flush so obj has its id, then let the caller stage dependent
+            # rows (e.g. activity events) in the same transaction
+            self.db.flush()
+            before_commit(obj)
         self.db.commit()
         self.db.refresh(obj)
         return obj
@@ -108,6 +176,92 @@ class PrismaModelWrapper:
         return obj
 
 
+    # Single-statement writes: the WHERE carries the ownership check and RETURNING
+    # replaces the read-back, so a write is one round trip plus its COMMIT
+
+    def _write_returning(self, statement, before_commit=None):
+        try:
+            row = self.db.execute(statement).first()
+            if row is None:
+                self.db.rollback()
+                return None
+            if before_commit:
+                # Stage dependent rows (activity events, ...) or reject by raising
+                before_commit(row)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        return row
+
+    def create_returning(self, data: dict, before_commit=None):
+        """INSERT ... RETURNING *; data values may be SQL expressions. Returns the new row."""
+        table = self.model.__table__
+        return self._write_returning(insert(table).values(data).returning(*table.c), before_commit)
+
+    def update_returning(self, where: dict, data: dict, with_previous: bool = False, before_commit=None):
+        """
+        UPDATE ... WHERE <where> RETURNING *. Values may be SQL expressions (e.g. a
+        scalar subquery that only resolves ids the user owns). With with_previous,
+        before_commit gets (row, previous) where previous holds the pre-update
+        values, read through a locked self-join in the same statement on Postgres.
+        Returns the row, or None (rolled back) when nothing matched.
+        """
+        table = self.model.__table__
+        criteria = [table.c[key] == value for key, value in where.items()]
+        statement = update(table).where(*criteria).values(data)
+        if not with_previous:
+            return self._write_returning(statement.returning(*table.c), before_commit)
+
+        if self.db.get_bind().dialect.name == "postgresql":
+            previous = select(table).where(*criteria).with_for_update().subquery("previous")
+            statement = statement.where(table.c.id == previous.c.id).returning(
+                *table.c, *[column.label(f"previous_{column.name}") for column in previous.c]
+            )
+            split = lambda row: SimpleNamespace(**{column.name: row._mapping[f"previous_{column.name}"] for column in table.c})
+        else:
+            # SQLite evaluates a self-join after the update, so read the old row first
+            old_row = self.db.execute(select(table).where(*criteria)).first()
+            if old_row is None:
+                self.db.rollback()
+                return None
+            statement = statement.returning(*table.c)
+            split = lambda row: old_row
+
+        return self._write_returning(
+            statement, before_commit and (lambda row: before_commit(row, split(row)))
+        )
+
+    def delete_returning(self, where: dict, returning=("id",), nullify=(), before_commit=None):
+        """
+        DELETE ... WHERE <where> RETURNING <returning>. nullify lists referencing
+        columns (e.g. Resources.resource_type_id) set to NULL for the deleted row,
+        in the same statement on Postgres. Returns the row, or None (rolled back)
+        when nothing matched.
+        """
+        table = self.model.__table__
+        criteria = [table.c[key] == value for key, value in where.items()]
+        statement = delete(table).where(*criteria)
+        if not nullify:
+            return self._write_returning(statement.returning(*[table.c[name] for name in returning]), before_commit)
+
+        if self.db.get_bind().dialect.name == "postgresql":
+            # Data-modifying CTEs: foreign keys are checked after the whole statement
+            deleted = statement.returning(*[table.c[name] for name in dict.fromkeys(("id", *returning))]).cte("deleted")
+            statement = select(*[deleted.c[name] for name in returning])
+            for i, column in enumerate(nullify):
+                statement = statement.add_cte(
+                    update(column.table).where(column == deleted.c.id).values({column.key: None}).cte(f"detached_{i}")
+                )
+            return self._write_returning(statement, before_commit)
+
+        for column in nullify:
+            self.db.execute(
+                update(column.table).where(column.in_(select(table.c.id).where(*criteria))).values({column.key: None})
+            )
+        return self._write_returning(statement.returning(*[table.c[name] for name in returning]), before_commit)
+
+
 class Prisma:
     def __init__(self, db: Session):
         # auto-map all models inside models.py
@@ -1,5 +1,7 @@
 from sqlalchemy.orm import declarative_base, relationship
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Date, Float, ForeignKey, Text, JSON, Index
+from uuid import uuid4
+from sqlalchemy.dialects.postgresql import JSONB
 from datetime import datetime
 
 Base = declarative_base()
@@ -8,9 +10,11 @@ class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String)
-    email = Column(String)
+    email = Column(String, index=True)  # login and get_current_user look users up by email
     password = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
+    library_version = Column(Integer, default=0)  # bumped on every resource create/update/delete
+    data_version = Column(Integer, default=0)  # bumped on every write the user can see; backs list ETags
 
     
     resources = relationship("Resources", back_populates="user")
@@ -38,7 +42,7 @@ class Resources(Base):
     # Progress tracking fields
     progress_status = Column(String, default="not_started")  # not_started, in_progress, completed
     estimated_hours = Column(Integer)
-    hours_spent = Column(Integer, default=0)
+    hours_spent = Column(Float, default=0)  # fractional hours, incremented atomically by log-time
     completion_date = Column(DateTime)
     started_date = Column(DateTime)
     
@@ -47,6 +51,7 @@ class Resources(Base):
     ai_tags = Column(String)  # Comma-separated AI-generated tags
     ai_category = Column(String)  # AI-generated category
     ai_mastery_date = Column(DateTime)  # AI-predicted completion date
+    ai_payload = Column(JSON().with_variant(JSONB(), "postgresql"))  # Full validated AI output per task, see ai/payload.py
     
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -57,6 +62,10 @@ class Resources(Base):
     
     resource_platform = relationship("ResourcePlatform", back_populates="resources")
 
+    __table_args__ = (
+        Index("ix_resources_ai_payload", "ai_payload", postgresql_using="gin"),
+    )
+
 class ResourceType(Base):
     __tablename__ = "resource_types"
     id = Column(Integer, primary_key=True, index=True)
@@ -65,6 +74,11 @@ class ResourceType(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     resources = relationship("Resources", back_populates="resource_type")
+
+    __table_args__ = (
+        # Per-user name lookups (duplicate checks, import name resolution)
+        Index("ix_resource_types_user_id_name", "user_id", "name"),
+    )
     
 
 class ResourcePlatform(Base):
@@ -74,4 +88,57 @@ class ResourcePlatform(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # null means system-wide
     created_at = Column(DateTime, default=datetime.utcnow)
 
-    resources = relationship("Resources", back_populates="resource_platform")
\ No newline at end of file
+    resources = relationship("Resources", back_populates="resource_platform")
+
+    __table_args__ = (
+        Index("ix_resource_platforms_user_id_name", "user_id", "name"),
+    )
+
+
+class AIRequestResult(Base):
+    """Short-lived results shared between workers by the advisory-lock singleflight"""
+    __tablename__ = "ai_request_results"
+    key = Column(String, primary_key=True)
+    result = Column(Text)  # JSON-encoded result of the coalesced call
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class UserRecommendations(Base):
+    """Materialized recommendations, valid while version matches users.library_version"""
+    __tablename__ = "user_recommendations"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    version = Column(Integer)
+    limit = Column(Integer)
+    recommendations = Column(Text)  # JSON-encoded list
+    computed_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ActivityEvent(Base):
+    """
+    Append-only activity log, written in the same transaction as the resource
+    write it describes. On Postgres the table is range-partitioned by month on
+    ts (see activities/maintenance.py), so ts is part of the primary key.
+    No FK on resource_id: events outlive deleted resources.
+    """
+    __tablename__ = "activity_events"
+    id = Column(String(32), primary_key=True, default=lambda: uuid4().hex)
+    ts = Column(DateTime, primary_key=True, default=datetime.utcnow)
+    user_id = Column(Integer, nullable=False)
+    resource_id = Column(Integer)
+    kind = Column(String, nullable=False)  # resource_added, resource_updated, progress_updated, ...
+    payload = Column(JSON().with_variant(JSONB(), "postgresql"))
+
+    __table_args__ = (
+        Index("ix_activity_events_user_ts", "user_id", ts.desc(), id.desc()),
+        {"postgresql_partition_by": "RANGE (ts)"},
+    )
+
+
+class ResourceTimeDaily(Base):
+    """Per-day rollup of logged study time, upserted by every log-time increment"""
+    __tablename__ = "resource_time_daily"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    resource_id = Column(Integer, primary_key=True)  # no FK: history outlives deleted resources
+    day = Column(Date, primary_key=True)
+    hours = Column(Float, default=0)
+    entries = Column(Integer, default=0)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Local fake of the Gemini generateContent API for offline load testing.
+
+Run it and point the backend at it:
+    uvicorn fake_llm_server:app --port 8001
+    GEMINI_BASE_URL=http://localhost:8001 uvicorn main:app
+
+Behaviour is controlled with environment variables, or at runtime with
+POST /_config (same keys, lower-case):
+    FAKE_LLM_LATENCY_MS   base latency per request (default 300)
+    FAKE_LLM_JITTER_MS    uniform extra latency added on top (default 200)
+    FAKE_LLM_ERROR_RATE   fraction of requests answered with an error (default 0)
+    FAKE_LLM_ERROR_CODE   HTTP status used for injected errors (default 503)
+    FAKE_LLM_HANG_RATE    fraction of requests that never answer in time (default 0)
+"""
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from typing import Optional
+import asyncio
+import json
+import os
+import random
+import re
+
+app = FastAPI()
+
+config = {
+    "latency_ms": float(os.getenv("FAKE_LLM_LATENCY_MS", "300")),
+    "jitter_ms": float(os.getenv("FAKE_LLM_JITTER_MS", "200")),
+    "error_rate": float(os.getenv("FAKE_LLM_ERROR_RATE", "0")),
+    "error_code": int(os.getenv("FAKE_LLM_ERROR_CODE", "503")),
+    "hang_rate": float(os.getenv("FAKE_LLM_HANG_RATE", "0")),
+}
+counters = {"requests": 0, "errors": 0, "hangs": 0}
+
+
+class ConfigUpdate(BaseModel):
+    latency_ms: Optional[float] = None
+    jitter_ms: Optional[float] = None
+    error_rate: Optional[float] = None
+    error_code: Optional[int] = None
+    hang_rate: Optional[float] = None
+
+
+def _prompt_text(body: dict) -> str:
+    contents = body.get("contents") or []
+    parts = []
+    for content in contents:
+        for part in content.get("parts", []):
+            parts.append(part.get("text", ""))
+    return "\n".join(parts)
+
+
+def _fake_answer(prompt: str):
+    """Return a canned JSON answer shaped like what the prompt asks for"""
+    if "Resources (JSON):" in prompt:
+        items = json.loads(prompt.split("Resources (JSON):", 1)[1].split("Task:", 1)[0])
+        return [
+            {"id": item["id"], **_fake_answer("learning content classifier")}
+            for item in items
+        ]
+    if "learning content classifier" in prompt:
+        return {
+            "category": "Backend Development",
+            "subcategory": "Python",
+            "skill_tags": ["APIs", "Testing", "Databases"],
+            "difficulty_level": "Intermediate",
+            "related_skills": ["HTTP", "SQL"],
+        }
+    if "student's notes" in prompt.lower():
+        return {
+            "summary": "The notes cover the core ideas of the resource.",
+            "key_concepts": ["concept one", "concept two"],
+            "technical_terms": {"term": "definition"},
+            "main_topics": ["topic"],
+        }
+    if "predicting completion dates" in prompt:
+        return {
+            "predicted_date": "2030-01-01",
+            "confidence": 0.5,
+            "days_remaining": 30,
+            "hours_remaining": 10,
+            "recommendation": "Keep going at your current pace.",
+        }
+    if "personalized learning advisor" in prompt:
+        names = re.findall(r"^- (.+?) \(Type:", prompt, flags=re.MULTILINE)
+        return [
+            {"resource_name": name, "reason": "Fits your learning history.", "priority": i + 1}
+            for i, name in enumerate(names[:5])
+        ]
+    return {"text": "ok"}
+
+
+@app.post("/{api_version}/models/{model_action}")
+async def generate_content(api_version: str, model_action: str, body: dict):
+    counters["requests"] += 1
+    delay = config["latency_ms"] + random.uniform(0, config["jitter_ms"])
+
+    if random.random() < config["hang_rate"]:
+        counters["hangs"] += 1
+        await asyncio.sleep(max(delay / 1000, 600))
+
+    await asyncio.sleep(delay / 1000)
+
+    if random.random() < config["error_rate"]:
+        counters["errors"] += 1
+        return JSONResponse(
+            status_code=config["error_code"],
+            content={"error": {"code": config["error_code"], "message": "Injected failure", "status": "UNAVAILABLE"}},
+        )
+
+    prompt = _prompt_text(body)
+    answer = json.dumps(_fake_answer(prompt))
+    prompt_tokens = len(prompt) // 4
+    answer_tokens = len(answer) // 4
+    return {
+        "candidates": [
+            {
+                "content": {"role": "model", "parts": [{"text": answer}]},
+                "finishReason": "STOP",
+            }
+        ],
+        "usageMetadata": {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": answer_tokens,
+            "totalTokenCount": prompt_tokens + answer_tokens,
+        },
+        "modelVersion": model_action.split(":")[0],
+    }
+
+
+@app.get("/_config")
+def get_config():
+    return {"config": config, "counters": counters}
+
+
+@app.post("/_config")
+def update_config(update: ConfigUpdate):
+    for key, value in update.model_dump(exclude_none=True).items():
+        config[key] = value
+    return {"config": config, "counters": counters}
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("FAKE_LLM_PORT", "8001")))
@@ -1,11 +1,36 @@
 from database.create_tables import create_tables
 from fastapi import FastAPI, APIRouter
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from authentication.auth import router as authentication_router
 from resources.resource import router as resource_router
+from activities.activity import router as activity_router
+from dashboard.dashboard import router as dashboard_router
+from activities.maintenance import ensure_partitions, get_activity_maintenance
+from resources.time_log import get_time_log_buffer
 from ai.routes import router as ai_router
+from observability.metrics import REGISTRY
+from observability.request_context import RequestIdMiddleware
+from observability.request_timing import RequestTimingMiddleware
+from observability.profiler import ProfilerMiddleware
+from observability.admin import router as observability_admin_router
+from ai.enrichment import get_enrichment_pipeline
+import logging
 
-app = FastAPI()
+# Structured JSON records from our own loggers (skillstack.*) go to stderr as-is
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter("%(message)s"))
+logging.getLogger("skillstack").addHandler(_log_handler)
+logging.getLogger("skillstack").setLevel(logging.INFO)
+
+# orjson renders the validated response models much faster than json.dumps
+app = FastAPI(default_response_class=ORJSONResponse)
+
+# Innermost; a single attribute check unless a profiling session is active
+app.add_middleware(ProfilerMiddleware)
+# Added first so it runs inside RequestIdMiddleware and its logs carry the request id
+app.add_middleware(RequestTimingMiddleware)
+app.add_middleware(RequestIdMiddleware)
 
 # Configure CORS
 app.add_middleware(
@@ -14,16 +39,34 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "ETag", "Server-Timing"],
 )
 
 @app.on_event("startup")
 def startup_event():
     # Call the function which now checks for existing tables
     create_tables()
+    # activity_events needs a partition for the current month before the first insert
+    ensure_partitions()
+
+@app.on_event("startup")
+async def start_background_workers():
+    get_enrichment_pipeline().start()
+    get_activity_maintenance().start()
+    get_time_log_buffer().start()
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+    await get_enrichment_pipeline().stop()
+    await get_activity_maintenance().stop()
+    await get_time_log_buffer().stop()
 
 app.include_router(authentication_router, prefix="/auth", tags=["authentication"])
 app.include_router(resource_router, prefix="/api", tags=["resources"])
+app.include_router(activity_router, prefix="/api", tags=["activities"])
+app.include_router(dashboard_router, prefix="/api", tags=["dashboard"])
 app.include_router(ai_router, prefix="/api/ai", tags=["ai"])
+app.include_router(observability_admin_router, prefix="/api/admin", tags=["admin"])
 
 
 
@@ -32,3 +75,6 @@ async def health_check():
     return {"status": "ok"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
@@ -12,6 +12,8 @@ def migrate_database():
         "ALTER TABLE resources ADD COLUMN IF NOT EXISTS progress_status VARCHAR DEFAULT 'not_started'",
         "ALTER TABLE resources ADD COLUMN IF NOT EXISTS estimated_hours INTEGER",
         "ALTER TABLE resources ADD COLUMN IF NOT EXISTS hours_spent INTEGER DEFAULT 0",
+        # Fractional hours for the log-time endpoint
+        "ALTER TABLE resources ALTER COLUMN hours_spent TYPE DOUBLE PRECISION",
         "ALTER TABLE resources ADD COLUMN IF NOT EXISTS completion_date TIMESTAMP",
         "ALTER TABLE resources ADD COLUMN IF NOT EXISTS started_date TIMESTAMP",
         
@@ -20,10 +22,22 @@ def migrate_database():
         "ALTER TABLE resources ADD COLUMN IF NOT EXISTS ai_tags TEXT",
         "ALTER TABLE resources ADD COLUMN IF NOT EXISTS ai_category VARCHAR",
         "ALTER TABLE resources ADD COLUMN IF NOT EXISTS ai_mastery_date TIMESTAMP",
+        "ALTER TABLE resources ADD COLUMN IF NOT EXISTS ai_payload JSONB",
+        "CREATE INDEX IF NOT EXISTS ix_resources_ai_payload ON resources USING GIN (ai_payload)",
         
         # Add timestamp columns
         "ALTER TABLE resources ADD COLUMN IF NOT EXISTS created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP",
         "ALTER TABLE resources ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP",
+        
+        # Per-user version stamp for cached recommendations
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS library_version INTEGER DEFAULT 0",
+        # Per-user cache validator for conditional GETs (ETag / If-None-Match)
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS data_version INTEGER DEFAULT 0",
+
+        # Indexes for lookups found by the slow-query report
+        "CREATE INDEX IF NOT EXISTS ix_users_email ON users (email)",
+        "CREATE INDEX IF NOT EXISTS ix_resource_types_user_id_name ON resource_types (user_id, name)",
+        "CREATE INDEX IF NOT EXISTS ix_resource_platforms_user_id_name ON resource_platforms (user_id, name)",
     ]
     
     with engine.connect() as conn:
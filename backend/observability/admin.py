@@ -0,0 +1,111 @@
+"""
+Admin diagnostics endpoints (mounted under /api/admin)
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from pydantic import BaseModel, Field, model_validator
+from typing import Literal, Optional
+from database.models import User
+from authentication.auth import get_admin_user
+from observability.profiler import get_profiler, PROFILER_INTERVAL_MS
+from observability.query_stats import get_query_stats
+import re
+
+router = APIRouter()
+
+
+class StartProfilerRequest(BaseModel):
+    requests: Optional[int] = Field(None, ge=1, le=10000, description="Profile the next N matching requests")
+    seconds: Optional[float] = Field(None, gt=0, le=3600, description="Profile matching requests for this long")
+    trigger_pattern: Optional[str] = Field(
+        None, description="Regex on the request path; only matching requests turn sampling on"
+    )
+    trigger_rate: float = Field(1.0, gt=0, le=1, description="Fraction of matching requests that turn sampling on")
+    interval_ms: float = Field(PROFILER_INTERVAL_MS, ge=1, le=1000)
+
+    @model_validator(mode="after")
+    def check_limit(self):
+        if self.requests is None and self.seconds is None:
+            raise ValueError("Set requests, seconds or both")
+        if self.trigger_pattern:
+            try:
+                re.compile(self.trigger_pattern)
+            except re.error as e:
+                raise ValueError(f"Invalid trigger_pattern: {e}")
+        return self
+
+
+# ================================================
+# SAMPLING PROFILER
+# ================================================
+@router.post("/profiler/start")
+async def start_profiler(request: StartProfilerRequest, admin: User = Depends(get_admin_user)):
+    """
+    Start a profiling session; discards the previous session's samples.
+    Stacks are sampled process-wide while a triggering request is in flight,
+    so concurrent requests are included (see overlapping_requests).
+    """
+    return get_profiler().start(**request.model_dump())
+
+
+@router.post("/profiler/stop")
+async def stop_profiler(admin: User = Depends(get_admin_user)):
+    return get_profiler().stop()
+
+
+@router.get("/profiler/status")
+async def get_profiler_status(admin: User = Depends(get_admin_user)):
+    return get_profiler().status()
+
+
+@router.get("/profiler/profile")
+async def download_profile(
+    format: Literal["collapsed", "speedscope"] = Query("speedscope"),
+    admin: User = Depends(get_admin_user)
+):
+    """
+    Download the current (or last) session's samples: collapsed stacks for
+    flamegraph.pl / inferno, or speedscope JSON for https://www.speedscope.app
+    """
+    profiler = get_profiler()
+    if not profiler.stacks:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No samples recorded yet")
+    if format == "collapsed":
+        return PlainTextResponse(
+            profiler.collapsed(),
+            headers={"Content-Disposition": 'attachment; filename="profile.collapsed.txt"'}
+        )
+    return ORJSONResponse(
+        profiler.speedscope(),
+        headers={"Content-Disposition": 'attachment; filename="profile.speedscope.json"'}
+    )
+
+
+# ================================================
+# QUERY STATISTICS & SLOW-QUERY PLANS
+# ================================================
+@router.get("/queries")
+async def get_query_report(
+    limit: int = Query(50, ge=1, le=1000),
+    order_by: Literal["total_ms", "calls", "slow_calls", "p95_ms", "p99_ms", "max_ms"] = Query("total_ms"),
+    slow_only: bool = Query(False),
+    admin: User = Depends(get_admin_user)
+):
+    """
+    Statement fingerprints with call counts and latency percentiles since the last reset
+    """
+    return get_query_stats().report(limit=limit, order_by=order_by, slow_only=slow_only)
+
+
+@router.get("/queries/plans")
+async def get_slow_query_plans(admin: User = Depends(get_admin_user)):
+    """
+    Most recent EXPLAIN (ANALYZE, BUFFERS) plans of sampled slow queries, newest first
+    """
+    return get_query_stats().recent_plans()
+
+
+@router.post("/queries/reset")
+async def reset_query_stats(admin: User = Depends(get_admin_user)):
+    get_query_stats().reset()
+    return {"message": "Query statistics reset"}
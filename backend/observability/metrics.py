@@ -0,0 +1,162 @@
+"""
+Minimal Prometheus-compatible metrics registry
+Counters, gauges and histograms with labels, rendered in the text exposition format
+"""
+from typing import Dict, Iterable, List, Sequence, Tuple
+import threading
+
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Dict[str, str] = None) -> str:
+    pairs = list(zip(names, values)) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self.values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self.lock:
+            self.values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self.series: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        with self.lock:
+            for key, (counts, total, count) in sorted(self.series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(self.labelnames, key, {"le": _format_value(bound)})
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self.metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+# ================================================
+# AI METRICS
+# ================================================
+AI_CALLS = REGISTRY.counter("ai_calls_total", "LLM calls by task, model and outcome", ["task", "model", "outcome"])
+AI_LATENCY = REGISTRY.histogram("ai_call_latency_seconds", "LLM call latency including retries", ["task", "model"])
+AI_TOKENS = REGISTRY.counter("ai_tokens_total", "Tokens reported by response usage metadata", ["task", "model", "direction"])
+AI_ERRORS = REGISTRY.counter("ai_errors_total", "LLM call failures by error kind", ["task", "kind"])
+AI_TIMEOUTS = REGISTRY.counter("ai_timeouts_total", "LLM calls that exceeded their latency budget", ["task"])
+AI_RETRIES = REGISTRY.counter("ai_retries_total", "Retried LLM attempts", ["task"])
+AI_HEDGES = REGISTRY.counter("ai_hedged_requests_total", "Hedge requests sent after the p95 delay", ["task"])
+AI_BREAKER_STATE = REGISTRY.gauge("ai_circuit_breaker_open", "1 while the Gemini circuit breaker is open or half-open")
+AI_VALIDATION_FAILURES = REGISTRY.counter("ai_json_validation_failures_total", "LLM outputs that failed JSON parsing or validation", ["task", "model"])
+AI_FALLBACKS = REGISTRY.counter("ai_tier_fallbacks_total", "Fallbacks from the fast to the strong tier", ["task"])
+CACHE_REQUESTS = REGISTRY.counter("cache_requests_total", "Cache lookups by cache and result", ["cache", "result"])
+CACHE_EVICTIONS = REGISTRY.counter("cache_evictions_total", "Entries evicted to make room, by cache", ["cache"])
+CACHE_INVALIDATIONS = REGISTRY.counter("cache_invalidations_total", "Entries or namespaces dropped by writes, by cache", ["cache"])
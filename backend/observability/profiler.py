@@ -0,0 +1,243 @@
+"""
+On-demand sampling profiler
+An admin starts a session for the next N requests or a time window,
+optionally triggered only by paths matching a pattern and by a sampled
+fraction of those requests. While a triggering request is in flight, a
+background thread samples every busy thread's Python stack each
+PROFILER_INTERVAL_MS; results download as collapsed stacks (flamegraph.pl,
+speedscope, ...) or speedscope JSON.
+
+Sampling is process-wide: the trigger options decide *when* stacks are taken,
+not whose. Requests that overlap a triggering one show up in the profile too;
+their number is reported as overlapping_requests, so profile on a quiet
+worker or with a narrow window when that matters.
+While no session is active the middleware costs one attribute check.
+"""
+from typing import Dict, List, Optional, Tuple
+import os
+import random
+import re
+import sys
+import threading
+import time
+
+
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "5"))
+PROFILER_MAX_DEPTH = 128
+# The profiler's own endpoints are never profiled
+EXCLUDED_PREFIX = "/api/admin/profiler"
+
+Frame = Tuple[str, str, int]  # (function, file, first line)
+
+
+# Leaf frames of threads parked in the event loop's selector or waiting for work
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),  # concurrent.futures worker blocked in SimpleQueue.get
+}
+
+
+def _is_idle(leaf: Frame) -> bool:
+    name, filename, _ = leaf
+    return (os.path.basename(filename), name) in IDLE_FRAMES
+
+
+class SamplingProfiler:
+    def __init__(self):
+        self.active = False
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.wake = threading.Event()
+        self.sampler: Optional[threading.Thread] = None
+        self._reset()
+
+    def _reset(self):
+        self.stacks: Dict[Tuple[Frame, ...], int] = {}
+        self.trigger_pattern = None
+        self.trigger_rate = 1.0
+        self.remaining: Optional[int] = None
+        self.deadline: Optional[float] = None
+        self.interval = PROFILER_INTERVAL_MS / 1000
+        self.profiled_requests = 0
+        self.overlapping_requests = 0  # not triggering, but started while sampling was on
+        self.started_at = None
+        self.stopped_at = None
+
+    # ---------- session control ----------
+
+    def start(self, requests: Optional[int] = None, seconds: Optional[float] = None,
+              trigger_pattern: Optional[str] = None, trigger_rate: float = 1.0,
+              interval_ms: float = PROFILER_INTERVAL_MS) -> Dict:
+        with self.lock:
+            self._reset()
+            self.remaining = requests
+            self.deadline = time.monotonic() + seconds if seconds else None
+            self.trigger_pattern = re.compile(trigger_pattern) if trigger_pattern else None
+            self.trigger_rate = trigger_rate
+            self.interval = interval_ms / 1000
+            self.started_at = time.time()
+            self.active = True
+            # Under the lock: a sampler that saw no session has already given up its slot
+            if self.sampler is None:
+                self.sampler = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+                self.sampler.start()
+        return self.status()
+
+    def stop(self) -> Dict:
+        with self.lock:
+            if self.active:
+                self.active = False
+                self.stopped_at = time.time()
+        self.wake.set()
+        return self.status()
+
+    def status(self) -> Dict:
+        return {
+            "active": self.active,
+            "remaining_requests": self.remaining,
+            "seconds_left": round(max(self.deadline - time.monotonic(), 0), 1) if self.deadline and self.active else None,
+            "trigger_pattern": self.trigger_pattern.pattern if self.trigger_pattern else None,
+            "trigger_rate": self.trigger_rate,
+            "interval_ms": self.interval * 1000,
+            "profiled_requests": self.profiled_requests,
+            "overlapping_requests": self.overlapping_requests,
+            "samples": sum(self.stacks.values()),
+            "started_at": self.started_at,
+            "stopped_at": self.stopped_at,
+        }
+
+    # ---------- request selection (called by the middleware) ----------
+
+    def should_profile(self, path: str) -> bool:
+        if path.startswith(EXCLUDED_PREFIX):
+            return False
+        with self.lock:
+            if not self.active:
+                return False
+            if self.deadline is not None and time.monotonic() >= self.deadline:
+                self.active = False
+                self.stopped_at = time.time()
+                return False
+            if ((self.trigger_pattern and not self.trigger_pattern.search(path))
+                    or (self.trigger_rate < 1 and random.random() >= self.trigger_rate)):
+                if self.in_flight > 0:
+                    self.overlapping_requests += 1
+                return False
+            if self.remaining is not None:
+                self.remaining -= 1
+                if self.remaining <= 0:
+                    self.active = False  # this is the last one; the session ends once it finishes
+                    self.stopped_at = time.time()
+            self.profiled_requests += 1
+            self.in_flight += 1
+        self.wake.set()
+        return True
+
+    def request_finished(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    # ---------- sampling ----------
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while True:
+            if self.in_flight <= 0:
+                with self.lock:
+                    # Decide and hand off together, so start() either sees us exiting or keeps us running
+                    if not self.active and self.in_flight <= 0:
+                        self.sampler = None
+                        return
+                self.wake.clear()
+                self.wake.wait(0.5)
+                continue
+            self._sample(own_id)
+            time.sleep(self.interval)
+
+    def _sample(self, own_id: int):
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            stack: List[Frame] = []
+            while frame is not None and len(stack) < PROFILER_MAX_DEPTH:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            if not stack or _is_idle(stack[0]):
+                continue
+            stack.reverse()  # root first
+            key = tuple(stack)
+            self.stacks[key] = self.stacks.get(key, 0) + 1
+
+    # ---------- output ----------
+
+    @staticmethod
+    def _label(frame: Frame) -> str:
+        name, filename, line = frame
+        return f"{name} ({os.path.basename(filename)}:{line})".replace(";", ",")
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed format: "root;caller;callee count" per line"""
+        # dict() copies atomically, so the sampler can keep running while we render
+        stacks = dict(self.stacks)
+        return "".join(
+            ";".join(self._label(frame) for frame in stack) + f" {count}\n"
+            for stack, count in sorted(stacks.items(), key=lambda item: -item[1])
+        )
+
+    def speedscope(self) -> Dict:
+        """Sampled profile in speedscope's file format, one entry per distinct stack"""
+        frames: Dict[Frame, int] = {}
+        samples, weights = [], []
+        interval_ms = self.interval * 1000
+        for stack, count in dict(self.stacks).items():
+            samples.append([frames.setdefault(frame, len(frames)) for frame in stack])
+            weights.append(count * interval_ms)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "exporter": "skillstack-sampling-profiler",
+            "name": "skillstack",
+            "activeProfileIndex": 0,
+            "shared": {"frames": [
+                {"name": name, "file": filename, "line": line} for name, filename, line in frames
+            ]},
+            "profiles": [{
+                "type": "sampled",
+                "name": f"{self.profiled_requests} requests ({self.overlapping_requests} overlapping), "
+                        f"{sum(weights) / interval_ms:.0f} samples",
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+
+class ProfilerMiddleware:
+    """Pure ASGI middleware marking the requests a profiling session selected"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        profiler = get_profiler()
+        if scope["type"] != "http" or not profiler.active or not profiler.should_profile(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiler.request_finished()
+
+
+# Singleton instance
+_profiler = None
+
+def get_profiler() -> SamplingProfiler:
+    global _profiler
+    if _profiler is None:
+        _profiler = SamplingProfiler()
+    return _profiler
@@ -0,0 +1,212 @@
+"""
+Per-statement query statistics and slow-query plans
+Every statement the engine runs (see database/db.py's cursor events) is
+normalized to a fingerprint (literals, placeholders and IN/VALUES lists
+collapsed) with call counts and p50/p95/p99 over its recent durations.
+Statements slower than SLOW_QUERY_MS are counted as slow; a sampled share of
+slow SELECTs is re-run by a background worker under EXPLAIN (ANALYZE, BUFFERS)
+in a read-only transaction, and the plans are kept in a ring buffer.
+"""
+from observability.metrics import REGISTRY
+from observability.request_context import log_event
+from collections import deque
+from functools import lru_cache
+from typing import Deque, Dict, List, Optional
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+SLOW_QUERY_EXPLAIN_RATE = float(os.getenv("SLOW_QUERY_EXPLAIN_RATE", "0"))  # 0 = never run EXPLAIN
+SLOW_QUERY_PLANS = int(os.getenv("SLOW_QUERY_PLANS", "50"))
+QUERY_STATS_MAX_FINGERPRINTS = int(os.getenv("QUERY_STATS_MAX_FINGERPRINTS", "2000"))
+QUERY_STATS_WINDOW = 1000  # recent durations kept per fingerprint for percentiles
+
+DB_SLOW_QUERIES = REGISTRY.counter("db_slow_queries_total", "Statements slower than SLOW_QUERY_MS")
+
+OVERFLOW_FINGERPRINT = "(other statements)"
+
+logger = logging.getLogger("skillstack.queries")
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|(?<![:\w]):\w+|\?")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ROWS = re.compile(r"(\(\?(?:, \?)*\))(?:\s*,\s*\(\?(?:, \?)*\))+")
+_SPACE = re.compile(r"\s+")
+_WRITE = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE|FOR UPDATE|FOR SHARE)\b", re.IGNORECASE)
+# Functions whose effects outlive a rolled-back read-only transaction (session locks, sequences, settings)
+_SIDE_EFFECTS = re.compile(
+    r"\b(pg_\w*advisory\w*|nextval|setval|set_config|pg_notify|pg_sleep|dblink\w*|lo_\w+)\s*\(", re.IGNORECASE
+)
+# FROM followed by a table name (not a subquery or a set-returning function call)
+_READS_RELATION = re.compile(r"\bFROM\s+[\w\".]+(?![\w\".]|\s*\()", re.IGNORECASE)
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> str:
+    """Normalize a statement so executions differing only in values share one entry"""
+    sql = _STRING.sub("?", statement)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _SPACE.sub(" ", sql).strip()
+    sql = _ROWS.sub(r"\1, ...", sql)
+    return _LIST.sub("(?...)", sql)
+
+
+def _explainable(sql: str) -> bool:
+    """Only plain reads of a table: ANALYZE executes the statement"""
+    head = sql.lstrip().split(" ", 1)[0].upper()
+    return (head in ("SELECT", "WITH") and _READS_RELATION.search(sql) is not None
+            and not _WRITE.search(sql) and not _SIDE_EFFECTS.search(sql))
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class StatementStats:
+    __slots__ = ("calls", "total_seconds", "max_seconds", "slow_calls", "recent", "example")
+
+    def __init__(self):
+        self.calls = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.slow_calls = 0
+        self.recent: Deque[float] = deque(maxlen=QUERY_STATS_WINDOW)
+        self.example: Optional[str] = None  # raw text of the slowest call
+
+    def to_dict(self, fingerprint: str) -> Dict:
+        ordered = sorted(self.recent)
+        return {
+            "fingerprint": fingerprint,
+            "calls": self.calls,
+            "slow_calls": self.slow_calls,
+            "total_ms": round(self.total_seconds * 1000, 2),
+            "mean_ms": round(self.total_seconds * 1000 / self.calls, 3),
+            "p50_ms": round(_percentile(ordered, 0.50) * 1000, 3),
+            "p95_ms": round(_percentile(ordered, 0.95) * 1000, 3),
+            "p99_ms": round(_percentile(ordered, 0.99) * 1000, 3),
+            "max_ms": round(self.max_seconds * 1000, 3),
+            "example": self.example,
+        }
+
+
+class QueryStats:
+    def __init__(self, slow_ms: float = SLOW_QUERY_MS, explain_rate: float = SLOW_QUERY_EXPLAIN_RATE,
+                 max_plans: int = SLOW_QUERY_PLANS):
+        self.slow_seconds = slow_ms / 1000
+        self.explain_rate = explain_rate
+        self.lock = threading.Lock()
+        self.statements: Dict[str, StatementStats] = {}
+        self.plans: Deque[Dict] = deque(maxlen=max_plans)
+        self.explain_queue: "queue.Queue" = queue.Queue(maxsize=16)
+        self.explain_worker: Optional[threading.Thread] = None
+        self.since = time.time()
+
+    def record(self, engine, statement: str, parameters, seconds: float, executemany: bool):
+        key = fingerprint(statement)
+        slow = seconds >= self.slow_seconds
+        with self.lock:
+            stats = self.statements.get(key)
+            if stats is None:
+                if len(self.statements) >= QUERY_STATS_MAX_FINGERPRINTS:
+                    key = OVERFLOW_FINGERPRINT
+                stats = self.statements.setdefault(key, StatementStats())
+            stats.calls += 1
+            stats.total_seconds += seconds
+            stats.recent.append(seconds)
+            if seconds > stats.max_seconds:
+                stats.max_seconds = seconds
+                stats.example = statement[:2000]
+            if slow:
+                stats.slow_calls += 1
+        if not slow:
+            return
+        DB_SLOW_QUERIES.inc()
+        if (self.explain_rate and not executemany and random.random() < self.explain_rate
+                and _explainable(statement)):
+            self._queue_explain(engine, key, statement, parameters, seconds)
+
+    # ---------- EXPLAIN worker ----------
+
+    def _queue_explain(self, engine, key: str, statement: str, parameters, seconds: float):
+        try:
+            self.explain_queue.put_nowait((engine, key, statement, parameters, seconds))
+        except queue.Full:
+            return  # a burst of slow queries; the plans already queued are enough
+        if self.explain_worker is None or not self.explain_worker.is_alive():
+            self.explain_worker = threading.Thread(target=self._explain_loop, name="slow-query-explain", daemon=True)
+            self.explain_worker.start()
+
+    def _explain_loop(self):
+        while True:
+            try:
+                job = self.explain_queue.get(timeout=60)
+            except queue.Empty:
+                self.explain_worker = None
+                return
+            self._explain(*job)
+
+    def _explain(self, engine, key: str, statement: str, parameters, seconds: float):
+        entry = {
+            "fingerprint": key,
+            "statement": statement[:2000],
+            "duration_ms": round(seconds * 1000, 2),
+            "captured_at": time.time(),
+        }
+        try:
+            # Its own connection, excluded from these stats, never committed, and
+            # discarded afterwards so no session state can leak back into the pool
+            with engine.connect().execution_options(query_stats=False) as conn:
+                try:
+                    if engine.dialect.name == "postgresql":
+                        conn.exec_driver_sql("SET TRANSACTION READ ONLY")
+                        rows = conn.exec_driver_sql("EXPLAIN (ANALYZE, BUFFERS) " + statement, parameters)
+                    else:
+                        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)
+                    entry["plan"] = "\n".join(str(row[-1]) for row in rows)
+                finally:
+                    conn.invalidate()
+        except Exception as e:
+            entry["error"] = str(e)
+            log_event(logger, "slow_query_explain_failed", logging.ERROR, fingerprint=key, error=str(e))
+        self.plans.append(entry)
+
+    # ---------- reporting ----------
+
+    def report(self, limit: int = 50, order_by: str = "total_ms", slow_only: bool = False) -> Dict:
+        with self.lock:
+            rows = [stats.to_dict(key) for key, stats in self.statements.items()
+                    if not slow_only or stats.slow_calls]
+        rows.sort(key=lambda row: row[order_by], reverse=True)
+        return {
+            "since": self.since,
+            "slow_query_ms": self.slow_seconds * 1000,
+            "fingerprints": len(rows),
+            "statements": rows[:limit],
+        }
+
+    def recent_plans(self) -> List[Dict]:
+        return list(reversed(self.plans))
+
+    def reset(self):
+        with self.lock:
+            self.statements.clear()
+            self.plans.clear()
+            self.since = time.time()
+
+
+# Singleton instance
+_query_stats = None
+
+def get_query_stats() -> QueryStats:
+    global _query_stats
+    if _query_stats is None:
+        _query_stats = QueryStats()
+    return _query_stats
@@ -0,0 +1,62 @@
+"""
+Request IDs and structured log records
+Every request gets an id (taken from X-Request-ID or generated) that is
+attached to structured log records emitted while handling it
+"""
+from contextvars import ContextVar
+from datetime import datetime
+import json
+import logging
+import uuid
+
+
+REQUEST_ID_HEADER = "x-request-id"
+
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+
+def get_request_id() -> str:
+    return request_id_var.get()
+
+
+def log_event(logger: logging.Logger, event: str, level: int = logging.INFO, **fields):
+    """Emit one JSON log line carrying the current request id"""
+    record = {
+        "ts": datetime.utcnow().isoformat() + "Z",
+        "event": event,
+        "request_id": get_request_id(),
+        **fields,
+    }
+    logger.log(level, json.dumps(record, default=str))
+
+
+class RequestIdMiddleware:
+    """Pure ASGI middleware so the id is visible to sync and async endpoints alike"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", []):
+            if name == REQUEST_ID_HEADER.encode():
+                request_id = value.decode("latin-1")[:128]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((REQUEST_ID_HEADER.encode(), request_id.encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
@@ -0,0 +1,165 @@
+"""
+Per-request timing
+Attributes database time and query count (from the engine's cursor events),
+auth time and AI call time to the request being handled, reports them in a
+Server-Timing header and logs slow requests with their slowest statements.
+In development REQUEST_QUERY_LIMIT fails requests that run too many queries,
+which catches N+1 regressions early.
+"""
+from observability.metrics import REGISTRY
+from observability.request_context import log_event
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+import heapq
+import logging
+import os
+import threading
+import time
+
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "500"))
+SLOW_REQUEST_STATEMENTS = int(os.getenv("SLOW_REQUEST_STATEMENTS", "5"))
+REQUEST_QUERY_LIMIT = int(os.getenv("REQUEST_QUERY_LIMIT", "0"))  # 0 = off; set in dev/CI only
+
+HTTP_LATENCY = REGISTRY.histogram("http_request_duration_seconds", "Request latency until the response started", ["method", "route"])
+HTTP_DB_QUERIES = REGISTRY.histogram(
+    "http_request_db_queries", "SQL statements per request", ["route"], buckets=(1, 2, 3, 5, 8, 13, 21, 50, 100)
+)
+HTTP_DB_SECONDS = REGISTRY.histogram("http_request_db_seconds", "Time in SQL statements per request", ["route"])
+
+logger = logging.getLogger("skillstack.timing")
+
+
+class QueryLimitExceeded(RuntimeError):
+    """Raised (dev only) when a request runs more than REQUEST_QUERY_LIMIT statements"""
+
+
+class RequestTiming:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.spans: Dict[str, float] = {}
+        # Min-heap of the slowest (seconds, statement) pairs
+        self.slowest: List[Tuple[float, str]] = []
+        self.finished = False
+        # Dashboard sections and batch AI calls report from several threads at once
+        self.lock = threading.Lock()
+
+    def add_query(self, statement: str, seconds: float):
+        with self.lock:
+            self.db_queries += 1
+            self.db_seconds += seconds
+            entry = (seconds, statement[:500])
+            if len(self.slowest) < SLOW_REQUEST_STATEMENTS:
+                heapq.heappush(self.slowest, entry)
+            elif seconds > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, entry)
+
+    def add_span(self, name: str, seconds: float):
+        with self.lock:
+            self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        parts = [f"total;dur={self.elapsed() * 1000:.1f}",
+                 f'db;dur={self.db_seconds * 1000:.1f};desc="{self.db_queries} queries"']
+        parts += [f"{name};dur={seconds * 1000:.1f}" for name, seconds in sorted(self.spans.items())]
+        return ", ".join(parts)
+
+
+_timing_var: ContextVar[Optional[RequestTiming]] = ContextVar("request_timing", default=None)
+
+
+def current_timing() -> Optional[RequestTiming]:
+    timing = _timing_var.get()
+    # Background tasks spawned by a request inherit its context; stop counting once it's done
+    return timing if timing is not None and not timing.finished else None
+
+
+def check_query_limit():
+    """Called before every statement; raises once a request goes over REQUEST_QUERY_LIMIT"""
+    if not REQUEST_QUERY_LIMIT:
+        return
+    timing = current_timing()
+    if timing is not None and timing.db_queries >= REQUEST_QUERY_LIMIT:
+        raise QueryLimitExceeded(
+            f"Request exceeded REQUEST_QUERY_LIMIT={REQUEST_QUERY_LIMIT} SQL statements (N+1 query?)"
+        )
+
+
+def record_query(statement: str, seconds: float):
+    timing = current_timing()
+    if timing is not None:
+        timing.add_query(statement, seconds)
+
+
+def record_span(name: str, seconds: float):
+    timing = current_timing()
+    if timing is not None:
+        timing.add_span(name, seconds)
+
+
+@contextmanager
+def timed(name: str):
+    """Add the time spent in the block to the current request's <name> span"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - started)
+
+
+class RequestTimingMiddleware:
+    """Pure ASGI middleware; Server-Timing covers the time until the response starts"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming()
+        token = _timing_var.set(timing)
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timing.server_timing().encode("latin-1")))
+                message["headers"] = headers
+                self._observe(scope, timing, status_code)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            timing.finished = True
+            _timing_var.reset(token)
+
+    @staticmethod
+    def _observe(scope, timing: RequestTiming, status_code: int):
+        route = getattr(scope.get("route"), "path", "unmatched")
+        elapsed = timing.elapsed()
+        HTTP_LATENCY.observe(elapsed, method=scope["method"], route=route)
+        HTTP_DB_QUERIES.observe(timing.db_queries, route=route)
+        HTTP_DB_SECONDS.observe(timing.db_seconds, route=route)
+        if elapsed * 1000 >= SLOW_REQUEST_MS:
+            log_event(
+                logger, "slow_request", logging.WARNING,
+                method=scope["method"], path=scope["path"], route=route, status=status_code,
+                duration_ms=round(elapsed * 1000, 1),
+                db_ms=round(timing.db_seconds * 1000, 1), db_queries=timing.db_queries,
+                spans_ms={name: round(seconds * 1000, 1) for name, seconds in timing.spans.items()},
+                slowest_statements=[
+                    {"ms": round(seconds * 1000, 2), "sql": statement}
+                    for seconds, statement in sorted(timing.slowest, reverse=True)
+                ],
+            )
@@ -0,0 +1,228 @@
+"""
+Learning analytics
+Time-series of hours logged, completions and starts per day/week/month,
+rolling velocity and streaks, computed in Postgres with date_trunc and window
+functions over resource_time_daily and the resources' start/completion dates,
+plus per-dimension breakdowns from a single GROUPING SETS query
+"""
+from database.models import User
+from observability.metrics import CACHE_REQUESTS
+from cachetools import TTLCache
+from sqlalchemy import text
+from datetime import datetime, timedelta
+from typing import Dict, List
+import os
+
+
+BUCKET_STEPS = {"day": "1 day", "week": "1 week", "month": "1 month"}
+DEFAULT_PERIODS = {"day": 30, "week": 12, "month": 12}
+# Buckets averaged into the rolling velocity
+VELOCITY_WINDOWS = {"day": 7, "week": 4, "month": 3}
+
+# Closed buckets can still change (late time-log flushes, imports and edits
+# with past dates), so cached ones are keyed on library_version, which all of
+# those bump; the TTL only bounds how long superseded versions linger
+TIMESERIES_CACHE_TTL = float(os.getenv("TIMESERIES_CACHE_TTL", "3600"))
+TIMESERIES_CACHE_SIZE = int(os.getenv("TIMESERIES_CACHE_SIZE", "4096"))
+
+
+def _timeseries_sql(window: int):
+    return text(f"""
+        WITH series AS (
+            SELECT generate_series(
+                date_trunc(:bucket, CAST(:since AS timestamp)),
+                date_trunc(:bucket, CAST(:now AS timestamp)),
+                CAST(:step AS interval)
+            ) AS bucket
+        ),
+        hours AS (
+            SELECT date_trunc(:bucket, CAST(day AS timestamp)) AS bucket, SUM(hours) AS hours
+            FROM resource_time_daily
+            WHERE user_id = :user_id AND day >= CAST(:since AS date)
+            GROUP BY 1
+        ),
+        completions AS (
+            SELECT date_trunc(:bucket, completion_date) AS bucket, COUNT(*) AS completions
+            FROM resources
+            WHERE user_id = :user_id AND progress_status = 'completed' AND completion_date >= :since
+            GROUP BY 1
+        ),
+        starts AS (
+            SELECT date_trunc(:bucket, started_date) AS bucket, COUNT(*) AS starts
+            FROM resources
+            WHERE user_id = :user_id AND started_date >= :since
+            GROUP BY 1
+        )
+        SELECT s.bucket,
+               COALESCE(h.hours, 0) AS hours,
+               COALESCE(c.completions, 0) AS completions,
+               COALESCE(st.starts, 0) AS starts,
+               AVG(COALESCE(h.hours, 0)) OVER velocity_window AS velocity
+        FROM series s
+        LEFT JOIN hours h ON h.bucket = s.bucket
+        LEFT JOIN completions c ON c.bucket = s.bucket
+        LEFT JOIN starts st ON st.bucket = s.bucket
+        WINDOW velocity_window AS (ORDER BY s.bucket ROWS BETWEEN {window - 1} PRECEDING AND CURRENT ROW)
+        ORDER BY s.bucket
+    """)
+
+
+# Gaps-and-islands: consecutive active days share (day - row_number)
+STREAKS_SQL = text("""
+    WITH active AS (
+        SELECT day FROM resource_time_daily WHERE user_id = :user_id AND hours > 0
+        UNION
+        SELECT CAST(completion_date AS date) FROM resources
+        WHERE user_id = :user_id AND progress_status = 'completed' AND completion_date IS NOT NULL
+    ),
+    islands AS (
+        SELECT day, day - CAST(ROW_NUMBER() OVER (ORDER BY day) AS integer) AS island
+        FROM active
+    ),
+    runs AS (
+        SELECT MAX(day) AS last_day, COUNT(*) AS length
+        FROM islands
+        GROUP BY island
+    )
+    SELECT COALESCE(MAX(length), 0) AS longest,
+           COALESCE(MAX(CASE WHEN last_day >= :yesterday THEN length END), 0) AS current
+    FROM runs
+""")
+
+
+def _bucket_start(now: datetime, bucket: str) -> datetime:
+    day = datetime(now.year, now.month, now.day)
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())  # date_trunc('week') starts on Monday
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _shift(start: datetime, bucket: str, count: int) -> datetime:
+    """Move a bucket start back by count buckets"""
+    if bucket == "day":
+        return start - timedelta(days=count)
+    if bucket == "week":
+        return start - timedelta(weeks=count)
+    months = start.year * 12 + start.month - 1 - count
+    return start.replace(year=months // 12, month=months % 12 + 1)
+
+
+def _row(row) -> Dict:
+    return {
+        "bucket": row.bucket,
+        "hours": float(row.hours),
+        "completions": int(row.completions),
+        "starts": int(row.starts),
+        "velocity": round(float(row.velocity), 3),
+    }
+
+
+class LearningTimeseries:
+    """
+    Closed buckets are cached per (user, bucket size, periods, library_version);
+    while the current bucket hasn't rolled over only that bucket is recomputed
+    """
+
+    def __init__(self):
+        self.cache = TTLCache(maxsize=TIMESERIES_CACHE_SIZE, ttl=TIMESERIES_CACHE_TTL)
+
+    def _query(self, db, user_id: int, bucket: str, since: datetime, now: datetime) -> List[Dict]:
+        rows = db.execute(_timeseries_sql(VELOCITY_WINDOWS[bucket]), {
+            "bucket": bucket, "step": BUCKET_STEPS[bucket], "since": since, "now": now, "user_id": user_id,
+        }).all()
+        return [_row(row) for row in rows]
+
+    def get(self, db, user_id: int, bucket: str, periods: int) -> Dict:
+        now = datetime.utcnow()
+        current_start = _bucket_start(now, bucket)
+        window = VELOCITY_WINDOWS[bucket]
+        version = db.query(User.library_version).filter(User.id == user_id).scalar() or 0
+        key = (user_id, bucket, periods, version)
+
+        cached = self.cache.get(key)
+        if cached is not None and cached["current_start"] == current_start:
+            CACHE_REQUESTS.inc(cache="timeseries", result="hit")
+            history = cached["history"]
+            current = self._query(db, user_id, bucket, current_start, now)[-1]
+            # The window function only saw the current bucket; fold in the cached ones
+            recent = [row["hours"] for row in history[-(window - 1):]] + [current["hours"]]
+            current["velocity"] = round(sum(recent) / len(recent), 3)
+        else:
+            CACHE_REQUESTS.inc(cache="timeseries", result="miss")
+            # Extra leading buckets so the first returned bucket has a full velocity window
+            since = _shift(current_start, bucket, periods - 1 + window - 1)
+            rows = self._query(db, user_id, bucket, since, now)
+            history, current = rows[:-1], rows[-1]
+            self.cache[key] = {"current_start": current_start, "history": history}
+
+        longest, current_streak = db.execute(STREAKS_SQL, {
+            "user_id": user_id, "yesterday": now.date() - timedelta(days=1),
+        }).one()
+
+        closed = history[len(history) - (periods - 1):] if periods > 1 else []
+        return {
+            "bucket": bucket,
+            "series": closed + [current],
+            "current_streak_days": int(current_streak),
+            "longest_streak_days": int(longest),
+        }
+
+
+# One scan, three groupings: GROUPING(col) is 0 in the rows grouped by col
+BREAKDOWN_SQL = text("""
+    SELECT GROUPING(r.resource_type_id) AS type_grouping,
+           GROUPING(r.resource_platform_id) AS platform_grouping,
+           r.resource_type_id, rt.name AS type_name,
+           r.resource_platform_id, rp.name AS platform_name,
+           r.ai_category,
+           COUNT(*) AS count,
+           SUM(CASE WHEN r.progress_status = 'completed' THEN 1 ELSE 0 END) AS completed,
+           SUM(COALESCE(r.hours_spent, 0)) AS hours_spent,
+           AVG(r.rating) AS average_rating
+    FROM resources r
+    LEFT JOIN resource_types rt ON rt.id = r.resource_type_id
+    LEFT JOIN resource_platforms rp ON rp.id = r.resource_platform_id
+    WHERE r.user_id = :user_id
+    GROUP BY GROUPING SETS (
+        (r.resource_type_id, rt.name),
+        (r.resource_platform_id, rp.name),
+        (r.ai_category)
+    )
+    ORDER BY count DESC
+""")
+
+
+def resource_breakdown(db, user_id: int) -> Dict:
+    """Counts, completion rate, hours and average rating per type, platform and AI category"""
+    breakdown = {"resource_type": [], "resource_platform": [], "ai_category": []}
+    for row in db.execute(BREAKDOWN_SQL, {"user_id": user_id}):
+        if row.type_grouping == 0:
+            dimension, key, name = "resource_type", row.resource_type_id, row.type_name
+        elif row.platform_grouping == 0:
+            dimension, key, name = "resource_platform", row.resource_platform_id, row.platform_name
+        else:
+            dimension, key, name = "ai_category", None, row.ai_category
+        entry = {
+            "name": name,  # None groups resources without a type / platform / category
+            "count": int(row.count),
+            "completed": int(row.completed),
+            "completion_rate": round(int(row.completed) / int(row.count) * 100, 1),
+            "hours_spent": float(row.hours_spent),
+            "average_rating": round(float(row.average_rating), 2) if row.average_rating is not None else None,
+        }
+        if dimension != "ai_category":
+            entry = {"id": key, **entry}
+        breakdown[dimension].append(entry)
+    return breakdown
+
+
+# Singleton instance
+_learning_timeseries = None
+
+def get_learning_timeseries() -> LearningTimeseries:
+    global _learning_timeseries
+    if _learning_timeseries is None:
+        _learning_timeseries = LearningTimeseries()
+    return _learning_timeseries
@@ -0,0 +1,60 @@
+"""
+Conditional requests
+List ETags come from users.data_version, which get_current_user already
+loaded, so a matching If-None-Match is answered with 304 before any rows are
+read. Single resources get a strong ETag from their row, used for If-Match.
+"""
+from fastapi import HTTPException, Request, Response, status
+from typing import Optional
+import hashlib
+
+
+# Browsers may keep the response but must revalidate it (cheaply, via ETag) before use
+LIST_CACHE_CONTROL = "private, no-cache"
+
+
+def list_etag(user, scope: str) -> str:
+    return f'W/"{scope}-{user.id}-{user.data_version or 0}"'
+
+
+def resource_etag(resource) -> str:
+    fingerprint = "|".join(str(value) for value in (
+        resource.id, resource.updated_at, resource.ai_category, resource.ai_tags,
+        resource.ai_summary, resource.ai_mastery_date,
+    ))
+    return f'"{hashlib.sha1(fingerprint.encode()).hexdigest()[:20]}"'
+
+
+def _tags(header: Optional[str]):
+    return [tag.strip() for tag in (header or "").split(",") if tag.strip()]
+
+
+def _opaque(tag: str) -> str:
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """
+    Set ETag / Cache-Control on the response; return a 304 to send instead
+    if If-None-Match matches (weak comparison)
+    """
+    headers = {"ETag": etag, "Cache-Control": LIST_CACHE_CONTROL, "Vary": "Authorization"}
+    tags = _tags(request.headers.get("if-none-match"))
+    if "*" in tags or _opaque(etag) in {_opaque(tag) for tag in tags}:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+def check_if_match(request: Request, current_etag: str):
+    """Optimistic concurrency: 412 unless If-Match (strong comparison) names the current version"""
+    header = request.headers.get("if-match")
+    if header is None:
+        return
+    tags = _tags(header)
+    if "*" in tags or current_etag in tags:
+        return
+    raise HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        detail="Resource was modified since it was fetched"
+    )
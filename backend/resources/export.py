@@ -0,0 +1,97 @@
+"""
+Library Export
+Streams a user's resources as NDJSON or CSV straight from a server-side
+cursor, EXPORT_BATCH_SIZE rows at a time, so memory stays flat no matter how
+large the library is
+"""
+from database.db import engine
+from database.models import Resources, ResourceType, ResourcePlatform
+from sqlalchemy import select
+from typing import Iterator
+import csv
+import io
+import orjson
+import os
+import zlib
+
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+EXPORT_COLUMNS = [
+    Resources.id,
+    Resources.name,
+    ResourceType.name.label("resource_type"),
+    ResourcePlatform.name.label("resource_platform"),
+    Resources.description,
+    Resources.notes,
+    Resources.rating,
+    Resources.progress_status,
+    Resources.estimated_hours,
+    Resources.hours_spent,
+    Resources.started_date,
+    Resources.completion_date,
+    Resources.ai_category,
+    Resources.ai_tags,
+    Resources.ai_summary,
+    Resources.ai_mastery_date,
+    Resources.created_at,
+    Resources.updated_at,
+]
+EXPORT_FIELDS = [column.key for column in EXPORT_COLUMNS]
+
+
+def _export_query(user_id: int):
+    return (
+        select(*EXPORT_COLUMNS)
+        .outerjoin(ResourceType, Resources.resource_type_id == ResourceType.id)
+        .outerjoin(ResourcePlatform, Resources.resource_platform_id == ResourcePlatform.id)
+        .where(Resources.user_id == user_id)
+        .order_by(Resources.id)
+    )
+
+
+def _ndjson(batch) -> bytes:
+    return b"".join(orjson.dumps(dict(zip(EXPORT_FIELDS, row))) + b"\n" for row in batch)
+
+
+def _csv_value(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if isinstance(value, (list, dict)):
+        # JSON, not a Python repr, so other tools can parse it back
+        return orjson.dumps(value).decode()
+    return value
+
+
+def _csv(batch) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_csv_value(value) for value in row] for row in batch)
+    return buffer.getvalue().encode()
+
+
+def export_resources(user_id: int, fmt: str, compress: bool = False, bind=engine) -> Iterator[bytes]:
+    """
+    Yield the export in chunks of one batch each. Uses its own connection, so
+    it can run after the request's session is closed.
+    """
+    encode = _ndjson if fmt == "ndjson" else _csv
+    compressor = zlib.compressobj(wbits=31) if compress else None  # wbits=31: gzip framing
+
+    def emit(chunk: bytes) -> bytes:
+        return compressor.compress(chunk) if compressor else chunk
+
+    if fmt == "csv":
+        yield emit(_csv([EXPORT_FIELDS]))
+    with bind.connect() as conn:
+        result = conn.execution_options(stream_results=True, max_row_buffer=EXPORT_BATCH_SIZE).execute(_export_query(user_id))
+        for batch in result.partitions(EXPORT_BATCH_SIZE):
+            chunk = emit(encode(batch))
+            if chunk:
+                yield chunk
+    if compressor:
+        yield compressor.flush()
@@ -0,0 +1,244 @@
+"""
+Bulk Library Import
+Loads CSV or NDJSON uploads (same columns as the export) in batches of
+IMPORT_BATCH_SIZE rows: rows are validated one by one, type and platform
+names are resolved with one lookup and one insert per batch, and valid rows
+go through COPY into a temp staging table and one INSERT ... SELECT merge.
+Each batch commits on its own and yields a progress event with its row errors.
+"""
+from database.db import SessionLocal
+from database.models import ResourceType, ResourcePlatform
+from resources.versioning import bump_library_version
+from resources.response_cache import invalidate_on_commit
+from activities.activity import record_activity
+from observability.request_context import log_event
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+from sqlalchemy import insert, select, text
+from datetime import datetime
+from typing import Dict, Iterator, List, Literal, Optional, Tuple
+import codecs
+import csv
+import io
+import logging
+import orjson
+import os
+
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "5000"))
+IMPORT_MAX_BYTES = int(os.getenv("IMPORT_MAX_BYTES", str(200 * 1024 * 1024)))
+
+logger = logging.getLogger("skillstack.import")
+
+
+class ImportRow(BaseModel):
+    model_config = ConfigDict(extra="ignore", str_strip_whitespace=True)
+
+    name: str = Field(..., min_length=1)
+    resource_type: Optional[str] = None
+    resource_platform: Optional[str] = None
+    description: Optional[str] = None
+    notes: Optional[str] = None
+    rating: Optional[int] = None
+    progress_status: Literal["not_started", "in_progress", "completed"] = "not_started"
+    estimated_hours: Optional[int] = None
+    hours_spent: Optional[float] = Field(0, ge=0)
+    started_date: Optional[datetime] = None
+    completion_date: Optional[datetime] = None
+
+
+STAGING_COLUMNS = [
+    "row_number", "name", "resource_type_id", "resource_platform_id", "description", "notes",
+    "rating", "progress_status", "estimated_hours", "hours_spent", "started_date", "completion_date",
+]
+
+STAGING_DDL = """
+    CREATE TEMP TABLE IF NOT EXISTS resource_import_staging (
+        row_number INTEGER,
+        name VARCHAR,
+        resource_type_id INTEGER,
+        resource_platform_id INTEGER,
+        description VARCHAR,
+        notes VARCHAR,
+        rating INTEGER,
+        progress_status VARCHAR,
+        estimated_hours INTEGER,
+        hours_spent DOUBLE PRECISION,
+        started_date TIMESTAMP,
+        completion_date TIMESTAMP
+    ){on_commit}
+"""
+
+# Same defaults as create_resource: started/completion dates follow the status
+MERGE_SQL = text("""
+    INSERT INTO resources (
+        name, user_id, resource_type_id, resource_platform_id, description, notes, rating,
+        progress_status, estimated_hours, hours_spent, started_date, completion_date, created_at, updated_at
+    )
+    SELECT
+        name, :user_id, resource_type_id, resource_platform_id, description, notes, rating,
+        progress_status, estimated_hours, COALESCE(hours_spent, 0),
+        COALESCE(started_date, CASE WHEN progress_status IN ('in_progress', 'completed') THEN :now END),
+        COALESCE(completion_date, CASE WHEN progress_status = 'completed' THEN :now END),
+        :now, :now
+    FROM resource_import_staging
+    ORDER BY row_number
+""")
+
+
+def _parse_csv(stream) -> Iterator[Tuple[int, Optional[Dict], Optional[str]]]:
+    # Decode line by line: before Python 3.11 SpooledTemporaryFile can't be wrapped in a TextIOWrapper
+    reader = csv.DictReader(codecs.iterdecode(stream, "utf-8-sig"))
+    for row_number, row in enumerate(reader, start=1):
+        yield row_number, row, None
+
+
+def _parse_ndjson(stream) -> Iterator[Tuple[int, Optional[Dict], Optional[str]]]:
+    row_number = 0
+    for line in stream:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            row = orjson.loads(line)
+        except orjson.JSONDecodeError as e:
+            yield row_number, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield row_number, None, "Expected a JSON object"
+            continue
+        yield row_number, row, None
+
+
+def _validate(row: Dict) -> ImportRow:
+    # Empty CSV cells mean "not set", so defaults apply
+    return ImportRow.model_validate({key: value for key, value in row.items() if value not in ("", None)})
+
+
+def _error_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" for e in error.errors())
+
+
+class LibraryImporter:
+    def __init__(self, db, user_id: int, batch_size: int = IMPORT_BATCH_SIZE):
+        self.db = db
+        self.user_id = user_id
+        self.batch_size = batch_size
+        self.is_postgres = db.get_bind().dialect.name == "postgresql"
+        # name -> id, filled once per name for the whole import
+        self.names = {ResourceType: {}, ResourcePlatform: {}}
+
+    def _resolve_names(self, model, names) -> Dict[str, int]:
+        """One lookup for names not seen yet in this import, one insert for the ones that don't exist"""
+        known = self.names[model]
+        missing = {name for name in names if name and name not in known}
+        if missing:
+            known.update(self.db.execute(
+                select(model.name, model.id).where(model.user_id == self.user_id, model.name.in_(missing))
+            ).all())
+            new = sorted(missing - known.keys())
+            if new:
+                now = datetime.utcnow()
+                known.update(self.db.execute(
+                    insert(model).values([{"name": name, "user_id": self.user_id, "created_at": now} for name in new])
+                    .returning(model.name, model.id)
+                ).all())
+                route = "resource-types" if model is ResourceType else "resource-platforms"
+                invalidate_on_commit(self.db, self.user_id, route)
+        return known
+
+    def _stage(self, rows: List[Dict]):
+        if self.is_postgres:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in rows:
+                writer.writerow([
+                    value.isoformat() if isinstance(value, datetime) else value
+                    for value in (row[column] for column in STAGING_COLUMNS)
+                ])
+            buffer.seek(0)
+            cursor = self.db.connection().connection.cursor()
+            cursor.copy_expert(
+                f"COPY resource_import_staging ({', '.join(STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer
+            )
+        else:
+            self.db.execute(
+                text(f"INSERT INTO resource_import_staging ({', '.join(STAGING_COLUMNS)}) "
+                     f"VALUES ({', '.join(':' + column for column in STAGING_COLUMNS)})"),
+                rows
+            )
+
+    def load_batch(self, batch: List[Tuple[int, ImportRow]]) -> int:
+        """Resolve names, stage and merge one batch of valid rows; commits. Returns rows inserted."""
+        types = self._resolve_names(ResourceType, {row.resource_type for _, row in batch})
+        platforms = self._resolve_names(ResourcePlatform, {row.resource_platform for _, row in batch})
+        self._stage([
+            {
+                **row.model_dump(exclude={"resource_type", "resource_platform"}),
+                "row_number": row_number,
+                "resource_type_id": types.get(row.resource_type),
+                "resource_platform_id": platforms.get(row.resource_platform),
+            }
+            for row_number, row in batch
+        ])
+        inserted = self.db.execute(MERGE_SQL, {"user_id": self.user_id, "now": datetime.utcnow()}).rowcount
+        if not self.is_postgres:
+            self.db.execute(text("DELETE FROM resource_import_staging"))
+
+        bump_library_version(self.db, self.user_id)
+        invalidate_on_commit(self.db, self.user_id, "stats-overview")
+        self.db.commit()
+        return inserted
+
+    def run(self, rows: Iterator[Tuple[int, Optional[Dict], Optional[str]]]) -> Iterator[Dict]:
+        """Consume parsed rows; yield one progress event per batch and a final summary"""
+        self.db.execute(text(STAGING_DDL.format(on_commit=" ON COMMIT DELETE ROWS" if self.is_postgres else "")))
+        totals = {"rows": 0, "imported": 0, "failed": 0}
+        batch, errors = [], []
+
+        def flush():
+            imported = self.load_batch(batch) if batch else 0
+            totals["imported"] += imported
+            totals["failed"] += len(errors)
+            event = {"event": "progress", **totals, "errors": list(errors)}
+            batch.clear()
+            errors.clear()
+            return event
+
+        for row_number, row, error in rows:
+            totals["rows"] += 1
+            if error is None:
+                try:
+                    batch.append((row_number, _validate(row)))
+                except ValidationError as e:
+                    error = _error_message(e)
+            if error is not None:
+                errors.append({"row": row_number, "error": error})
+            if len(batch) + len(errors) >= self.batch_size:
+                yield flush()
+        if batch or errors:
+            yield flush()
+
+        if totals["imported"]:
+            record_activity(self.db, self.user_id, "resources_imported", None, {"count": totals["imported"]})
+            self.db.commit()
+        yield {"event": "done", **totals}
+
+
+def import_resources(user_id: int, fmt: str, upload) -> Iterator[bytes]:
+    """
+    Stream NDJSON progress events while importing the spooled upload; closes
+    the upload when done. Uses its own session so it can run after the request's
+    session is closed.
+    """
+    db = SessionLocal()
+    try:
+        rows = _parse_csv(upload) if fmt == "csv" else _parse_ndjson(upload)
+        for event in LibraryImporter(db, user_id).run(rows):
+            yield orjson.dumps(event) + b"\n"
+    except Exception as e:
+        db.rollback()
+        log_event(logger, "import_failed", logging.ERROR, user_id=user_id, format=fmt, error=str(e))
+        yield orjson.dumps({"event": "error", "detail": str(e)}) + b"\n"
+    finally:
+        db.close()
+        upload.close()
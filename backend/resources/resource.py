@@ -2,17 +2,45 @@ from database.db import get_db
 from database.models import User
 from database.db import prisma
 from authentication.auth import get_current_user
-from fastapi import APIRouter, Depends
-from pydantic import BaseModel
-from typing import Optional
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, TypeAdapter
+from typing import List, Optional
 from fastapi import HTTPException, status
-from database.models import ResourceType, ResourcePlatform
+from database.models import Resources, ResourceType, ResourcePlatform
+from sqlalchemy import case, func, select
+from resources.versioning import bump_library_version, bump_data_version
+from resources.etag import list_etag, resource_etag, not_modified, check_if_match
+from resources.response_cache import get_response_cache, invalidate_on_commit
+from activities.activity import record_activity
+from resources.time_log import apply_time_log, get_time_log_buffer
+from resources.schemas import ResourceOut, ResourceTypeOut, ResourcePlatformOut, ResourceStats
+from resources.export import export_resources, EXPORT_FORMATS
+from resources.importer import import_resources, IMPORT_MAX_BYTES
+from resources.analytics import get_learning_timeseries, resource_breakdown, DEFAULT_PERIODS
+from ai.enrichment import get_enrichment_pipeline, ENRICHMENT_SOURCE_FIELDS
 from datetime import datetime
+import tempfile
 
 
 
 router = APIRouter()
 
+resource_types_adapter = TypeAdapter(List[ResourceTypeOut])
+resource_platforms_adapter = TypeAdapter(List[ResourcePlatformOut])
+
+# Logged by name only in activity events, never by value
+ACTIVITY_FREE_TEXT_FIELDS = {"notes", "description"}
+
+
+def _to_json(adapter: TypeAdapter, rows):
+    # Cached responses are stored JSON-ready so a shared backend can hold them
+    return adapter.dump_python(adapter.validate_python(rows, from_attributes=True), mode="json")
+
+
+def _owned_id(model, id: int, user_id: int):
+    # FK validation inside the write: resolves to NULL unless the user owns the row
+    return select(model.id).where(model.id == id, model.user_id == user_id).scalar_subquery()
 
 
 class ResourceCreate(BaseModel):
@@ -24,7 +52,7 @@ class ResourceCreate(BaseModel):
     rating: Optional[int] = None
     progress_status: Optional[str] = "not_started"  # not_started, in_progress, completed
     estimated_hours: Optional[int] = None
-    hours_spent: Optional[int] = 0
+    hours_spent: Optional[float] = 0
 
 class ResourceUpdate(BaseModel):
     name: Optional[str] = None
@@ -35,7 +63,11 @@ class ResourceUpdate(BaseModel):
     rating: Optional[int] = None
     progress_status: Optional[str] = None
     estimated_hours: Optional[int] = None
-    hours_spent: Optional[int] = None
+    hours_spent: Optional[float] = None
+
+class TimeLogRequest(BaseModel):
+    hours: float = Field(..., gt=0, le=24)  # fractional, e.g. 0.25 for 15 minutes
+    buffered: bool = False  # coalesce in the write-behind buffer (study timers)
 
 class ResourceTypeCreate(BaseModel):
     name: str
@@ -47,43 +79,33 @@ class ResourcePlatformCreate(BaseModel):
 
 
 
-@router.get("/resources")
-def get_resources(current_user: User = Depends(get_current_user), db=Depends(get_db)):
+@router.get("/resources", response_model=List[ResourceOut])
+def get_resources(request: Request, response: Response, current_user: User = Depends(get_current_user), db=Depends(get_db)):
+    # Answered from the already loaded user row when the client's copy is current
+    cached = not_modified(request, response, list_etag(current_user, "resources"))
+    if cached:
+        return cached
     my_resources = prisma(db).resources.find_many(where={"user_id": current_user.id})
     return my_resources
 
 
 
-@router.post("/resources", status_code=status.HTTP_201_CREATED)
+@router.post("/resources", status_code=status.HTTP_201_CREATED, response_model=ResourceOut)
 def create_resource(resource: ResourceCreate, current_user: User = Depends(get_current_user), db=Depends(get_db)):
+    user_id = current_user.id  # read once; the commit expires current_user
     # Prepare data - only include fields that have values
     data = {
         "name": resource.name,
-        "user_id": current_user.id,
+        "user_id": user_id,
         "progress_status": resource.progress_status or "not_started",
         "hours_spent": resource.hours_spent or 0,
     }
     
-    # Only add resource_type_id if it's provided
+    # Type/platform ids the user doesn't own are stored as NULL
     if resource.resource_type_id:
-        # Check if it exists first
-        resource_type = prisma(db).resourcetype.find_first(
-            where={"id": resource.resource_type_id, "user_id": current_user.id}
-        )
-        if resource_type:
-            data["resource_type_id"] = resource.resource_type_id
-        else:
-            # If doesn't exist, don't include it (will be NULL)
-            pass
-    
-    # Only add resource_platform_id if it's provided
+        data["resource_type_id"] = _owned_id(ResourceType, resource.resource_type_id, user_id)
     if resource.resource_platform_id:
-        # Check if it exists first
-        resource_platform = prisma(db).resourceplatform.find_first(
-            where={"id": resource.resource_platform_id, "user_id": current_user.id}
-        )
-        if resource_platform:
-            data["resource_platform_id"] = resource.resource_platform_id
+        data["resource_platform_id"] = _owned_id(ResourcePlatform, resource.resource_platform_id, user_id)
     
     # Add optional fields if they exist
     if resource.description:
@@ -103,46 +125,91 @@ def create_resource(resource: ResourceCreate, current_user: User = Depends(get_c
     if resource.progress_status == "completed":
         data["completion_date"] = datetime.utcnow()
     
-    new_resource = prisma(db).resources.create(data=data)
+    bump_library_version(db, user_id)
+    invalidate_on_commit(db, user_id, "stats-overview")
+    new_resource = prisma(db).resources.create_returning(
+        data=data,
+        before_commit=lambda created: record_activity(
+            db, user_id, "resource_added", created.id,
+            {"resource_name": created.name, "progress_status": created.progress_status}
+        )
+    )
+    
+    # Categorize in the background instead of waiting for the frontend to ask
+    get_enrichment_pipeline().emit(user_id, new_resource.id)
     return new_resource
-@router.get("/resources/{resource_id}")
-def get_resource(resource_id: int, current_user: User = Depends(get_current_user), db=Depends(get_db)):
+
+
+@router.get("/resources/export")
+def export_library(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    """Stream the whole library with type and platform names; gzip=true for a .gz download"""
+    filename = f"skillstack-resources.{format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        export_resources(current_user.id, format, compress=gzip),
+        media_type="application/gzip" if gzip else EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "Cache-Control": "no-store"}
+    )
+
+@router.post("/resources/import")
+async def import_library(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(ndjson|csv)$"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Bulk import from a raw CSV or NDJSON request body (export columns; format
+    defaults from Content-Type). Responds with NDJSON progress events, one per
+    batch with that batch's row errors, then a final summary.
+    """
+    fmt = format or ("ndjson" if "json" in request.headers.get("content-type", "") else "csv")
+    # Spool the upload (to disk past 8 MB) so parsing never holds the whole body
+    upload = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > IMPORT_MAX_BYTES:
+            upload.close()
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Import file too large")
+        upload.write(chunk)
+    upload.seek(0)
+    return StreamingResponse(import_resources(current_user.id, fmt, upload), media_type="application/x-ndjson")
+
+@router.get("/resources/{resource_id}", response_model=ResourceOut)
+def get_resource(resource_id: int, request: Request, response: Response, current_user: User = Depends(get_current_user), db=Depends(get_db)):
     resource = prisma(db).resources.find_first(
         where={"id": resource_id, "user_id": current_user.id}
     )
     if not resource:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Resource not found or not authorized")
+    cached = not_modified(request, response, resource_etag(resource))
+    if cached:
+        return cached
     return resource
 
-@router.put("/resources/{resource_id}")
+@router.put("/resources/{resource_id}", response_model=ResourceOut)
 def update_resource(
-    resource_id: int, resource_data: ResourceUpdate, current_user: User = Depends(get_current_user), db=Depends(get_db)
+    resource_id: int, resource_data: ResourceUpdate, request: Request, response: Response,
+    current_user: User = Depends(get_current_user), db=Depends(get_db)
 ):
-    existing_resource = prisma(db).resources.find_first(
-        where={"id": resource_id, "user_id": current_user.id}
-    )
-    if not existing_resource:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Resource not found or not authorized")
+    user_id = current_user.id  # read once; the commit expires current_user
+    now = datetime.utcnow()
 
     update_data = {}
     if resource_data.name is not None:
         update_data["name"] = resource_data.name
-    if resource_data.resource_type_id is not None:  # Changed from resourceTypeId
-        # Check if the resource type exists for this user
-        resource_type = prisma(db).resourcetype.find_first(
-            where={"id": resource_data.resource_type_id, "user_id": current_user.id}
+    # Type/platform ids the user doesn't own leave the current value in place
+    if resource_data.resource_type_id is not None:
+        update_data["resource_type_id"] = func.coalesce(
+            _owned_id(ResourceType, resource_data.resource_type_id, user_id), Resources.resource_type_id
         )
-        if resource_type:
-            update_data["resource_type_id"] = resource_data.resource_type_id
-        # If the type doesn't exist, we simply don't include it in the update
-    if resource_data.resource_platform_id is not None:  # Changed from resourcePlatformId
-        # Check if the resource platform exists for this user
-        resource_platform = prisma(db).resourceplatform.find_first(
-            where={"id": resource_data.resource_platform_id, "user_id": current_user.id}
+    if resource_data.resource_platform_id is not None:
+        update_data["resource_platform_id"] = func.coalesce(
+            _owned_id(ResourcePlatform, resource_data.resource_platform_id, user_id), Resources.resource_platform_id
         )
-        if resource_platform:
-            update_data["resource_platform_id"] = resource_data.resource_platform_id
-        # If the platform doesn't exist, we simply don't include it in the update
     if resource_data.description is not None:
         update_data["description"] = resource_data.description
     if resource_data.notes is not None:
@@ -154,39 +221,113 @@ def update_resource(
     if resource_data.hours_spent is not None:
         update_data["hours_spent"] = resource_data.hours_spent
     
-    # Handle progress status changes
+    # Handle progress status changes (evaluated against the row being updated)
     if resource_data.progress_status is not None:
         update_data["progress_status"] = resource_data.progress_status
         
-        # Auto-set started_date if moving to in_progress and not already set
-        if resource_data.progress_status == "in_progress" and not existing_resource.started_date:
-            update_data["started_date"] = datetime.utcnow()
+        # Auto-set started_date if moving to in_progress/completed and not already set
+        if resource_data.progress_status in ("in_progress", "completed"):
+            update_data["started_date"] = func.coalesce(Resources.started_date, now)
         
         # Auto-set completion_date if moving to completed
-        if resource_data.progress_status == "completed" and existing_resource.progress_status != "completed":
-            update_data["completion_date"] = datetime.utcnow()
-            # Also set started_date if not already set
-            if not existing_resource.started_date:
-                update_data["started_date"] = datetime.utcnow()
-
-    updated_resource = prisma(db).resources.update(
-        where={"id": resource_id},
-        data=update_data,  # Use the fixed update_data
+        if resource_data.progress_status == "completed":
+            update_data["completion_date"] = case(
+                (Resources.progress_status.is_distinct_from("completed"), now), else_=Resources.completion_date
+            )
+
+    if not update_data:
+        existing_resource = prisma(db).resources.find_first(where={"id": resource_id, "user_id": user_id})
+        if not existing_resource:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Resource not found or not authorized")
+        check_if_match(request, resource_etag(existing_resource))
+        response.headers["ETag"] = resource_etag(existing_resource)
+        return existing_resource
+
+    def before_commit(row, previous):
+        # Optimistic concurrency: reject the edit if someone else changed the resource first
+        check_if_match(request, resource_etag(previous))
+
+        # Only user-visible fields that actually changed go into the activity log;
+        # free text is recorded by name only, the log is append-only and kept for months
+        changed = [
+            field for field in update_data
+            if field not in ("started_date", "completion_date") and getattr(previous, field) != getattr(row, field)
+        ]
+        changes = {
+            field: {"from": getattr(previous, field), "to": getattr(row, field)}
+            for field in changed if field not in ACTIVITY_FREE_TEXT_FIELDS
+        }
+        edited = [field for field in changed if field in ACTIVITY_FREE_TEXT_FIELDS]
+        if row.progress_status == "completed" and "progress_status" in changes:
+            kind = "resource_completed"
+        elif "progress_status" in changes or "hours_spent" in changes:
+            kind = "progress_updated"
+        else:
+            kind = "resource_updated"
+        if changed:
+            payload = {"resource_name": row.name, "changes": changes}
+            if edited:
+                payload["edited"] = edited
+            record_activity(db, user_id, kind, resource_id, payload)
+
+    bump_library_version(db, user_id)
+    invalidate_on_commit(db, user_id, "stats-overview")
+    invalidate_on_commit(db, user_id, "insights", resource_id)
+    # One UPDATE ... RETURNING: ownership, FK checks and the read-back are all in it
+    updated_resource = prisma(db).resources.update_returning(
+        where={"id": resource_id, "user_id": user_id},
+        data=update_data,
+        with_previous=True,
+        before_commit=before_commit
     )
+    if not updated_resource:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Resource not found or not authorized")
+    
+    # Re-categorize only when something the categorization is based on changed
+    if ENRICHMENT_SOURCE_FIELDS & update_data.keys():
+        get_enrichment_pipeline().emit(user_id, resource_id)
+    response.headers["ETag"] = resource_etag(updated_resource)
     return updated_resource
 
 @router.delete("/resources/{resource_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_resource(resource_id: int, current_user: User = Depends(get_current_user), db=Depends(get_db)):
-    existing_resource = prisma(db).resources.find_first(
-        where={"id": resource_id, "user_id": current_user.id}
+    user_id = current_user.id
+    bump_library_version(db, user_id)
+    invalidate_on_commit(db, user_id, "stats-overview")
+    invalidate_on_commit(db, user_id, "insights", resource_id)
+    deleted = prisma(db).resources.delete_returning(
+        where={"id": resource_id, "user_id": user_id},
+        returning=("id", "name"),
+        before_commit=lambda row: record_activity(
+            db, user_id, "resource_deleted", row.id, {"resource_name": row.name}
+        )
     )
-    if not existing_resource:
+    if not deleted:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Resource not found or not authorized")
-
-    prisma(db).resources.delete(where={"id": resource_id})
     return {"message": "Resource deleted successfully"}
 
-@router.post("/resource-types", status_code=status.HTTP_201_CREATED)
+@router.post("/resources/{resource_id}/log-time")
+def log_time(resource_id: int, time_log: TimeLogRequest, current_user: User = Depends(get_current_user), db=Depends(get_db)):
+    if time_log.buffered:
+        # Ownership check only; the increment itself is written by the next flush
+        if not prisma(db).resources.find_first(where={"id": resource_id, "user_id": current_user.id}):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Resource not found or not authorized")
+        pending = get_time_log_buffer().add(current_user.id, resource_id, time_log.hours)
+        return {"resource_id": resource_id, "logged_hours": time_log.hours, "pending_hours": pending, "buffered": True}
+
+    row = apply_time_log(db, current_user.id, resource_id, time_log.hours)
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Resource not found or not authorized")
+    return {
+        "resource_id": row.id,
+        "logged_hours": time_log.hours,
+        "hours_spent": row.hours_spent,
+        "pending_hours": get_time_log_buffer().pending_hours(current_user.id, resource_id),
+        "progress_status": row.progress_status,
+        "buffered": False,
+    }
+
+@router.post("/resource-types", status_code=status.HTTP_201_CREATED, response_model=ResourceTypeOut)
 def create_resource_types(resource_type: ResourceTypeCreate, current_user: User = Depends(get_current_user), db=Depends(get_db)):
     existing_resource_type = prisma(db).resourcetype.find_first(where={"name": resource_type.name, "user_id": current_user.id})
     if existing_resource_type:
@@ -197,14 +338,21 @@ def create_resource_types(resource_type: ResourceTypeCreate, current_user: User
         "user_id": current_user.id,
         "created_at": datetime.utcnow(),
     }
+    bump_data_version(db, current_user.id)
+    invalidate_on_commit(db, current_user.id, "resource-types")
     created_type = prisma(db).resourcetype.create(data=new_resource_type_data)
     return created_type
 
-@router.get("/resource-types")
-def get_resource_types(current_user: User = Depends(get_current_user), db=Depends(get_db)):
-    return prisma(db).resourcetype.find_many(where={"user_id": current_user.id})
+@router.get("/resource-types", response_model=List[ResourceTypeOut])
+def get_resource_types(request: Request, response: Response, current_user: User = Depends(get_current_user), db=Depends(get_db)):
+    cached = not_modified(request, response, list_etag(current_user, "resource-types"))
+    if cached:
+        return cached
+    return get_response_cache().get_or_set(current_user.id, "resource-types", lambda: _to_json(
+        resource_types_adapter, prisma(db).resourcetype.find_many(where={"user_id": current_user.id})
+    ))
 
-@router.post("/resource-platforms", status_code=status.HTTP_201_CREATED)
+@router.post("/resource-platforms", status_code=status.HTTP_201_CREATED, response_model=ResourcePlatformOut)
 def create_resource_platforms(resource_platform: ResourcePlatformCreate, current_user: User = Depends(get_current_user), db=Depends(get_db)):
     existing_resource_platform = prisma(db).resourceplatform.find_first(where={"name": resource_platform.name, "user_id": current_user.id})
     if existing_resource_platform:
@@ -215,12 +363,19 @@ def create_resource_platforms(resource_platform: ResourcePlatformCreate, current
         "user_id": current_user.id,
         "created_at": datetime.utcnow(),
     }
+    bump_data_version(db, current_user.id)
+    invalidate_on_commit(db, current_user.id, "resource-platforms")
     created_platform = prisma(db).resourceplatform.create(data=new_resource_platform_data)
     return created_platform
     
-@router.get("/resource-platforms")
-def get_resource_platforms(current_user: User = Depends(get_current_user), db=Depends(get_db)):
-    return prisma(db).resourceplatform.find_many(where={"user_id": current_user.id})
+@router.get("/resource-platforms", response_model=List[ResourcePlatformOut])
+def get_resource_platforms(request: Request, response: Response, current_user: User = Depends(get_current_user), db=Depends(get_db)):
+    cached = not_modified(request, response, list_etag(current_user, "resource-platforms"))
+    if cached:
+        return cached
+    return get_response_cache().get_or_set(current_user.id, "resource-platforms", lambda: _to_json(
+        resource_platforms_adapter, prisma(db).resourceplatform.find_many(where={"user_id": current_user.id})
+    ))
 
 
 class ResourceTypeUpdate(BaseModel):
@@ -230,76 +385,93 @@ class ResourcePlatformUpdate(BaseModel):
     name: str
 
 
-@router.put("/resource-types/{type_id}")
+@router.put("/resource-types/{type_id}", response_model=ResourceTypeOut)
 def update_resource_type(
     type_id: int, type_data: ResourceTypeUpdate, current_user: User = Depends(get_current_user), db=Depends(get_db)
 ):
-    existing_type = prisma(db).resourcetype.find_first(
-        where={"id": type_id, "user_id": current_user.id}
-    )
-    if not existing_type:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Resource type not found or not authorized")
-
-    updated_type = prisma(db).resourcetype.update(
-        where={"id": type_id},
+    # Renames show up in learning profiles keyed on library_version
+    bump_library_version(db, current_user.id)
+    invalidate_on_commit(db, current_user.id, "resource-types")
+    updated_type = prisma(db).resourcetype.update_returning(
+        where={"id": type_id, "user_id": current_user.id},
         data={"name": type_data.name}
     )
+    if not updated_type:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Resource type not found or not authorized")
     return updated_type
 
 
 @router.delete("/resource-types/{type_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_resource_type(type_id: int, current_user: User = Depends(get_current_user), db=Depends(get_db)):
-    existing_type = prisma(db).resourcetype.find_first(
-        where={"id": type_id, "user_id": current_user.id}
-    )
-    if not existing_type:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Resource type not found or not authorized")
-
-    # Check if used by any resource (optional but good practice)
-    # For now, we'll let the DB handle constraints or just delete
+    user_id = current_user.id
     try:
-        prisma(db).resourcetype.delete(where={"id": type_id})
+        bump_library_version(db, user_id)
+        invalidate_on_commit(db, user_id, "resource-types")
+        # Resources using it are detached in the same statement
+        deleted = prisma(db).resourcetype.delete_returning(
+            where={"id": type_id, "user_id": user_id},
+            nullify=(Resources.resource_type_id,)
+        )
     except Exception as e:
          raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot delete type that is in use")
+    if not deleted:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Resource type not found or not authorized")
     
     return {"message": "Resource type deleted successfully"}
 
 
-@router.put("/resource-platforms/{platform_id}")
+@router.put("/resource-platforms/{platform_id}", response_model=ResourcePlatformOut)
 def update_resource_platform(
     platform_id: int, platform_data: ResourcePlatformUpdate, current_user: User = Depends(get_current_user), db=Depends(get_db)
 ):
-    existing_platform = prisma(db).resourceplatform.find_first(
-        where={"id": platform_id, "user_id": current_user.id}
-    )
-    if not existing_platform:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Resource platform not found or not authorized")
-
-    updated_platform = prisma(db).resourceplatform.update(
-        where={"id": platform_id},
+    bump_library_version(db, current_user.id)
+    invalidate_on_commit(db, current_user.id, "resource-platforms")
+    updated_platform = prisma(db).resourceplatform.update_returning(
+        where={"id": platform_id, "user_id": current_user.id},
         data={"name": platform_data.name}
     )
+    if not updated_platform:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Resource platform not found or not authorized")
     return updated_platform
 
 
 @router.delete("/resource-platforms/{platform_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_resource_platform(platform_id: int, current_user: User = Depends(get_current_user), db=Depends(get_db)):
-    existing_platform = prisma(db).resourceplatform.find_first(
-        where={"id": platform_id, "user_id": current_user.id}
-    )
-    if not existing_platform:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Resource platform not found or not authorized")
-
+    user_id = current_user.id
     try:
-        prisma(db).resourceplatform.delete(where={"id": platform_id})
+        bump_library_version(db, user_id)
+        invalidate_on_commit(db, user_id, "resource-platforms")
+        # Resources using it are detached in the same statement
+        deleted = prisma(db).resourceplatform.delete_returning(
+            where={"id": platform_id, "user_id": user_id},
+            nullify=(Resources.resource_platform_id,)
+        )
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot delete platform that is in use")
+    if not deleted:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Resource platform not found or not authorized")
 
     return {"message": "Resource platform deleted successfully"}
 
-@router.get("/resources/stats/overview")
+@router.get("/resources/stats/timeseries")
+def get_resource_timeseries(
+    bucket: str = Query("week", pattern="^(day|week|month)$"),
+    periods: Optional[int] = Query(None, ge=1, le=366),
+    current_user: User = Depends(get_current_user),
+    db=Depends(get_db)
+):
+    return get_learning_timeseries().get(db, current_user.id, bucket, periods or DEFAULT_PERIODS[bucket])
+
+@router.get("/resources/stats/breakdown")
+def get_resource_breakdown(current_user: User = Depends(get_current_user), db=Depends(get_db)):
+    return resource_breakdown(db, current_user.id)
+
+@router.get("/resources/stats/overview", response_model=ResourceStats)
 def get_resource_stats(current_user: User = Depends(get_current_user), db=Depends(get_db)):
-    resources = prisma(db).resources.find_many(where={"user_id": current_user.id})
+    return get_response_cache().get_or_set(current_user.id, "stats-overview", lambda: _resource_stats(db, current_user.id))
+
+def _resource_stats(db, user_id: int):
+    resources = prisma(db).resources.find_many(where={"user_id": user_id})
     
     total_resources = len(resources)
     if total_resources == 0:
@@ -0,0 +1,245 @@
+"""
+Per-user response cache
+Read-mostly responses (resource types/platforms, stats overview, AI insights)
+are cached under user- and route-scoped keys and dropped by the writes that
+change them, once those writes have committed. Values are JSON-ready so any
+backend can hold them.
+"""
+from observability.metrics import CACHE_REQUESTS, CACHE_EVICTIONS, CACHE_INVALIDATIONS
+from abc import ABC, abstractmethod
+from cachetools import TTLCache
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from typing import Any, Callable, Dict, Optional
+import itertools
+import json
+import os
+import threading
+import time
+
+
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "local")  # local | shared
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "10000"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+
+CACHE_NAME = "response"
+
+
+class ResponseCacheBackend(ABC):
+    """
+    Storage interface. Keys are strings; namespaces ("user:route", and
+    "user:route:suffix" for single entries) carry a generation number that is
+    part of every key in them, so dropping a namespace is a single increment
+    and old entries simply age out.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any):
+        ...
+
+    @abstractmethod
+    def delete(self, key: str):
+        ...
+
+    @abstractmethod
+    def generation(self, namespace: str) -> int:
+        ...
+
+    @abstractmethod
+    def bump(self, namespace: str):
+        ...
+
+
+class _EvictionCountingCache(TTLCache):
+    # TTLCache only calls popitem() to make room; expired entries are removed separately
+    def popitem(self):
+        item = super().popitem()
+        CACHE_EVICTIONS.inc(cache=CACHE_NAME)
+        return item
+
+
+class _GenerationCache(TTLCache):
+    # Dropping a live generation to make room could resurrect entries keyed with
+    # the default one, so move every namespace without a generation to a new default
+    def __init__(self, backend: "LocalCacheBackend", maxsize: int, ttl: float):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self.backend = backend
+
+    def popitem(self):
+        item = super().popitem()
+        self.backend.default_generation = next(self.backend.generation_counter)
+        return item
+
+
+class LocalCacheBackend(ResponseCacheBackend):
+    """
+    In-process LRU with TTL; the default. Generations are bounded too: they
+    share the entries' TTL and are rewritten on every bump, so by the time one
+    expires every entry keyed with the previous value has expired as well.
+    Values come from one counter and are never reused.
+    """
+
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL):
+        self.entries = _EvictionCountingCache(maxsize=maxsize, ttl=ttl)
+        self.generation_counter = itertools.count(1)
+        self.default_generation = 0
+        self.generations = _GenerationCache(self, maxsize=maxsize, ttl=ttl)
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self.lock:
+            return self.entries.get(key)
+
+    def set(self, key: str, value: Any):
+        with self.lock:
+            self.entries[key] = value
+
+    def delete(self, key: str):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def generation(self, namespace: str) -> int:
+        with self.lock:
+            return self.generations.get(namespace, self.default_generation)
+
+    def bump(self, namespace: str):
+        with self.lock:
+            self.generations[namespace] = next(self.generation_counter)
+
+
+class InMemoryKeyValueStore:
+    """
+    Local stand-in for a shared key-value store, implementing the subset of the
+    Redis client API SharedCacheBackend uses (get, set with ex=, delete, incr)
+    """
+
+    def __init__(self):
+        self.data: Dict[str, tuple] = {}
+        self.lock = threading.Lock()
+
+    def get(self, key: str):
+        with self.lock:
+            value, expires_at = self.data.get(key, (None, None))
+            if expires_at is not None and expires_at <= time.monotonic():
+                self.data.pop(key, None)
+                return None
+            return value
+
+    def set(self, key: str, value, ex: Optional[float] = None):
+        with self.lock:
+            self.data[key] = (value, time.monotonic() + ex if ex else None)
+
+    def delete(self, *keys: str):
+        with self.lock:
+            for key in keys:
+                self.data.pop(key, None)
+
+    def incr(self, key: str) -> int:
+        with self.lock:
+            value = int(self.data.get(key, (0, None))[0] or 0) + 1
+            self.data[key] = (value, None)
+            return value
+
+
+class SharedCacheBackend(ResponseCacheBackend):
+    """
+    Cache shared by all workers, on any Redis-compatible client
+    (e.g. redis.Redis.from_url(...)); evictions happen in the store and
+    aren't counted here
+    """
+
+    def __init__(self, client=None, ttl: float = RESPONSE_CACHE_TTL, prefix: str = "response-cache:"):
+        self.client = client if client is not None else InMemoryKeyValueStore()
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any):
+        self.client.set(self.prefix + key, json.dumps(value), ex=int(self.ttl))
+
+    def delete(self, key: str):
+        self.client.delete(self.prefix + key)
+
+    def generation(self, namespace: str) -> int:
+        return int(self.client.get(f"{self.prefix}{namespace}:generation") or 0)
+
+    def bump(self, namespace: str):
+        self.client.incr(f"{self.prefix}{namespace}:generation")
+
+
+class ResponseCache:
+    def __init__(self, backend: ResponseCacheBackend):
+        self.backend = backend
+
+    def _key(self, user_id: int, route: str, suffix: str) -> str:
+        # Both generations are read before the loader runs, so a loader that
+        # races an invalidation stores its (stale) value under a dead key
+        namespace = f"{user_id}:{route}"
+        key = f"{namespace}:{self.backend.generation(namespace)}:{suffix}"
+        if suffix:
+            key += f":{self.backend.generation(f'{namespace}:{suffix}')}"
+        return key
+
+    def get_or_set(self, user_id: int, route: str, loader: Callable[[], Any], suffix: str = "") -> Any:
+        """Return the cached response, or call loader (which must return JSON-ready data) and cache it"""
+        key = self._key(user_id, route, str(suffix))
+        value = self.backend.get(key)
+        if value is not None:
+            CACHE_REQUESTS.inc(cache=CACHE_NAME, result="hit")
+            return value
+        CACHE_REQUESTS.inc(cache=CACHE_NAME, result="miss")
+        value = loader()
+        self.backend.set(key, value)
+        return value
+
+    def invalidate(self, user_id: int, route: str, *suffixes):
+        """Drop the given entries of a user's route, or all of them when no suffix is given"""
+        if suffixes:
+            for suffix in suffixes:
+                self.backend.bump(f"{user_id}:{route}:{suffix}")
+        else:
+            self.backend.bump(f"{user_id}:{route}")
+        CACHE_INVALIDATIONS.inc(max(len(suffixes), 1), cache=CACHE_NAME)
+
+
+def invalidate_on_commit(db, user_id: int, route: str, *suffixes):
+    """
+    Invalidate once db's transaction commits (not before, or a concurrent read
+    could cache the old rows again); discarded on rollback
+    """
+    db.info.setdefault("response_cache_invalidations", []).append((user_id, route, suffixes))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_invalidations(session):
+    for user_id, route, suffixes in session.info.pop("response_cache_invalidations", []):
+        get_response_cache().invalidate(user_id, route, *suffixes)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_invalidations(session, previous_transaction):
+    session.info.pop("response_cache_invalidations", None)
+
+
+# Singleton instance
+_response_cache = None
+
+def get_response_cache() -> ResponseCache:
+    global _response_cache
+    if _response_cache is None:
+        backend = SharedCacheBackend() if RESPONSE_CACHE_BACKEND == "shared" else LocalCacheBackend()
+        _response_cache = ResponseCache(backend)
+    return _response_cache
+
+
+def configure_response_cache(backend: ResponseCacheBackend):
+    """Swap the backend, e.g. SharedCacheBackend(redis.Redis.from_url(url))"""
+    global _response_cache
+    _response_cache = ResponseCache(backend)
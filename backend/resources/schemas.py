@@ -0,0 +1,64 @@
+"""
+Response models for the resource routes
+Built from ORM objects with from_attributes, so only these columns are read
+and serialized (no attribute introspection, no lazy loads while encoding)
+"""
+from pydantic import BaseModel, ConfigDict
+from datetime import datetime
+from typing import Optional
+
+
+class ResourceOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    name: Optional[str] = None
+    user_id: Optional[int] = None
+    resource_type_id: Optional[int] = None
+    resource_platform_id: Optional[int] = None
+    description: Optional[str] = None
+    notes: Optional[str] = None
+    rating: Optional[int] = None
+
+    progress_status: Optional[str] = None
+    estimated_hours: Optional[int] = None
+    hours_spent: Optional[float] = None
+    completion_date: Optional[datetime] = None
+    started_date: Optional[datetime] = None
+
+    # Full structured AI output is served by /api/ai/insights/{id}
+    ai_summary: Optional[str] = None
+    ai_tags: Optional[str] = None
+    ai_category: Optional[str] = None
+    ai_mastery_date: Optional[datetime] = None
+
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+class ResourceTypeOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    name: Optional[str] = None
+    user_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+
+
+class ResourcePlatformOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    name: Optional[str] = None
+    user_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+
+
+class ResourceStats(BaseModel):
+    total_resources: int
+    completed_resources: int
+    in_progress_resources: int
+    not_started_resources: int
+    completion_rate: float
+    total_estimated_hours: float
+    total_hours_spent: float
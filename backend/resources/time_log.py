@@ -0,0 +1,166 @@
+"""
+Atomic time logging
+Increments hours_spent in a single UPDATE ... RETURNING (no read-modify-write,
+so concurrent timer pings from several devices can't lose updates), records
+the increment in the per-day rollup, and optionally coalesces high-frequency
+pings in an in-process write-behind buffer
+"""
+from database.db import SessionLocal
+from resources.versioning import bump_library_version
+from resources.response_cache import invalidate_on_commit
+from activities.activity import record_activity
+from observability.request_context import log_event
+from sqlalchemy import text
+from datetime import date, datetime
+from typing import Dict, Optional, Tuple
+import asyncio
+import logging
+import os
+import threading
+
+
+TIME_LOG_FLUSH_INTERVAL = float(os.getenv("TIME_LOG_FLUSH_INTERVAL", "5"))
+
+logger = logging.getLogger("skillstack.time_log")
+
+INCREMENT_SQL = text("""
+    UPDATE resources
+    SET hours_spent = COALESCE(hours_spent, 0) + :hours,
+        progress_status = CASE WHEN progress_status = 'not_started' OR progress_status IS NULL
+                               THEN 'in_progress' ELSE progress_status END,
+        started_date = COALESCE(started_date, :now),
+        updated_at = :now
+    WHERE id = :resource_id AND user_id = :user_id
+    RETURNING id, name, hours_spent, progress_status
+""")
+
+ROLLUP_SQL = text("""
+    INSERT INTO resource_time_daily (user_id, resource_id, day, hours, entries)
+    VALUES (:user_id, :resource_id, :day, :hours, :entries)
+    ON CONFLICT (user_id, resource_id, day)
+    DO UPDATE SET hours = resource_time_daily.hours + EXCLUDED.hours,
+                  entries = resource_time_daily.entries + EXCLUDED.entries
+""")
+
+
+def apply_time_log(db, user_id: int, resource_id: int, hours: float, entries: int = 1, day: Optional[date] = None):
+    """
+    Add hours to a resource the user owns and commit. Returns the updated
+    (id, name, hours_spent, progress_status) row, or None if not found/not owned.
+    """
+    now = datetime.utcnow()
+    row = db.execute(
+        INCREMENT_SQL,
+        {"hours": hours, "now": now, "resource_id": resource_id, "user_id": user_id}
+    ).first()
+    if row is None:
+        db.rollback()
+        return None
+
+    db.execute(ROLLUP_SQL, {
+        "user_id": user_id, "resource_id": resource_id, "day": day or now.date(),
+        "hours": hours, "entries": entries,
+    })
+    record_activity(db, user_id, "time_logged", resource_id, {
+        "resource_name": row.name, "hours": hours, "entries": entries, "hours_spent": row.hours_spent,
+    })
+    bump_library_version(db, user_id)
+    invalidate_on_commit(db, user_id, "stats-overview")
+    db.commit()
+    return row
+
+
+class TimeLogBuffer:
+    """
+    Write-behind buffer for study-timer pings: increments are summed per
+    (user, resource, day) and flushed every TIME_LOG_FLUSH_INTERVAL seconds,
+    turning one write per ping into one write per resource per interval.
+    Pending time is lost if the process dies before a flush, which is why
+    buffering is opt-in per request.
+    """
+
+    def __init__(self, interval: float = TIME_LOG_FLUSH_INTERVAL):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.pending: Dict[Tuple[int, int, date], Tuple[float, int]] = {}  # -> (hours, entries)
+        self.worker: Optional[asyncio.Task] = None
+
+    def add(self, user_id: int, resource_id: int, hours: float) -> float:
+        """Buffer an increment; returns the hours pending for this resource today"""
+        key = (user_id, resource_id, datetime.utcnow().date())
+        with self.lock:
+            pending_hours, entries = self.pending.get(key, (0.0, 0))
+            self.pending[key] = (pending_hours + hours, entries + 1)
+            return round(pending_hours + hours, 4)
+
+    def pending_hours(self, user_id: int, resource_id: int) -> float:
+        with self.lock:
+            return round(sum(
+                hours for (owner, resource, _), (hours, _) in self.pending.items()
+                if owner == user_id and resource == resource_id
+            ), 4)
+
+    def flush(self) -> int:
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        if not pending:
+            return 0
+        failed = {}
+        db = SessionLocal()
+        try:
+            for key, (hours, entries) in pending.items():
+                user_id, resource_id, day = key
+                try:
+                    apply_time_log(db, user_id, resource_id, hours, entries=entries, day=day)
+                except Exception as e:
+                    db.rollback()
+                    failed[key] = (hours, entries)
+                    log_event(
+                        logger, "time_log_flush_failed", logging.ERROR,
+                        user_id=user_id, resource_id=resource_id, hours=hours, error=str(e)
+                    )
+        finally:
+            db.close()
+            if failed:
+                self._requeue(failed)
+        return len(pending) - len(failed)
+
+    def _requeue(self, failed: Dict[Tuple[int, int, date], Tuple[float, int]]):
+        """Put increments that failed to flush back, merged with any that arrived since, for the next flush"""
+        with self.lock:
+            for key, (hours, entries) in failed.items():
+                pending_hours, pending_entries = self.pending.get(key, (0.0, 0))
+                self.pending[key] = (pending_hours + hours, pending_entries + entries)
+
+    def start(self):
+        if self.worker is None:
+            self.worker = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            try:
+                await self.worker
+            except asyncio.CancelledError:
+                pass
+            self.worker = None
+        # Don't drop buffered time on a clean shutdown
+        await asyncio.to_thread(self.flush)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                log_event(logger, "time_log_flusher_error", logging.ERROR, error=str(e))
+
+
+# Singleton instance
+_time_log_buffer = None
+
+def get_time_log_buffer() -> TimeLogBuffer:
+    global _time_log_buffer
+    if _time_log_buffer is None:
+        _time_log_buffer = TimeLogBuffer()
+    return _time_log_buffer
@@ -0,0 +1,31 @@
+"""
+Per-user version stamps
+Bumped in the same transaction as the writes they describe:
+- library_version: the user's library changed in a way derived data
+  (cached recommendations, learning profiles, ...) cares about
+- data_version: anything the user can read changed (also AI enrichment,
+  new types and platforms); used as the cache validator behind list ETags
+"""
+from sqlalchemy import bindparam, text
+
+
+def bump_library_version(db, user_id: int):
+    """Increment users.library_version (and data_version); committed together with the caller's write"""
+    db.execute(
+        text(
+            "UPDATE users SET library_version = COALESCE(library_version, 0) + 1, "
+            "data_version = COALESCE(data_version, 0) + 1 WHERE id = :user_id"
+        ),
+        {"user_id": user_id}
+    )
+
+
+def bump_data_version(db, *user_ids: int):
+    """Increment users.data_version only; committed together with the caller's write"""
+    if not user_ids:
+        return
+    db.execute(
+        text("UPDATE users SET data_version = COALESCE(data_version, 0) + 1 WHERE id IN :user_ids")
+        .bindparams(bindparam("user_ids", expanding=True)),
+        {"user_ids": list(user_ids)}
+    )
@@ -0,0 +1,67 @@
+"""
+Bulk import through POST /api/resources/import on a throwaway SQLite database
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/import_test.db")
+os.environ.setdefault("ENRICHMENT_ENABLED", "false")
+os.environ.setdefault("GEMINI_API_KEY", "unused")
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+from authentication.auth import create_access_token
+import main
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture(scope="module")
+def headers(client):
+    client.post("/auth/signup", json={"email": "importer@example.com", "password": "secret1", "name": "Importer"})
+    return {"Authorization": "Bearer " + create_access_token({"sub": "importer@example.com"})}
+
+
+def _events(response):
+    return [orjson.loads(line) for line in response.content.splitlines() if line.strip()]
+
+
+def test_csv_upload(client, headers):
+    body = (
+        "﻿name,resource_type,resource_platform,notes,progress_status,hours_spent\n"
+        'Fluent Python,Book,O\'Reilly,"two\nlines",in_progress,3.5\n'
+        "SQL Course,Course,Udemy,,completed,\n"
+        ",Book,,,,\n"
+    ).encode("utf-8")
+    response = client.post(
+        "/api/resources/import?format=csv", content=body, headers={**headers, "Content-Type": "text/csv"}
+    )
+    assert response.status_code == 200
+    events = _events(response)
+    assert events[-1] == {"event": "done", "rows": 3, "imported": 2, "failed": 1}
+    assert events[0]["errors"][0]["row"] == 3
+
+    resources = {r["name"]: r for r in client.get("/api/resources", headers=headers).json()}
+    assert resources["Fluent Python"]["notes"] == "two\nlines"
+    assert resources["Fluent Python"]["hours_spent"] == 3.5
+    assert resources["SQL Course"]["completion_date"] is not None
+    type_names = {t["name"] for t in client.get("/api/resource-types", headers=headers).json()}
+    assert {"Book", "Course"} <= type_names
+
+
+def test_ndjson_upload(client, headers):
+    body = b"\n".join(orjson.dumps(row) for row in [
+        {"name": "Designing Data-Intensive Applications", "resource_type": "Book"},
+        {"name": "Bad rating", "rating": "five"},
+    ])
+    response = client.post(
+        "/api/resources/import", content=body, headers={**headers, "Content-Type": "application/x-ndjson"}
+    )
+    assert _events(response)[-1] == {"event": "done", "rows": 2, "imported": 1, "failed": 1}